@@ -0,0 +1,79 @@
+"""
+
+    Recall vs latency benchmark of the ANN index over item factors.
+
+    Author: Explore Data Science Academy.
+
+    Description: Builds an `IVFIndex` over synthetic SVD item factors
+    (sized like the MovieLens 25M catalogue by default) and reports, for
+    a range of `nprobe` values, the recall@k against exact scoring of
+    the full catalogue together with the mean query latency of each.
+
+    Run from the root of the repository:
+
+        python benchmarks/bench_ann.py --items 62000 --factors 200
+
+"""
+# Script dependencies
+import os
+import sys
+import time
+import argparse
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from recommenders.ann import IVFIndex
+from recommenders.scoring import top_k_indices
+
+
+def synthetic_factors(n_items, n_factors, n_clusters=50, seed=42):
+    """Clustered random item factors, mimicking genre structure."""
+    rng = np.random.default_rng(seed)
+    centres = rng.normal(0, 0.3, (n_clusters, n_factors))
+    items = centres[rng.integers(0, n_clusters, n_items)]
+    items += rng.normal(0, 0.1, (n_items, n_factors))
+    return items.astype(np.float32)
+
+
+def exact_search(vectors, query, k):
+    """Score every item and select the top-k."""
+    return top_k_indices(vectors @ query, k)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='ANN recall/latency benchmark.')
+    parser.add_argument('--items', type=int, default=62000)
+    parser.add_argument('--factors', type=int, default=200)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--k', type=int, default=10)
+    parser.add_argument('--lists', type=int, default=None)
+    args = parser.parse_args()
+
+    vectors = synthetic_factors(args.items, args.factors)
+    queries = synthetic_factors(args.queries, args.factors, seed=7)
+
+    start = time.perf_counter()
+    index = IVFIndex.build(vectors, n_lists=args.lists)
+    print(f"Built {index.n_lists} lists over {args.items} items "
+          f"in {time.perf_counter() - start:.1f} s")
+
+    start = time.perf_counter()
+    for query in queries:
+        exact_search(vectors, query, args.k)
+    exact_ms = (time.perf_counter() - start) / len(queries) * 1000
+    print(f"{'nprobe':>7} {'recall@' + str(args.k):>10} {'latency (ms)':>13}")
+    print(f"{'exact':>7} {1.0:>10.3f} {exact_ms:>13.3f}")
+
+    nprobe = 1
+    while nprobe <= index.n_lists:
+        recall = index.recall_at_k(queries, args.k, nprobe)
+        start = time.perf_counter()
+        for query in queries:
+            index.search(query, args.k, nprobe)
+        latency_ms = (time.perf_counter() - start) / len(queries) * 1000
+        print(f"{nprobe:>7} {recall:>10.3f} {latency_ms:>13.3f}")
+        nprobe *= 2
+
+
+if __name__ == '__main__':
+    main()
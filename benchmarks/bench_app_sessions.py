@@ -0,0 +1,119 @@
+"""
+
+    Per-rerun latency and memory of the Streamlit app under many sessions.
+
+    Author: Explore Data Science Academy.
+
+    Description: Drives `edsa_recommender.py` with Streamlit's `AppTest`
+    harness as many browser sessions within the same server process.
+    Every session opens the app, types a query into the Movie Filter one
+    keystroke at a time, then asks for content, collaborative and hybrid
+    recommendations. `AppTest` runs one script at a time per process, so
+    the sessions are interleaved rerun by rerun: every session makes its
+    next step before any makes the one after. The latency of every rerun
+    is recorded, and the resident memory of the process is reported
+    before the sessions start and once they have all finished.
+
+    The app runs within a synthetic dataset (see
+    `benchmarks/synthetic_data.py`), so that its relative paths resolve
+    to it.
+
+    Run from the root of the repository:
+
+        python benchmarks/bench_app_sessions.py --sessions 50 --scale tiny
+
+"""
+# Script dependencies
+import os
+import sys
+import time
+import argparse
+import resource
+import tempfile
+import numpy as np
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+APP_PATH = os.path.join(ROOT, 'edsa_recommender.py')
+
+
+def current_rss_mib():
+    """Resident memory of the process, in MiB."""
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * resource.getpagesize() / 2**20
+
+
+def session_steps(query):
+    """(page, action) of each rerun of a session; actions take the AppTest."""
+    steps = [('Movie Filter', lambda app: app.sidebar.selectbox[0].select('Movie Filter'))]
+    steps += [('Movie Filter', lambda app, text=query[:end]: app.text_input[0].input(text))
+              for end in range(1, len(query) + 1)]
+    steps.append(('Recommender System',
+                  lambda app: app.sidebar.selectbox[0].select('Recommender System')))
+    for algorithm in ('Content Based Filtering', 'Collaborative Based Filtering'):
+        steps.append(('Recommender System',
+                      lambda app, name=algorithm: app.radio[0].set_value(name)))
+        steps.append(('Recommend', lambda app: app.button[0].click()))
+    steps.append(('Recommender System', lambda app: app.checkbox[0].check()))
+    steps.append(('Recommend', lambda app: app.button(key='hybrid_recommend').click()))
+    return steps
+
+
+def run_sessions(n_sessions, query, timeout=120):
+    """Interleaved reruns of every session, as (page, seconds) pairs."""
+    from streamlit.testing.v1 import AppTest
+    latencies = []
+
+    def timed(session, page, rerun):
+        start = time.perf_counter()
+        app = rerun()
+        latencies.append((page, time.perf_counter() - start))
+        if app.exception:
+            raise RuntimeError(f"Session {session}: {app.exception[0].message}")
+        return app
+
+    apps = [timed(session, 'About', AppTest.from_file(APP_PATH, default_timeout=timeout).run)
+            for session in range(n_sessions)]
+    for page, action in session_steps(query):
+        apps = [timed(session, page, action(app).run) for session, app in enumerate(apps)]
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Streamlit app session benchmark.')
+    parser.add_argument('--sessions', type=int, default=50)
+    parser.add_argument('--scale', default='tiny',
+                        help='Named dataset size of benchmarks/synthetic_data.py.')
+    parser.add_argument('--data-dir', default=None,
+                        help='Where the synthetic dataset is generated, or reused from.')
+    parser.add_argument('--query', default='the matrix')
+    args = parser.parse_args()
+
+    from benchmarks.synthetic_data import SCALES, generate
+    n_ratings, n_movies, n_users = SCALES[args.scale]
+    data_root = args.data_dir or os.path.join(
+        tempfile.gettempdir(), 'recommender-benchmarks',
+        f'{n_ratings}-{n_movies}-{n_users}')
+    if not os.path.exists(os.path.join(data_root, 'synthetic.json')):
+        generate(data_root, n_ratings, n_movies, n_users)
+    images = os.path.join(data_root, 'resources', 'imgs')
+    if not os.path.exists(images):
+        os.symlink(os.path.join(ROOT, 'resources', 'imgs'), images)
+    os.chdir(data_root)
+
+    rss_before = current_rss_mib()
+    start = time.perf_counter()
+    latencies = run_sessions(args.sessions, args.query)
+    elapsed = time.perf_counter() - start
+
+    print(f"{args.sessions} sessions, {len(latencies)} reruns in {elapsed:.1f} s")
+    for page in dict.fromkeys(page for page, _ in latencies):
+        times = np.array([seconds for name, seconds in latencies if name == page]) * 1000
+        print(f"  {page:<20} {len(times):5d} reruns, p50 {np.percentile(times, 50):8.1f} ms, "
+              f"p99 {np.percentile(times, 99):8.1f} ms")
+    print(f"Resident memory: {rss_before:.0f} MiB before, {current_rss_mib():.0f} MiB after, "
+          f"peak {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} MiB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+"""
+
+    Cold-start and memory benchmark of the columnar dataset format.
+
+    Author: Explore Data Science Academy.
+
+    Description: Loads each dataset in a fresh Python process, once by
+    parsing its .csv and once from its memory-mapped columnar copy (see
+    `utils.columnar`), and reports the load time together with the
+    resident memory of the process. Resident memory is split into private
+    (anonymous) pages and file-backed pages, which are shared between all
+    processes mapping the same files.
+
+    Run from the root of the repository, after converting the datasets:
+
+        python -m utils.columnar
+        python benchmarks/bench_columnar.py
+
+"""
+# Script dependencies
+import os
+import sys
+import json
+import subprocess
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+from utils.columnar import DATASETS, is_converted
+
+# Executed within a fresh interpreter for every measurement.
+PROBE = '''
+import json, sys, time
+sys.path.insert(0, {root!r})
+import pandas as pd
+from utils.columnar import load_columnar
+
+def memory():
+    status = {{}}
+    with open('/proc/self/status') as f:
+        for line in f:
+            key, _, value = line.partition(':')
+            status[key] = value.strip()
+    return {{key: int(status.get(key, '0 kB').split()[0]) / 1024
+             for key in ('VmRSS', 'RssAnon', 'RssFile')}}
+
+before = memory()
+start = time.perf_counter()
+if {fmt!r} == 'csv':
+    df = pd.read_csv({path!r})
+else:
+    df = load_columnar({path!r})
+    # Touch every column, as the app would
+    for name in df.columns:
+        df[name].iloc[-1]
+elapsed = time.perf_counter() - start
+after = memory()
+print(json.dumps({{'seconds': elapsed,
+                  'rss_mib': after['VmRSS'] - before['VmRSS'],
+                  'private_mib': after['RssAnon'] - before['RssAnon'],
+                  'shared_mib': after['RssFile'] - before['RssFile']}}))
+'''
+
+
+def probe(path, fmt):
+    """Measure loading `path` in the given format in a fresh process."""
+    code = PROBE.format(root=ROOT, path=path, fmt=fmt)
+    output = subprocess.run([sys.executable, '-W', 'ignore', '-c', code],
+                            capture_output=True, text=True, check=True, cwd=ROOT)
+    return json.loads(output.stdout)
+
+
+def main():
+    print(f"{'dataset':<28} {'format':>9} {'load (s)':>9} {'RSS (MiB)':>10} "
+          f"{'private':>8} {'shared':>8}")
+    for path in DATASETS:
+        if not os.path.exists(os.path.join(ROOT, path)):
+            continue
+        formats = ['csv', 'columnar'] if is_converted(path) else ['csv']
+        for fmt in formats:
+            result = probe(path, fmt)
+            print(f"{os.path.basename(path):<28} {fmt:>9} {result['seconds']:>9.3f} "
+                  f"{result['rss_mib']:>10.1f} {result['private_mib']:>8.1f} "
+                  f"{result['shared_mib']:>8.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+"""
+
+    Micro-benchmark of content-based scoring.
+
+    Author: Explore Data Science Academy.
+
+    Description: Compares the original content scoring path (dense TF-IDF
+    matrix, full N x N cosine similarity and a complete argsort) against
+    the centroid + `np.argpartition` engine in
+    `recommenders.content_index`, on synthetic TF-IDF corpora of
+    increasing size. Latency and peak traced memory are reported for each.
+
+    Run from the root of the repository:
+
+        python benchmarks/bench_content_scoring.py --sizes 10000 50000 100000
+
+"""
+# Script dependencies
+import os
+import sys
+import time
+import argparse
+import tracemalloc
+import numpy as np
+import scipy.sparse as sp
+from sklearn.metrics.pairwise import cosine_similarity
+from sklearn.preprocessing import normalize
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from recommenders.content_index import ContentIndex
+
+
+def synthetic_corpus(n_movies, n_features=5000, words_per_movie=40, seed=42):
+    """Random L2-normalized TF-IDF-like sparse matrix."""
+    rng = np.random.default_rng(seed)
+    rows = np.repeat(np.arange(n_movies), words_per_movie)
+    cols = rng.integers(0, n_features, size=rows.size)
+    vals = rng.random(rows.size)
+    matrix = sp.csr_matrix((vals, (rows, cols)), shape=(n_movies, n_features))
+    return normalize(matrix)
+
+
+def original_path(matrix, indices, top_n):
+    """Scoring as previously performed within `content_model`."""
+    similarity = cosine_similarity(normalize(matrix.toarray()))
+    avg_similarity = similarity[indices].mean(axis=0)
+    top_indices = avg_similarity.argsort()[-top_n*2:][::-1]
+    return [idx for idx in top_indices if idx not in indices][:top_n]
+
+
+def engine_path(index, titles, top_n):
+    """Centroid scoring with top-k selection."""
+    return index.recommend_batch([titles], top_n)[0]
+
+
+def measure(func, *args):
+    """Run `func` once, returning (seconds, peak traced MiB)."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    func(*args)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak / 2**20
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Content scoring micro-benchmark.')
+    parser.add_argument('--sizes', type=int, nargs='+',
+                        default=[10000, 50000, 100000])
+    parser.add_argument('--top-n', type=int, default=5)
+    parser.add_argument('--max-dense-gib', type=float, default=4.0,
+                        help='skip the original path when its N x N '
+                             'similarity matrix would exceed this size')
+    args = parser.parse_args()
+
+    print(f"{'movies':>8} {'path':>9} {'latency (s)':>12} {'peak (MiB)':>11}")
+    for n_movies in args.sizes:
+        matrix = synthetic_corpus(n_movies)
+        titles = np.array([f'movie {i}' for i in range(n_movies)])
+        index = ContentIndex(matrix, titles, titles, vectorizer=None)
+        query = [0, n_movies // 2, n_movies - 1]
+
+        dense_gib = n_movies ** 2 * 8 / 2**30
+        if dense_gib <= args.max_dense_gib:
+            seconds, peak = measure(original_path, matrix, query, args.top_n)
+            print(f"{n_movies:>8} {'original':>9} {seconds:>12.4f} {peak:>11.1f}")
+        else:
+            print(f"{n_movies:>8} {'original':>9} {'skipped':>12} "
+                  f"{'~' + format(dense_gib * 1024, '.0f'):>11}")
+
+        seconds, peak = measure(engine_path, index, titles[query], args.top_n)
+        print(f"{n_movies:>8} {'engine':>9} {seconds:>12.4f} {peak:>11.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+"""
+
+    Latency benchmark of the Movie Filter search.
+
+    Author: Explore Data Science Academy.
+
+    Description: Simulates a user typing a multi-field query into the
+    Movie Filter page, one keystroke at a time, over a synthetic content
+    table. Each keystroke is answered both by the original per-row
+    substring scans and by `utils.movie_search.MovieSearchIndex`, and the
+    mean and worst latency of each are reported.
+
+    Run from the root of the repository:
+
+        python benchmarks/bench_movie_search.py --movies 62000
+
+"""
+# Script dependencies
+import os
+import sys
+import time
+import argparse
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from utils.movie_search import MovieSearchIndex
+
+GENRES = ['Action', 'Adventure', 'Animation', 'Children', 'Comedy', 'Crime',
+          'Documentary', 'Drama', 'Fantasy', 'Horror', 'Musical', 'Mystery',
+          'Romance', 'Sci-Fi', 'Thriller', 'War', 'Western']
+
+
+def synthetic_content(n_movies, seed=42):
+    """Random content table shaped like `content_separated.csv`."""
+    rng = np.random.default_rng(seed)
+    syllables = ['ka', 'to', 'mi', 'ra', 'ne', 'so', 'lu', 'be', 'di', 'fa',
+                 'go', 'hi', 'jo', 'pe', 'qu', 'vi', 'wa', 'ze']
+    def word(n):
+        return ''.join(rng.choice(syllables, n)).capitalize()
+    people = [f'{word(2)} {word(3)}' for _ in range(20000)] + ['Tom Hanks']
+    return pd.DataFrame({
+        'movieId': np.arange(n_movies),
+        'title': [' '.join(word(rng.integers(1, 4)) for _ in range(rng.integers(1, 4)))
+                  for _ in range(n_movies)],
+        'genres': ['|'.join(rng.choice(GENRES, rng.integers(1, 4), replace=False))
+                   for _ in range(n_movies)],
+        'release_year': rng.integers(1900, 2020, n_movies).astype(float),
+        'title_cast': ['|'.join(rng.choice(people, 4)) for _ in range(n_movies)],
+        'director': rng.choice(people, n_movies),
+        'overview': '',
+        'plot_keywords': '',
+    })
+
+
+def original_filter(content_separated, title, genre, release_year, cast, director):
+    """Filtering as previously performed on the Movie Filter page."""
+    columns = {'title': 'Title','genres': 'Genres','release_year' : 'Release Year','title_cast' : 'Cast', 'director': 'Director'}
+    display_content_data = content_separated.drop('overview', axis=1).drop('movieId', axis=1).drop('plot_keywords', axis=1)
+    display_content_data['release_year'] = display_content_data['release_year'].astype(str)
+    display_content_data.rename(columns=columns, inplace=True)
+    title = [word.lower() for word in title.split(" ")] if title != '' else []
+    genre = [word.lower() for word in genre.split(" ")] if genre != '' else []
+    release_year = [word.lower() for word in release_year.split(" ")] if release_year != '' else []
+    cast = [word.lower() for word in cast.split(" ")] if cast != '' else []
+    director = [word.lower() for word in director.split(" ")] if director != '' else []
+    return display_content_data[
+        (display_content_data['Title'].apply(lambda x: isinstance(x, str) and all(string in x.lower() for string in title))) &
+        (display_content_data['Genres'].apply(lambda x: isinstance(x, str) and all(string in x.lower() for string in genre))) &
+        ((len(release_year) == 0) | (display_content_data['Release Year'].apply(lambda x: isinstance(x, str) and any(string in x.lower() for string in release_year)))) &
+        (display_content_data['Cast'].apply(lambda x: isinstance(x, str) and all(string in x.lower() for string in cast))) &
+        (display_content_data['Director'].apply(lambda x: isinstance(x, str) and all(string in x.lower() for string in director)))
+    ]
+
+
+def keystrokes(genre, cast, year):
+    """Successive query states while typing a genre, a cast member and a year."""
+    states = []
+    for i in range(1, len(genre) + 1):
+        states.append((genre[:i], '', ''))
+    for i in range(1, len(cast) + 1):
+        states.append((genre, cast[:i], ''))
+    for i in range(1, len(year) + 1):
+        states.append((genre, cast, year[:i]))
+    return states
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Movie Filter latency benchmark.')
+    parser.add_argument('--movies', type=int, default=62000)
+    args = parser.parse_args()
+
+    content = synthetic_content(args.movies)
+    start = time.perf_counter()
+    index = MovieSearchIndex(content)
+    print(f"Index built over {args.movies} movies in {time.perf_counter() - start:.2f} s")
+
+    timings = {'original': [], 'index': []}
+    for genre, cast, year in keystrokes('comedy', 'tom hanks', '199'):
+        start = time.perf_counter()
+        original_filter(content, '', genre, year, cast, '')
+        timings['original'].append(time.perf_counter() - start)
+        start = time.perf_counter()
+        index.filter(genres=genre, title_cast=cast, release_year=year)
+        timings['index'].append(time.perf_counter() - start)
+
+    print(f"{'path':>9} {'mean (ms)':>10} {'worst (ms)':>11}")
+    for path, seconds in timings.items():
+        print(f"{path:>9} {np.mean(seconds) * 1000:>10.2f} {np.max(seconds) * 1000:>11.2f}")
+
+
+if __name__ == '__main__':
+    main()
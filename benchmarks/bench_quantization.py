@@ -0,0 +1,119 @@
+"""
+
+    Size, load time and accuracy of the collaborative factors per precision.
+
+    Author: Explore Data Science Academy.
+
+    Description: Saves the same SVD factors as float64, float32 and int8
+    (with one scale per row), and reports for each precision the size of
+    the saved arrays, the time to load them (memory-mapped) and score one
+    user against the whole catalogue, the mean latency of that scoring,
+    the RMSE over a sample of ratings, and the overlap of each user's
+    top-k movies with those of the reference factors.
+
+    The reference is the pickled surprise model when it exists (whose
+    unpickling is timed as well), so that the accuracy drop is measured
+    against the original artifact. Otherwise it is the exported factors
+    cast to float64, which the precision they were exported in then
+    matches exactly.
+
+    Run from the root of the repository (or of a synthetic dataset):
+
+        python benchmarks/bench_quantization.py --factors resources/models/collab_factors
+
+"""
+# Script dependencies
+import os
+import sys
+import time
+import pickle
+import argparse
+import tempfile
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from recommenders.factors import FACTORS_DIR, PRECISIONS, SVDFactors
+from recommenders.scoring import top_k_indices
+
+
+def directory_mib(path):
+    """Total size of the files within a directory, in MiB."""
+    return sum(os.path.getsize(os.path.join(path, name))
+               for name in os.listdir(path)) / 2**20
+
+
+def rmse(factors, ratings):
+    estimates = factors.predict_pairs(factors.user_rows(ratings['userId'].values),
+                                      factors.item_rows(ratings['movieId'].values))
+    return float(np.sqrt(np.mean((ratings['rating'].values - estimates) ** 2)))
+
+
+def top_k_lists(factors, users, k):
+    """Top-k factor rows of each sampled user, with the mean scoring time."""
+    start = time.perf_counter()
+    lists = [top_k_indices(factors.predict_user(factors.pu[u],
+                                                factors.bu[u] if factors.biased else 0.0,
+                                                clip=False), k)
+             for u in users]
+    return lists, (time.perf_counter() - start) / len(users)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Factor precision benchmark.')
+    parser.add_argument('--factors', default=FACTORS_DIR)
+    parser.add_argument('--ratings', default='resources/data/filtered_ratings_data.csv')
+    parser.add_argument('--model', default='resources/models/collab_model.pkl',
+                        help='Pickled surprise model, used as the reference if it exists.')
+    parser.add_argument('--samples', type=int, default=200_000)
+    parser.add_argument('--users', type=int, default=500)
+    parser.add_argument('--k', type=int, default=10)
+    args = parser.parse_args()
+
+    if os.path.exists(args.model):
+        start = time.perf_counter()
+        with open(args.model, 'rb') as f:
+            model = pickle.load(f)
+        print(f"Unpickling {args.model} ({os.path.getsize(args.model) / 2**20:.1f} MiB): "
+              f"{(time.perf_counter() - start) * 1000:.1f} ms")
+        reference = SVDFactors.from_surprise(model)
+        print(f"Reference: the pickled model {args.model}")
+    else:
+        exported = SVDFactors.load(args.factors, mmap_mode=None)
+        reference = SVDFactors(np.asarray(exported.pu, dtype=np.float64),
+                               np.asarray(exported.qi, dtype=np.float64),
+                               np.asarray(exported.bu, dtype=np.float64),
+                               np.asarray(exported.bi, dtype=np.float64),
+                               exported.global_mean, exported.rating_scale,
+                               exported.user_ids, exported.item_ids, exported.biased)
+        print(f"Reference: {args.factors} cast to float64 (no pickled model); "
+              f"its {exported.precision} export matches it exactly")
+    ratings = pd.read_csv(args.ratings, usecols=['userId', 'movieId', 'rating'])
+    ratings = ratings.sample(min(args.samples, len(ratings)), random_state=0)
+    rng = np.random.default_rng(0)
+    users = rng.choice(len(reference.pu), min(args.users, len(reference.pu)), replace=False)
+    print(f"{len(reference.user_ids)} users, {len(reference.item_ids)} movies, "
+          f"{reference.n_factors} factors; {len(ratings)} ratings, {len(users)} users sampled")
+
+    expected, reference_s = top_k_lists(reference, users, args.k)
+    print(f"{'precision':>9} {'size (MiB)':>11} {'load+score (ms)':>16} "
+          f"{'score (ms)':>11} {'RMSE':>8} {'top-' + str(args.k) + ' overlap':>15}")
+    print(f"{'reference':>9} {'':>11} {'':>16} {reference_s * 1000:>11.3f} "
+          f"{rmse(reference, ratings):>8.5f} {1.0:>15.4f}")
+    with tempfile.TemporaryDirectory() as root:
+        for precision in PRECISIONS:
+            path = os.path.join(root, precision)
+            reference.save(path, precision)
+            start = time.perf_counter()
+            factors = SVDFactors.load(path)
+            factors.predict_user(factors.pu[0], factors.bu[0])
+            load_ms = (time.perf_counter() - start) * 1000
+            lists, score_s = top_k_lists(factors, users, args.k)
+            overlap = np.mean([len(np.intersect1d(got, want)) / args.k
+                               for got, want in zip(lists, expected)])
+            print(f"{precision:>9} {directory_mib(path):>11.1f} {load_ms:>16.1f} "
+                  f"{score_s * 1000:>11.3f} {rmse(factors, ratings):>8.5f} {overlap:>15.4f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+"""
+
+    Load test of the HTTP/JSON recommendation service.
+
+    Author: Explore Data Science Academy.
+
+    Description: Sends requests for random favourite-movie trios to a
+    running `recommenders/service.py` from many concurrent keep-alive
+    connections, and reports the p50/p99 latency and the throughput
+    (requests per second) achieved.
+
+    Start the service, then run from the root of the repository:
+
+        python -m recommenders.service --port 8000
+        python benchmarks/load_test_service.py --url http://127.0.0.1:8000 \\
+            --algorithm content --concurrency 32 --requests 2000
+
+"""
+# Script dependencies
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import urllib.parse
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from utils.data_loader import load_movie_titles
+
+
+async def _post(reader, writer, host, path, payload):
+    body = json.dumps(payload).encode()
+    writer.write((f'POST {path} HTTP/1.1\r\nHost: {host}\r\n'
+                  'Content-Type: application/json\r\n'
+                  f'Content-Length: {len(body)}\r\n\r\n').encode() + body)
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        if name.strip().lower() == 'content-length':
+            length = int(value)
+    await reader.readexactly(length)
+    return status
+
+
+async def _client(url, path, queries, top_n, latencies, errors):
+    reader, writer = await asyncio.open_connection(url.hostname, url.port or 80)
+    try:
+        for movies in queries:
+            start = time.perf_counter()
+            status = await _post(reader, writer, url.netloc, path,
+                                 {'movies': movies, 'top_n': top_n})
+            latencies.append(time.perf_counter() - start)
+            if status != 200:
+                errors.append(status)
+    finally:
+        writer.close()
+
+
+async def load_test(url, algorithm, titles, n_requests, concurrency, top_n, seed=0):
+    """Send `n_requests` requests over `concurrency` connections.
+
+    Returns
+    -------
+    dict
+        Latency percentiles (ms), requests per second and error count.
+
+    """
+    url = urllib.parse.urlparse(url)
+    rng = np.random.default_rng(seed)
+    queries = [rng.choice(titles, 3, replace=False).tolist() for _ in range(n_requests)]
+    latencies, errors = [], []
+    start = time.perf_counter()
+    await asyncio.gather(*[_client(url, f'/recommend/{algorithm}',
+                                   queries[i::concurrency], top_n, latencies, errors)
+                           for i in range(concurrency)])
+    elapsed = time.perf_counter() - start
+    latencies = np.array(latencies) * 1000
+    return {'requests': len(latencies), 'errors': len(errors),
+            'p50_ms': float(np.percentile(latencies, 50)),
+            'p99_ms': float(np.percentile(latencies, 99)),
+            'rps': len(latencies) / elapsed}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Recommendation service load test.')
+    parser.add_argument('--url', default='http://127.0.0.1:8000')
+    parser.add_argument('--algorithm', choices=['content', 'collab'], default='content')
+    parser.add_argument('--titles', default=None,
+                        help='Dataset to draw favourite movies from.')
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--top-n', type=int, default=10)
+    args = parser.parse_args()
+
+    titles_path = args.titles or {'content': 'resources/data/content_data_clean.csv',
+                                  'collab': 'resources/data/filtered_ratings_data.csv'}[args.algorithm]
+    titles = load_movie_titles(titles_path)
+    results = asyncio.run(load_test(args.url, args.algorithm, titles, args.requests,
+                                    args.concurrency, args.top_n))
+    print(f"{results['requests']} requests ({results['errors']} errors) over "
+          f"{args.concurrency} connections")
+    print(f"p50 {results['p50_ms']:.1f} ms, p99 {results['p99_ms']:.1f} ms, "
+          f"{results['rps']:.1f} requests/s")
+
+
+if __name__ == '__main__':
+    main()
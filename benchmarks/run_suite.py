@@ -0,0 +1,272 @@
+"""
+
+    Reproducible benchmark suite of the recommenders and the Movie Filter.
+
+    Author: Explore Data Science Academy.
+
+    Description: Generates (or reuses) a synthetic dataset of the chosen
+    scale with `benchmarks/synthetic_data.py`, then runs each scenario in
+    a fresh interpreter whose working directory is the synthetic dataset,
+    so that the app's relative paths resolve to it. Every scenario
+    reports:
+
+        cold_start_s     - import of the module plus the first query,
+                           which loads every artifact
+        p50_ms / p99_ms  - latency of single queries (cache cleared)
+        batch_per_s      - throughput of queries answered back to back
+                           (batch scoring for the recommenders)
+        peak_rss_mib     - peak resident memory of the scenario's process
+
+    Results are written as JSON. The run fails (exit code 1) if any
+    scenario fails. When a baseline is given, every metric is compared
+    against it, and the run also fails if any regressed by more than the
+    tolerance, or if a scenario of the baseline has no results.
+
+    Run from the root of the repository:
+
+        python benchmarks/run_suite.py --scale small --output results.json
+        python benchmarks/run_suite.py --scale small --baseline results.json
+
+"""
+# Script dependencies
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import resource
+import tempfile
+import subprocess
+import numpy as np
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+
+SCENARIOS = ['content', 'collab', 'movie_filter']
+
+# Whether a larger value of each metric is better.
+HIGHER_IS_BETTER = {'cold_start_s': False, 'p50_ms': False, 'p99_ms': False,
+                    'batch_per_s': True, 'peak_rss_mib': False}
+
+
+def _favourite_lists(titles, n_lists, seed=0):
+    rng = np.random.default_rng(seed)
+    return [rng.choice(titles, 3, replace=False).tolist() for _ in range(n_lists)]
+
+
+def _latencies(func, queries, before=None):
+    """Milliseconds taken by `func(query)` for each query."""
+    latencies = []
+    for query in queries:
+        if before is not None:
+            before()
+        start = time.perf_counter()
+        func(query)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+def peak_rss_mib():
+    """Peak resident memory of the current process, in MiB.
+
+    Read from `VmHWM`, which starts afresh with each executed program,
+    whereas `ru_maxrss` carries over the high-water mark of the parent.
+    """
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    # Without procfs; ru_maxrss is in KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_scenario(scenario, n_queries, n_batch, top_n=10):
+    """Run one scenario within the current process (the synthetic root).
+
+    Returns
+    -------
+    dict
+        Metrics of the scenario.
+
+    """
+    start = time.perf_counter()
+    if scenario == 'movie_filter':
+        from utils.movie_search import load_search_index
+        from benchmarks.bench_movie_search import keystrokes
+        index = load_search_index('resources/data/content_separated.csv')
+        index.filter(genres='comedy')
+        cold_start = time.perf_counter() - start
+
+        people = index.display['Cast'].str.split('|').str[0].dropna().unique()
+        rng = np.random.default_rng(0)
+        queries = []
+        while len(queries) < n_queries:
+            genre = rng.choice(['comedy', 'drama', 'action', 'horror', 'romance'])
+            queries += keystrokes(genre, str(rng.choice(people)).lower(),
+                                  str(rng.integers(1920, 2020))[:3])
+        queries = queries[:n_queries]
+        run = lambda query: index.filter(genres=query[0], title_cast=query[1],
+                                         release_year=query[2])
+        latencies = _latencies(run, queries)
+        batch_start = time.perf_counter()
+        for query in queries[:n_batch]:
+            run(query)
+        batch_per_s = min(n_batch, len(queries)) / (time.perf_counter() - batch_start)
+    else:
+        from recommenders.batch import recommend_shard
+        from recommenders.cache import get_cache
+        from utils.data_loader import load_movie_titles
+        if scenario == 'content':
+            from recommenders.content_based import content_model as model
+            titles = load_movie_titles('resources/data/content_data_clean.csv')
+        else:
+            from recommenders.collaborative_based import collab_model as model
+            titles = load_movie_titles('resources/data/filtered_ratings_data.csv')
+        model(titles[:3], top_n)
+        cold_start = time.perf_counter() - start
+
+        queries = _favourite_lists(titles, n_queries)
+        latencies = _latencies(lambda query: model(query, top_n), queries,
+                               before=get_cache().clear)
+        shard = [(str(i), query) for i, query in
+                 enumerate(_favourite_lists(titles, n_batch, seed=1))]
+        batch_start = time.perf_counter()
+        recommend_shard((scenario, top_n, shard))
+        batch_per_s = n_batch / (time.perf_counter() - batch_start)
+
+    return {'cold_start_s': cold_start,
+            'p50_ms': float(np.percentile(latencies, 50)),
+            'p99_ms': float(np.percentile(latencies, 99)),
+            'batch_per_s': batch_per_s,
+            'peak_rss_mib': peak_rss_mib()}
+
+
+def run_suite(data_root, scenarios, n_queries, n_batch, log=print):
+    """Run each scenario in a fresh interpreter within `data_root`.
+
+    Returns
+    -------
+    tuple (dict, dict)
+        Metrics of each scenario which completed, and the error output of
+        each which failed.
+
+    """
+    results, failures = {}, {}
+    for scenario in scenarios:
+        command = [sys.executable, '-W', 'ignore', os.path.abspath(__file__),
+                   '--child', scenario, '--queries', str(n_queries),
+                   '--batch', str(n_batch)]
+        env = dict(os.environ, PYTHONPATH=ROOT)
+        completed = subprocess.run(command, cwd=data_root, env=env,
+                                   capture_output=True, text=True)
+        if completed.returncode != 0:
+            log(f"{scenario} failed:\n{completed.stderr}")
+            # The last line of the traceback names the error
+            failures[scenario] = (completed.stderr.strip().splitlines() or [''])[-1]
+            continue
+        results[scenario] = json.loads(completed.stdout.strip().splitlines()[-1])
+        log(f"{scenario}: " + ', '.join(f'{name} {value:.3f}'
+                                        for name, value in results[scenario].items()))
+    return results, failures
+
+
+def compare(results, baseline, tolerance=0.10):
+    """Metrics which regressed by more than `tolerance` against `baseline`.
+
+    Returns
+    -------
+    list (tuple)
+        (scenario, metric, baseline value, new value) of each regression.
+
+    """
+    regressions = []
+    for scenario, metrics in results.items():
+        for metric, value in metrics.items():
+            previous = baseline.get(scenario, {}).get(metric)
+            if previous is None or previous == 0:
+                continue
+            change = (value - previous) / previous
+            worse = -change if HIGHER_IS_BETTER[metric] else change
+            if worse > tolerance:
+                regressions.append((scenario, metric, previous, value))
+    return regressions
+
+
+def missing(results, baseline):
+    """Scenarios of `baseline` without results."""
+    return [scenario for scenario in baseline if scenario not in results]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Recommender benchmark suite.')
+    parser.add_argument('--child', choices=SCENARIOS, help=argparse.SUPPRESS)
+    parser.add_argument('--scale', default='tiny',
+                        help='Named dataset size of benchmarks/synthetic_data.py.')
+    parser.add_argument('--ratings', type=int, default=None)
+    parser.add_argument('--movies', type=int, default=None)
+    parser.add_argument('--users', type=int, default=None)
+    parser.add_argument('--data-dir', default=None,
+                        help='Where the synthetic dataset is generated, or reused from.')
+    parser.add_argument('--scenarios', nargs='+', choices=SCENARIOS, default=SCENARIOS)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--batch', type=int, default=1000)
+    parser.add_argument('--output', default=None, help='JSON file for the results.')
+    parser.add_argument('--baseline', default=None, help='JSON results to compare with.')
+    parser.add_argument('--tolerance', type=float, default=0.10)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_scenario(args.child, args.queries, args.batch)))
+        return
+
+    from benchmarks.synthetic_data import SCALES, generate
+    n_ratings, n_movies, n_users = SCALES[args.scale]
+    config = {'ratings': args.ratings or n_ratings, 'movies': args.movies or n_movies,
+              'users': args.users or n_users, 'queries': args.queries,
+              'batch': args.batch}
+    data_root = args.data_dir or os.path.join(
+        tempfile.gettempdir(), 'recommender-benchmarks',
+        f"{config['ratings']}-{config['movies']}-{config['users']}")
+    if not os.path.exists(os.path.join(data_root, 'synthetic.json')):
+        generate(data_root, config['ratings'], config['movies'], config['users'])
+
+    results, failures = run_suite(data_root, args.scenarios, args.queries, args.batch)
+    report = {'config': config,
+              'environment': {'python': platform.python_version(),
+                              'platform': platform.platform(),
+                              'cpu_count': os.cpu_count()},
+              'results': results,
+              'failures': failures}
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.output}")
+
+    failed = bool(failures)
+    for scenario, error in failures.items():
+        print(f"Failed: {scenario} ({error})")
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get('config') != config:
+            print("Warning: the baseline was run with a different configuration.")
+        regressions = compare(results, baseline['results'], args.tolerance)
+        for scenario, metric, previous, value in regressions:
+            print(f"Regression: {scenario} {metric} {previous:.3f} -> {value:.3f}")
+        absent = [scenario for scenario in missing(results, baseline['results'])
+                  if scenario not in failures]
+        for scenario in absent:
+            print(f"Missing: {scenario} has baseline results but was not run")
+        failed = failed or bool(regressions) or bool(absent)
+        if not failed:
+            print(f"No regressions beyond {args.tolerance:.0%} against {args.baseline}")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
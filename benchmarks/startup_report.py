@@ -0,0 +1,85 @@
+"""
+
+    Startup timing report for the app's modules and artifacts.
+
+    Author: Explore Data Science Academy.
+
+    Description: Imports the app's modules in a fresh interpreter with
+    `python -X importtime`, and reports the cumulative import cost of each
+    of them (and of their heavy third-party dependencies). It then loads
+    every artifact registered with `recommenders.registry`, reporting the
+    time each took, which is what the first request for each algorithm
+    pays when it has not been warmed up.
+
+    Run from the root of the repository:
+
+        python benchmarks/startup_report.py
+
+"""
+# Script dependencies
+import os
+import sys
+import subprocess
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+
+# Modules imported by the app, in the order the app imports them.
+APP_MODULES = ['utils.data_loader',
+               'utils.columnar',
+               'recommenders.collaborative_based',
+               'recommenders.content_based',
+               'recommenders.registry']
+
+# Third-party packages whose import cost is worth singling out.
+DEPENDENCIES = ['numpy', 'pandas', 'scipy.sparse', 'sklearn', 'streamlit']
+
+
+def import_times(modules):
+    """Cumulative import time, in seconds, of each importable module.
+
+    Every module is imported within the same fresh interpreter, so a
+    module's cost excludes dependencies already imported before it.
+    """
+    code = (f'for name in {modules!r}:\n'
+            '    try:\n'
+            '        __import__(name)\n'
+            '    except Exception:\n'
+            '        print(name)\n')
+    result = subprocess.run([sys.executable, '-W', 'ignore', '-X', 'importtime',
+                             '-c', code], capture_output=True, text=True, cwd=ROOT)
+    failed = set(result.stdout.split())
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or '|' not in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        name = name.strip()
+        if name in modules and name not in failed and cumulative.strip().isdigit():
+            times[name] = int(cumulative) / 1e6
+    return times
+
+
+def main():
+    print('Import cost (cumulative, in import order):')
+    modules = DEPENDENCIES + APP_MODULES
+    times = import_times(modules)
+    for name in modules:
+        seconds = times.get(name)
+        shown = f'{seconds:.3f} s' if seconds is not None else 'not importable'
+        print(f'  {name:<36} {shown:>14}')
+
+    print('\nArtifact load cost (first use):')
+    from recommenders import registry
+    import recommenders.collaborative_based
+    import recommenders.content_based
+    for name in registry.names():
+        try:
+            registry.get(name)
+            print(f'  {name:<36} {registry.load_times()[name]:>12.3f} s')
+        except Exception as e:
+            print(f'  {name:<36} {"failed":>14} ({e})')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,230 @@
+"""
+
+    Synthetic MovieLens-shaped datasets for benchmarking.
+
+    Author: Explore Data Science Academy.
+
+    Description: Generates, within a self-contained directory laid out
+    like the root of this repository, every dataset read by the app:
+    `movies.csv`, `ratings.csv`, `filtered_ratings_data.csv`,
+    `content_data_clean.csv` and `content_separated.csv`, plus the model
+    artifacts normally built offline (the TF-IDF content index and the
+    collaborative factors). Sizes range from a few thousand ratings up to
+    MovieLens 25M scale.
+
+    Movie popularity and user activity follow Zipf-like distributions,
+    ratings come from random biases and latent factors, and overviews are
+    drawn from per-genre vocabularies, so that the shapes of posting
+    lists, neighbourhoods and TF-IDF vectors resemble the real data. The
+    same seed always produces the same datasets.
+
+    Run from the root of the repository:
+
+        python benchmarks/synthetic_data.py /tmp/movielens-1m --ratings 1000000 --movies 20000
+
+"""
+# Script dependencies
+import os
+import sys
+import json
+import argparse
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from recommenders.content_index import build_content_index, save_content_index
+from recommenders.factors import SVDFactors
+
+GENRES = ['Action', 'Adventure', 'Animation', 'Children', 'Comedy', 'Crime',
+          'Documentary', 'Drama', 'Fantasy', 'Horror', 'Musical', 'Mystery',
+          'Romance', 'Sci-Fi', 'Thriller', 'War', 'Western']
+
+# Named dataset sizes: (ratings, movies, users).
+SCALES = {'tiny': (10_000, 10_000, 500),
+          'small': (1_000_000, 20_000, 7_000),
+          'medium': (5_000_000, 62_000, 40_000),
+          'large': (25_000_000, 100_000, 160_000)}
+
+
+def _words(rng, n, syllables=('ka', 'to', 'mi', 'ra', 'ne', 'so', 'lu', 'be',
+                              'di', 'fa', 'go', 'hi', 'jo', 'pe', 'vi', 'ze')):
+    """`n` random pronounceable words."""
+    lengths = rng.integers(2, 5, n)
+    picks = rng.choice(list(syllables), lengths.sum())
+    bounds = np.concatenate([[0], np.cumsum(lengths)])
+    return [''.join(picks[bounds[i]:bounds[i + 1]]) for i in range(n)]
+
+
+def generate_movies(n_movies, rng, words_per_overview=40, vocabulary_size=20000):
+    """Movies with titles, genres, credits and overviews.
+
+    Returns
+    -------
+    pd.DataFrame
+        One row per movie, with the columns of `content_separated.csv`
+        plus `cleaned_overview`.
+
+    """
+    vocabulary = np.array(_words(rng, vocabulary_size))
+    people = np.array([f'{a.capitalize()} {b.capitalize()}'
+                       for a, b in zip(_words(rng, 20000), _words(rng, 20000))])
+    title_words = np.array([w.capitalize() for w in _words(rng, 5000)])
+
+    years = rng.integers(1920, 2020, n_movies)
+    n_genres = rng.integers(1, 4, n_movies)
+    genre_codes = [rng.choice(len(GENRES), k, replace=False) for k in n_genres]
+    # Each genre favours its own slice of the vocabulary
+    genre_topics = rng.integers(0, vocabulary_size, (len(GENRES), 200))
+
+    titles, genres, overviews = [], [], []
+    for movie in range(n_movies):
+        words = rng.choice(title_words, rng.integers(1, 4))
+        titles.append(f"{' '.join(words)} {movie} ({years[movie]})")
+        genres.append('|'.join(GENRES[g] for g in genre_codes[movie]))
+        topical = genre_topics[rng.choice(genre_codes[movie], words_per_overview // 2)]
+        topical = topical[np.arange(len(topical)), rng.integers(0, 200, len(topical))]
+        general = rng.integers(0, vocabulary_size, words_per_overview - len(topical))
+        overviews.append(' '.join(vocabulary[np.concatenate([topical, general])]))
+
+    cast = rng.choice(people, (n_movies, 4))
+    return pd.DataFrame({
+        'movieId': np.arange(1, n_movies + 1),
+        'title': titles,
+        'genres': genres,
+        'release_year': years.astype(float),
+        'title_cast': ['|'.join(row) for row in cast],
+        'director': rng.choice(people, n_movies),
+        'overview': overviews,
+        'plot_keywords': [' '.join(vocabulary[rng.integers(0, vocabulary_size, 5)])
+                          for _ in range(n_movies)],
+        'cleaned_overview': overviews,
+    })
+
+
+def generate_ratings(n_ratings, n_movies, n_users, rng, n_factors=10):
+    """Ratings with Zipf-like user activity and movie popularity.
+
+    Returns
+    -------
+    pd.DataFrame
+        Ratings with `userId`, `movieId`, `rating` and `timestamp` columns,
+        without duplicate (user, movie) pairs.
+
+    """
+    popularity = 1.0 / np.arange(1, n_movies + 1) ** 0.9
+    activity = 1.0 / np.arange(1, n_users + 1) ** 0.6
+    # Over-sample, since duplicate pairs are dropped
+    n_draws = int(n_ratings * 1.2) + 100
+    users = rng.choice(n_users, n_draws, p=activity / activity.sum())
+    movies = rng.permutation(n_movies)[rng.choice(n_movies, n_draws,
+                                                  p=popularity / popularity.sum())]
+    pairs = np.unique(users.astype(np.int64) * n_movies + movies)
+    pairs = rng.permutation(pairs)[:n_ratings]
+    users, movies = pairs // n_movies, pairs % n_movies
+
+    user_factors = rng.normal(0, 0.3, (n_users, n_factors))
+    movie_factors = rng.normal(0, 0.3, (n_movies, n_factors))
+    score = (3.5 + rng.normal(0, 0.4, n_users)[users] + rng.normal(0, 0.5, n_movies)[movies]
+             + np.einsum('ij,ij->i', user_factors[users], movie_factors[movies])
+             + rng.normal(0, 0.5, len(pairs)))
+    ratings = np.clip(np.round(score * 2) / 2, 0.5, 5.0)
+    return pd.DataFrame({'userId': users + 1, 'movieId': movies + 1,
+                         'rating': ratings,
+                         'timestamp': rng.integers(800_000_000, 1_600_000_000, len(pairs))})
+
+
+def random_factors(ratings, n_factors, rng):
+    """Collaborative factors over the users and movies of `ratings`.
+
+    Benchmarks measure speed rather than accuracy, so the factors are
+    random instead of trained.
+    """
+    user_ids = np.unique(ratings['userId'].values)
+    item_ids = np.unique(ratings['movieId'].values)
+    return SVDFactors(rng.normal(0, 0.1, (len(user_ids), n_factors)).astype(np.float32),
+                      rng.normal(0, 0.1, (len(item_ids), n_factors)).astype(np.float32),
+                      rng.normal(0, 0.3, len(user_ids)).astype(np.float32),
+                      rng.normal(0, 0.3, len(item_ids)).astype(np.float32),
+                      float(ratings['rating'].mean()), (0.5, 5.0), user_ids, item_ids)
+
+
+def generate(root, n_ratings, n_movies, n_users, n_factors=100, seed=42,
+             filtered_users=None, log=print):
+    """Write every synthetic dataset and artifact beneath `root`.
+
+    Parameters
+    ----------
+    root : str
+        Directory laid out like the root of the repository.
+    n_ratings : int
+        Number of ratings in `ratings.csv`.
+    n_movies : int
+        Number of movies.
+    n_users : int
+        Number of users.
+    n_factors : int
+        Number of latent factors of the collaborative model.
+    seed : int
+        Seed of the random generator.
+    filtered_users : int
+        Number of most active users kept in `filtered_ratings_data.csv`.
+        Defaults to every user.
+
+    """
+    rng = np.random.default_rng(seed)
+    data_dir = os.path.join(root, 'resources', 'data')
+    models_dir = os.path.join(root, 'resources', 'models')
+    os.makedirs(data_dir, exist_ok=True)
+    os.makedirs(models_dir, exist_ok=True)
+
+    movies = generate_movies(n_movies, rng)
+    movies[['movieId', 'title', 'genres']].to_csv(
+        os.path.join(data_dir, 'movies.csv'), index=False)
+    movies.drop(columns='cleaned_overview').to_csv(
+        os.path.join(data_dir, 'content_separated.csv'), index=False)
+    movies[['movieId', 'title', 'genres', 'cleaned_overview']].to_csv(
+        os.path.join(data_dir, 'content_data_clean.csv'), index=False)
+    log(f"Wrote {n_movies} movies")
+
+    ratings = generate_ratings(n_ratings, n_movies, n_users, rng)
+    ratings.to_csv(os.path.join(data_dir, 'ratings.csv'), index=False)
+    n_written = len(ratings)
+    log(f"Wrote {n_written} ratings")
+
+    if filtered_users is not None:
+        active = ratings['userId'].value_counts().index[:filtered_users]
+        ratings = ratings[ratings['userId'].isin(active)]
+    filtered = ratings.drop(columns='timestamp').merge(
+        movies[['movieId', 'title']], on='movieId')
+    filtered.to_csv(os.path.join(data_dir, 'filtered_ratings_data.csv'), index=False)
+
+    # Artifacts normally built offline
+    save_content_index(build_content_index(movies),
+                       os.path.join(models_dir, 'content_tfidf.npz'),
+                       os.path.join(models_dir, 'content_tfidf_meta.pkl'))
+    random_factors(filtered, n_factors, rng).save(
+        os.path.join(models_dir, 'collab_factors'))
+    with open(os.path.join(root, 'synthetic.json'), 'w') as f:
+        json.dump({'ratings': n_written, 'movies': n_movies, 'users': n_users,
+                   'n_factors': n_factors, 'seed': seed}, f, indent=2)
+    log(f"Wrote model artifacts to {models_dir}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate synthetic datasets.')
+    parser.add_argument('root', help='Directory to write the datasets within.')
+    parser.add_argument('--scale', choices=list(SCALES), default='tiny')
+    parser.add_argument('--ratings', type=int, default=None)
+    parser.add_argument('--movies', type=int, default=None)
+    parser.add_argument('--users', type=int, default=None)
+    parser.add_argument('--factors', type=int, default=100)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    n_ratings, n_movies, n_users = SCALES[args.scale]
+    generate(args.root, args.ratings or n_ratings, args.movies or n_movies,
+             args.users or n_users, args.factors, args.seed)
+
+
+if __name__ == '__main__':
+    main()
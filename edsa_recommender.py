@@ -27,21 +27,51 @@
 """
 # Streamlit dependencies
 import streamlit as st
+import os
 
 # Data handling dependencies
 import pandas as pd
 import numpy as np
 
 # Custom Libraries
-from utils.data_loader import load_movie_titles
-from recommenders.collaborative_based import collab_model
-from recommenders.content_based import content_model
+from utils import metrics
+with metrics.timed_import('utils.data_loader'):
+    from utils.data_loader import load_movie_titles
+with metrics.timed_import('recommenders.collaborative_based'):
+    import recommenders.collaborative_based
+with metrics.timed_import('recommenders.content_based'):
+    import recommenders.content_based
+with metrics.timed_import('recommenders.hybrid'):
+    from recommenders.hybrid import CONTENT_WEIGHT
+with metrics.timed_import('utils.app_resources'):
+    from utils import app_resources
+from recommenders import registry
+from recommenders.cache import get_cache
 
 # Data Loading
+# Datasets and models are held in Streamlit's process-wide caches (see
+# `utils/app_resources.py`), so reruns and sessions share one copy.
 # title_list = load_movie_titles('resources/data/movies.csv')
-content_data = load_movie_titles('resources/data/content_data_clean.csv')
-collab_data = load_movie_titles('resources/data/filtered_ratings_data.csv')
-content_separated = pd.read_csv('resources/data/content_separated.csv')
+content_data = app_resources.movie_titles('resources/data/content_data_clean.csv')
+collab_data = app_resources.movie_titles('resources/data/filtered_ratings_data.csv')
+
+# Recommendations are served by `recommenders/service.py` instead of
+# in-process when its URL is set (e.g. http://127.0.0.1:8000), falling
+# back to the in-process models if it cannot be reached.
+RECOMMENDER_SERVICE_URL = os.environ.get('RECOMMENDER_SERVICE_URL')
+
+# Models are loaded on first use. Optionally start loading them in the
+# background straight away, so the first recommendation is not delayed.
+WARM_UP_MODELS = True
+models = app_resources.recommenders(RECOMMENDER_SERVICE_URL, WARM_UP_MODELS)
+content_model = models['content']
+collab_model = models['collab']
+hybrid_model = models['hybrid']
+
+# Show the timings and call counts recorded by `utils.metrics`, with an
+# action reloading every dataset and model of the process. Opt in with the
+# RECOMMENDER_DIAGNOSTICS environment variable.
+SHOW_DIAGNOSTICS = os.environ.get('RECOMMENDER_DIAGNOSTICS', '') not in ('', '0')
 
 # App declaration
 def main():
@@ -49,6 +79,8 @@ def main():
     # DO NOT REMOVE the 'Recommender System' option below, however,
     # you are welcome to add more options to enrich your app.
     page_options = ["About", "Movie Filter", "Current Trends", "Recommender System", "Algorithmic Analysis"]
+    if SHOW_DIAGNOSTICS:
+        page_options.append("Diagnostics")
 
     # -------------------------------------------------------------------
     # ----------- !! THIS CODE MUST NOT BE ALTERED !! -------------------
@@ -164,6 +196,35 @@ def main():
     # -------------------------------------------------------------------
 
     # ------------- SAFE FOR ALTERING/EXTENSION -------------------
+    # Hybrid filtering, offered beneath the two algorithms above
+    if page_selection == "Recommender System":
+        st.write('### Hybrid Filtering')
+        if st.checkbox('Blend content and collaborative scores instead'):
+            st.write('Content similarity and predicted ratings are combined; movies '
+                     'without ratings are given an average predicted rating.')
+            content_weight = st.slider('Weight of content similarity', 0.0, 1.0,
+                                       CONTENT_WEIGHT, 0.1)
+            movie_1 = st.selectbox('First Option', content_data, key='hybrid_1')
+            movie_2 = st.selectbox('Second Option', content_data, key='hybrid_2')
+            movie_3 = st.selectbox('Third Option', content_data, key='hybrid_3')
+            fav_movies = [movie_1,movie_2,movie_3]
+            if st.button("Recommend", key='hybrid_recommend'):
+                try:
+                    with st.spinner('Crunching the numbers...'):
+                        top_recommendations = hybrid_model(
+                            fav_movies, top_n=5, content_weight=content_weight,
+                            collab_weight=1 - content_weight)
+                    if top_recommendations:
+                        st.title("We think you'll like:")
+                    else:
+                        st.title("Unfortunately there is not enough data on the selected movies to return recommendations")
+                    for i,j in enumerate(top_recommendations):
+                        st.subheader(str(i+1)+'. '+j)
+                except Exception as e:
+                    st.error("Oops! Looks like this algorithm does't work.\
+                              We'll need to fix it!")
+                    print(e)
+
     if page_selection == "Algorithmic Analysis":
 
         st.image('resources/imgs/CineMatch (1).png',use_column_width=True)
@@ -215,12 +276,6 @@ def main():
         st.write("Looking for a Comedy with Tom Hanks? We have you covered.") 
         st.write("This interactive filtering system will display all the movies in our database that match your specific search criteria.")
 
-        columns = {'title': 'Title','genres': 'Genres','release_year' : 'Release Year','title_cast' : 'Cast', 'director': 'Director'}
-        display_content_data = content_separated.drop('overview', axis=1).drop('movieId', axis=1).drop('plot_keywords', axis=1)
-        display_content_data['release_year'] = display_content_data['release_year'].astype(str)
-        display_content_data.rename(columns=columns, inplace=True)
-        display_content_data.dropna()
-
         cols = st.columns(5)
 
         with cols[0]:
@@ -234,24 +289,9 @@ def main():
         with cols[4]:
             director = st.text_input("Enter a director", "")
 
-        title = title.split(" ") if title != '' else []
-        title = [word.lower() for word in title]
-        genre = genre.split(" ") if genre != '' else []
-        genre = [word.lower() for word in genre]
-        release_year = release_year.split(" ") if release_year != '' else []
-        release_year = [word.lower() for word in release_year]
-        cast = cast.split(" ") if cast != '' else []
-        cast = [word.lower() for word in cast]
-        director = director.split(" ") if director != '' else []
-        director = [word.lower() for word in director]
-
-        filtered_df = display_content_data[
-            (display_content_data['Title'].apply(lambda x: isinstance(x, str) and all(string in x.lower() for string in title))) &
-            (display_content_data['Genres'].apply(lambda x: isinstance(x, str) and all(string in x.lower() for string in genre))) &
-            ((len(release_year) == 0) | (display_content_data['Release Year'].apply(lambda x: isinstance(x, str) and any(string in x.lower() for string in release_year)))) &
-            (display_content_data['Cast'].apply(lambda x: isinstance(x, str) and all(string in x.lower() for string in cast))) &
-            (display_content_data['Director'].apply(lambda x: isinstance(x, str) and all(string in x.lower() for string in director)))
-        ]
+        filtered_df = app_resources.filter_movies(
+            'resources/data/content_separated.csv', title=title, genres=genre,
+            release_year=release_year, title_cast=cast, director=director)
 
         
         st.dataframe(filtered_df)
@@ -266,8 +306,48 @@ def main():
         st.image('resources/imgs/popular.png',width = 1000)
         st.write("Explore the overall highest rated movies in our database.")
         st.image('resources/imgs/top_movies.png',width = 1000)
+
+    if page_selection == "Diagnostics":
+
+        st.title("Diagnostics")
+        diagnostics = metrics.snapshot()
+        # Kept outside the widget's state, which is dropped on other pages
+        st.session_state['trace_memory'] = st.checkbox(
+            "Record allocation peaks of this session's calls (tracemalloc)",
+            value=st.session_state.get('trace_memory', metrics.TRACE_MEMORY))
+
+        st.write("#### Time per stage")
+        st.dataframe(pd.DataFrame(
+            [{'Function': function, 'Stage': stage, 'Calls': count,
+              'Mean (ms)': total / count * 1000, 'Max (ms)': longest * 1000}
+             for (function, stage), (count, total, longest) in sorted(diagnostics['stages'].items())]))
+
+        st.write("#### Calls and errors")
+        st.dataframe(pd.DataFrame({'Calls': diagnostics['calls'],
+                                   'Errors': diagnostics['errors']}).fillna(0))
+
+        if diagnostics['memory_peaks']:
+            st.write("#### Peak memory allocated per call (MiB)")
+            st.dataframe(pd.Series(diagnostics['memory_peaks']) / 2**20)
+
+        st.write("#### Import and artifact load times (s)")
+        st.dataframe(pd.Series({**diagnostics['imports'], **registry.load_times()},
+                               dtype=float))
+
+        st.download_button("Download metrics (Prometheus format)",
+                           metrics.prometheus_text(), file_name='recommender_metrics.prom')
+
+        if st.button("Reload datasets and models"):
+            app_resources.invalidate()
+            st.rerun()
+
+    # Hit/miss/eviction counters of the recommendation cache
+    with st.sidebar.expander("Recommendation Cache"):
+        st.write(get_cache().stats())
     # ----------------------------------------------------------------
 
 
 if __name__ == '__main__':
-    main()
+    # Allocation peaks are only traced for the sessions which asked for them
+    with metrics.trace_memory(st.session_state.get('trace_memory', metrics.TRACE_MEMORY)):
+        main()
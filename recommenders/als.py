@@ -0,0 +1,241 @@
+"""
+
+    Parallel, out-of-core alternating least squares (ALS) training.
+
+    Author: Explore Data Science Academy.
+
+    Description: Helper functions to train a biased matrix factorization
+    model (the same model as surprise's `SVD`) on ratings too large to
+    comfortably hold as a pandas DataFrame.
+
+    Ratings are streamed from .csv in chunks into compact int32/float32
+    arrays on disk, with userId/movieId maps to dense indices. These are
+    grouped by user and by item into a `RatingStore`, which is
+    memory-mapped by a pool of worker processes. Each ALS half-epoch solves the factors and bias
+    of every user (then every item) independently, as a small ridge
+    regression, sharded across all cores.
+
+"""
+# Script dependencies
+import os
+import time
+import multiprocessing
+import numpy as np
+import pandas as pd
+from recommenders.factors import SVDFactors
+from recommenders.rating_store import RatingStore
+
+
+def stream_ratings(path_to_csv, out_dir, chunk_size=1_000_000):
+    """Convert a ratings .csv into dense-indexed arrays, chunk by chunk.
+
+    Parameters
+    ----------
+    path_to_csv : str
+        Ratings with `userId`, `movieId` and `rating` columns.
+    out_dir : str
+        Directory to which the arrays are written.
+    chunk_size : int
+        Number of .csv rows held in memory at once.
+
+    Returns
+    -------
+    dict
+        Paths of the written arrays, by name.
+
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    user_ids = pd.Index([], dtype=np.int64)
+    item_ids = pd.Index([], dtype=np.int64)
+    raw_paths = {name: os.path.join(out_dir, f'{name}.bin')
+                 for name in ('users', 'items', 'ratings')}
+    files = {name: open(path, 'wb') for name, path in raw_paths.items()}
+    n_ratings = 0
+    try:
+        for chunk in pd.read_csv(path_to_csv, usecols=['userId', 'movieId', 'rating'],
+                                 chunksize=chunk_size):
+            new_users = pd.Index(chunk['userId'].unique()).difference(user_ids)
+            user_ids = user_ids.append(new_users)
+            new_items = pd.Index(chunk['movieId'].unique()).difference(item_ids)
+            item_ids = item_ids.append(new_items)
+            files['users'].write(user_ids.get_indexer(chunk['userId']).astype(np.int32).tobytes())
+            files['items'].write(item_ids.get_indexer(chunk['movieId']).astype(np.int32).tobytes())
+            files['ratings'].write(chunk['rating'].to_numpy(np.float32).tobytes())
+            n_ratings += len(chunk)
+    finally:
+        for f in files.values():
+            f.close()
+
+    paths = {}
+    for name, dtype in (('users', np.int32), ('items', np.int32), ('ratings', np.float32)):
+        paths[name] = os.path.join(out_dir, f'{name}.npy')
+        data = np.memmap(raw_paths[name], dtype=dtype, mode='r', shape=(n_ratings,))
+        np.save(paths[name], data)
+        del data
+        os.remove(raw_paths[name])
+    for name, ids in (('user_ids', user_ids), ('item_ids', item_ids)):
+        paths[name] = os.path.join(out_dir, f'{name}.npy')
+        np.save(paths[name], ids.to_numpy(np.int64))
+    return paths
+
+
+def build_store(path_to_csv, work_dir, chunk_size=1_000_000):
+    """Stream a ratings .csv into a `RatingStore` saved within `work_dir`.
+
+    Returns
+    -------
+    RatingStore
+        The saved store, memory-mapped.
+
+    """
+    paths = stream_ratings(path_to_csv, work_dir, chunk_size)
+    store = RatingStore.from_codes(np.load(paths['users'], mmap_mode='r'),
+                                   np.load(paths['items'], mmap_mode='r'),
+                                   np.load(paths['ratings'], mmap_mode='r'),
+                                   np.load(paths['user_ids']), np.load(paths['item_ids']))
+    store_dir = os.path.join(work_dir, 'store')
+    store.save(store_dir)
+    del store
+    for path in paths.values():
+        os.remove(path)
+    return RatingStore.load(store_dir)
+
+
+def solve_rows(rows, indptr, indices, values, fixed, fixed_bias,
+               global_mean, reg, biased=True):
+    """Solve the factors (and bias) of each row, holding the other side fixed.
+
+    For row u with ratings r_ui of items i, minimizes
+        sum_i (r_ui - mu - b_i - [x_u, b_u] . [q_i, 1])^2 + reg * n_u * |[x_u, b_u]|^2
+    i.e. a ridge regression with regularization scaled by the number of
+    ratings (ALS-WR).
+
+    Returns
+    -------
+    np.ndarray (float)
+        Solutions of shape (len(rows), n_factors [+ 1 if biased]).
+
+    """
+    n_factors = fixed.shape[1]
+    width = n_factors + 1 if biased else n_factors
+    solutions = np.zeros((len(rows), width), dtype=np.float32)
+    identity = np.eye(width)
+    for k, row in enumerate(rows):
+        start, stop = indptr[row], indptr[row + 1]
+        if start == stop:
+            continue
+        others = indices[start:stop]
+        target = values[start:stop].astype(np.float64) - global_mean
+        design = np.asarray(fixed[others], dtype=np.float64)
+        if biased:
+            target -= fixed_bias[others]
+            design = np.hstack([design, np.ones((len(others), 1))])
+        gram = design.T @ design + reg * len(others) * identity
+        solutions[k] = np.linalg.solve(gram, design.T @ target)
+    return solutions
+
+
+# Memory-mapped rating store of each worker process, by side.
+_worker_arrays = {}
+
+def _init_worker(store_dir):
+    store = RatingStore.load(store_dir)
+    _worker_arrays['user'] = (store.user_indptr, store.user_items, store.user_ratings)
+    _worker_arrays['item'] = (store.item_indptr, store.item_users, store.item_ratings)
+
+
+def _solve_shard(args):
+    side, start, stop, fixed_path, bias_path, global_mean, reg, biased = args
+    fixed = np.load(fixed_path, mmap_mode='r')
+    fixed_bias = np.load(bias_path, mmap_mode='r')
+    return start, solve_rows(range(start, stop), *_worker_arrays[side],
+                             fixed, fixed_bias, global_mean, reg, biased)
+
+
+def rmse(store, factors, chunk_size=1_000_000):
+    """Root mean squared error of the factors over the ratings of `store`."""
+    squared_error = 0.0
+    for start in range(0, len(store), chunk_size):
+        positions = np.arange(start, min(start + chunk_size, len(store)))
+        u = np.searchsorted(store.user_indptr, positions, side='right') - 1
+        i = np.asarray(store.user_items[start:start + chunk_size])
+        est = factors.predict_pairs(u, i)
+        squared_error += ((np.asarray(store.user_ratings[start:start + chunk_size])
+                           - est) ** 2).sum()
+    return float(np.sqrt(squared_error / max(len(store), 1)))
+
+
+def train_als(path_to_csv, work_dir, n_factors=200, n_epochs=15, reg=0.05,
+              init_std_dev=0.05, n_workers=None, shard_size=2048,
+              chunk_size=1_000_000, seed=0, log=print):
+    """Train a biased matrix factorization with multi-process ALS.
+
+    Parameters
+    ----------
+    path_to_csv : str
+        Ratings with `userId`, `movieId` and `rating` columns.
+    work_dir : str
+        Directory for the memory-mapped rating store.
+    n_factors : int
+        Number of latent factors.
+    n_epochs : int
+        Number of ALS epochs (each solving all users, then all items).
+    reg : float
+        Regularization, scaled by each row's number of ratings.
+    init_std_dev : float
+        Standard deviation of the initial factors.
+    n_workers : int
+        Number of worker processes. Defaults to every core.
+    shard_size : int
+        Number of users or items solved per task.
+    chunk_size : int
+        Number of .csv rows read at once.
+    log : callable
+        Function used to report progress.
+
+    Returns
+    -------
+    SVDFactors
+        Trained factors, biases and id maps.
+
+    """
+    start = time.perf_counter()
+    store = build_store(path_to_csv, work_dir, chunk_size)
+    ratings = store.user_ratings
+    n_users, n_items = store.n_users, store.n_items
+    log(f"Prepared {len(store)} ratings of {n_users} users and {n_items} "
+        f"items in {time.perf_counter() - start:.1f} s")
+
+    global_mean = float(np.mean(ratings, dtype=np.float64))
+    rating_scale = (float(ratings.min()), float(ratings.max()))
+    rng = np.random.default_rng(seed)
+    factors = SVDFactors(
+        rng.normal(0, init_std_dev, (n_users, n_factors)).astype(np.float32),
+        rng.normal(0, init_std_dev, (n_items, n_factors)).astype(np.float32),
+        np.zeros(n_users, dtype=np.float32), np.zeros(n_items, dtype=np.float32),
+        global_mean, rating_scale, np.asarray(store.user_ids),
+        np.asarray(store.item_ids))
+
+    n_workers = n_workers or os.cpu_count()
+    store_dir = os.path.join(work_dir, 'store')
+    with multiprocessing.Pool(n_workers, _init_worker, (store_dir,)) as pool:
+        for epoch in range(n_epochs):
+            epoch_start = time.perf_counter()
+            for side, n_rows, fixed, fixed_bias, target, target_bias in (
+                    ('user', n_users, factors.qi, factors.bi, factors.pu, factors.bu),
+                    ('item', n_items, factors.pu, factors.bu, factors.qi, factors.bi)):
+                # The fixed side is shared with the workers through a file
+                fixed_path = os.path.join(work_dir, f'{side}_fixed.npy')
+                bias_path = os.path.join(work_dir, f'{side}_fixed_bias.npy')
+                np.save(fixed_path, fixed)
+                np.save(bias_path, fixed_bias)
+                shards = [(side, lo, min(lo + shard_size, n_rows), fixed_path,
+                           bias_path, global_mean, reg, True)
+                          for lo in range(0, n_rows, shard_size)]
+                for lo, solutions in pool.imap_unordered(_solve_shard, shards):
+                    target[lo:lo + len(solutions)] = solutions[:, :n_factors]
+                    target_bias[lo:lo + len(solutions)] = solutions[:, n_factors]
+            elapsed = time.perf_counter() - epoch_start
+            log(f"Epoch {epoch + 1}/{n_epochs}: {elapsed:.1f} s, "
+                f"train RMSE {rmse(store, factors):.4f}")
+    return factors
@@ -0,0 +1,222 @@
+"""
+
+    Approximate nearest-neighbour index over item factors.
+
+    Author: Explore Data Science Academy.
+
+    Description: A pure NumPy inverted file (IVF) index for maximum inner
+    product search. Item vectors are clustered with k-means into a number
+    of inverted lists; a query only scores the items within the `nprobe`
+    lists whose centroids score highest against it, rather than the full
+    catalogue. `nprobe` is calibrated at build time to reach a target
+    recall against exact scoring.
+
+"""
+# Script dependencies
+import numpy as np
+from recommenders.scoring import top_k_indices
+
+# Default artifact location, relative to the root of the repository.
+ANN_INDEX_PATH = 'resources/models/collab_ann.npz'
+
+
+def kmeans(vectors, n_clusters, n_iter=20, seed=0, chunk_size=65536):
+    """Lloyd's k-means over the rows of `vectors`.
+
+    Parameters
+    ----------
+    vectors : np.ndarray (float)
+        Data of shape (n_samples, n_dims).
+    n_clusters : int
+        Number of clusters.
+    n_iter : int
+        Number of assignment/update rounds.
+    seed : int
+        Seed for the random choice of initial centroids.
+    chunk_size : int
+        Number of samples assigned at once, bounding memory use.
+
+    Returns
+    -------
+    tuple (np.ndarray, np.ndarray)
+        Centroids of shape (n_clusters, n_dims), and the cluster of each
+        sample.
+
+    """
+    rng = np.random.default_rng(seed)
+    vectors = np.asarray(vectors, dtype=np.float32)
+    centroids = vectors[rng.choice(len(vectors), n_clusters, replace=False)].copy()
+    assignment = np.zeros(len(vectors), dtype=np.int64)
+    for _ in range(n_iter):
+        centroid_norms = (centroids ** 2).sum(axis=1)
+        for start in range(0, len(vectors), chunk_size):
+            chunk = vectors[start:start + chunk_size]
+            distances = centroid_norms - 2 * chunk @ centroids.T
+            assignment[start:start + chunk_size] = distances.argmin(axis=1)
+        counts = np.bincount(assignment, minlength=n_clusters)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignment, vectors)
+        filled = counts > 0
+        centroids[filled] = sums[filled] / counts[filled, None]
+        # Re-seed empty clusters on random samples
+        empty = np.flatnonzero(~filled)
+        if empty.size:
+            centroids[empty] = vectors[rng.choice(len(vectors), empty.size, replace=False)]
+    return centroids, assignment
+
+
+class IVFIndex:
+    """Inverted file index for maximum inner product search.
+
+    Parameters
+    ----------
+    centroids : np.ndarray (float)
+        Centroid of each inverted list, of shape (n_lists, n_dims).
+    vectors : np.ndarray (float)
+        Indexed vectors, stored contiguously list by list.
+    ids : np.ndarray (int)
+        Original row of each stored vector.
+    indptr : np.ndarray (int)
+        Start of each inverted list within `vectors`, plus the end.
+    nprobe : int
+        Number of lists scored per query by default.
+
+    """
+
+    def __init__(self, centroids, vectors, ids, indptr, nprobe=1):
+        self.centroids = centroids
+        self.vectors = vectors
+        self.ids = ids
+        self.indptr = indptr
+        self.nprobe = int(nprobe)
+
+    def __len__(self):
+        return len(self.ids)
+
+    @property
+    def n_lists(self):
+        return len(self.centroids)
+
+    @classmethod
+    def build(cls, vectors, n_lists=None, n_iter=20, seed=0):
+        """Cluster `vectors` into inverted lists.
+
+        Parameters
+        ----------
+        vectors : np.ndarray (float)
+            Item vectors of shape (n_items, n_dims).
+        n_lists : int
+            Number of inverted lists. Defaults to sqrt(n_items).
+
+        Returns
+        -------
+        IVFIndex
+            Index with `nprobe` set to 1; see `calibrate`.
+
+        """
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if n_lists is None:
+            n_lists = int(np.sqrt(len(vectors)))
+        n_lists = max(1, min(n_lists, len(vectors)))
+        centroids, assignment = kmeans(vectors, n_lists, n_iter, seed)
+        order = np.argsort(assignment, kind='stable')
+        indptr = np.zeros(n_lists + 1, dtype=np.int64)
+        np.cumsum(np.bincount(assignment, minlength=n_lists), out=indptr[1:])
+        return cls(centroids, vectors[order], order, indptr)
+
+    def matches(self, vectors):
+        """Whether the index was built over exactly these item vectors.
+
+        An index built before the vectors were updated (e.g. by an
+        incremental update of the factors, which keeps the number of
+        items) would otherwise return candidates ranked by stale vectors.
+        """
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if vectors.shape != self.vectors.shape:
+            return False
+        return np.array_equal(self.vectors, vectors[self.ids])
+
+    def search(self, query, k, nprobe=None, exclude=(), allowed=None):
+        """Approximate top-k items by inner product with `query`.
+
+        Parameters
+        ----------
+        query : np.ndarray (float)
+            Query vector of shape (n_dims,).
+        k : int
+            Number of items to return.
+        nprobe : int
+            Number of inverted lists to score. Defaults to `self.nprobe`.
+        exclude : iterable (int)
+            Original rows which may not be returned.
+        allowed : np.ndarray (bool)
+            Optional mask over original rows of the items which may be
+            returned.
+
+        Returns
+        -------
+        tuple (np.ndarray, np.ndarray)
+            Original rows of the selected items, best first, and their
+            scores.
+
+        """
+        nprobe = min(self.nprobe if nprobe is None else nprobe, self.n_lists)
+        query = np.asarray(query, dtype=np.float32)
+        lists = top_k_indices(self.centroids @ query, nprobe)
+        positions = np.concatenate([np.arange(self.indptr[l], self.indptr[l + 1])
+                                    for l in lists])
+        candidates = self.ids[positions]
+        scores = self.vectors[positions] @ query
+        blocked = np.isin(candidates, np.asarray(list(exclude), dtype=np.int64))
+        if allowed is not None:
+            blocked |= ~allowed[candidates]
+        top = top_k_indices(scores, k, np.flatnonzero(blocked))
+        return candidates[top], scores[top]
+
+    def recall_at_k(self, queries, k, nprobe=None):
+        """Mean fraction of the exact top-k items found by `search`."""
+        exact = self.vectors @ np.asarray(queries, dtype=np.float32).T
+        found = 0
+        for j, query in enumerate(queries):
+            truth = self.ids[top_k_indices(exact[:, j], k)]
+            approx, _ = self.search(query, k, nprobe)
+            found += np.intersect1d(truth, approx).size
+        return found / (len(queries) * k)
+
+    def calibrate(self, queries, k=10, target_recall=0.95):
+        """Set `nprobe` to the smallest power of two reaching `target_recall`.
+
+        Parameters
+        ----------
+        queries : np.ndarray (float)
+            Representative queries of shape (n_queries, n_dims).
+        k : int
+            Number of items whose recall is measured.
+        target_recall : float
+            Required mean recall@k against exact scoring.
+
+        Returns
+        -------
+        float
+            Recall@k reached with the chosen `nprobe`.
+
+        """
+        nprobe = 1
+        while True:
+            recall = self.recall_at_k(queries, k, nprobe)
+            if recall >= target_recall or nprobe >= self.n_lists:
+                self.nprobe = nprobe
+                return recall
+            nprobe = min(nprobe * 2, self.n_lists)
+
+    def save(self, path=ANN_INDEX_PATH):
+        """Save the index to a .npz file."""
+        np.savez(path, centroids=self.centroids, vectors=self.vectors,
+                 ids=self.ids, indptr=self.indptr, nprobe=self.nprobe)
+
+    @classmethod
+    def load(cls, path=ANN_INDEX_PATH):
+        """Load an index previously written by `save`."""
+        with np.load(path) as data:
+            return cls(data['centroids'], data['vectors'], data['ids'],
+                       data['indptr'], int(data['nprobe']))
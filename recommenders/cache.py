@@ -0,0 +1,192 @@
+"""
+
+    Recommendation result cache shared by the recommenders.
+
+    Author: Explore Data Science Academy.
+
+    Description: Caches the recommendations returned for a set of
+    favourite movies, so that repeated requests (e.g. the same popular
+    trio of movies, chosen in any order) are not recomputed. Entries are
+    keyed on the algorithm, the normalized (sorted, de-duplicated)
+    favourite movies, `top_n` and the version of the model, and are held
+    in a bounded LRU with a time-to-live.
+
+    An optional SQLite file can be used as a second tier, shared between
+    every Streamlit process on the host.
+
+"""
+# Script dependencies
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+# Defaults for the shared cache.
+CACHE_MAX_SIZE = 4096
+CACHE_TTL_SECONDS = 6 * 60 * 60
+# Set to a file path (e.g. 'resources/models/recommendation_cache.sqlite')
+# to share cached results between processes.
+CACHE_DISK_PATH = None
+
+
+class RecommendationCache:
+    """Bounded LRU cache of recommendations, with TTL eviction.
+
+    Parameters
+    ----------
+    max_size : int
+        Maximum number of entries held in memory.
+    ttl : float
+        Seconds after which an entry expires.
+    disk_path : str
+        Optional path of an SQLite file used as a shared second tier.
+
+    """
+
+    def __init__(self, max_size=CACHE_MAX_SIZE, ttl=CACHE_TTL_SECONDS,
+                 disk_path=None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.disk_path = disk_path
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {'hits': 0, 'disk_hits': 0, 'misses': 0,
+                          'evictions': 0, 'expirations': 0}
+        if disk_path is not None:
+            with self._connect() as db:
+                db.execute('CREATE TABLE IF NOT EXISTS recommendations '
+                           '(key TEXT PRIMARY KEY, value TEXT, created REAL)')
+
+    @staticmethod
+    def make_key(algorithm, movie_list, top_n, model_version):
+        """Cache key of a request; the order of the movies is irrelevant."""
+        return json.dumps([algorithm, sorted(set(movie_list)), int(top_n),
+                           str(model_version)])
+
+    @contextmanager
+    def _connect(self):
+        db = sqlite3.connect(self.disk_path, timeout=5)
+        try:
+            with db:
+                yield db
+        finally:
+            db.close()
+
+    def _count(self, counter):
+        self._counters[counter] += 1
+
+    def _get_memory(self, key, now):
+        with self._lock:
+            if key not in self._entries:
+                return None
+            created, value = self._entries[key]
+            if now - created > self.ttl:
+                del self._entries[key]
+                self._count('expirations')
+                return None
+            self._entries.move_to_end(key)
+            self._count('hits')
+            return value
+
+    def _put_memory(self, key, value, created):
+        with self._lock:
+            self._entries[key] = (created, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self._count('evictions')
+
+    def _get_disk(self, key, now):
+        if self.disk_path is None:
+            return None
+        try:
+            with self._connect() as db:
+                row = db.execute('SELECT value, created FROM recommendations '
+                                 'WHERE key = ?', (key,)).fetchone()
+        except sqlite3.Error as e:
+            print(f"Recommendation cache read failed: {e}")
+            return None
+        if row is None or now - row[1] > self.ttl:
+            return None
+        with self._lock:
+            self._count('disk_hits')
+        self._put_memory(key, json.loads(row[0]), row[1])
+        return json.loads(row[0])
+
+    def _put_disk(self, key, value, created):
+        if self.disk_path is None:
+            return
+        try:
+            with self._connect() as db:
+                db.execute('INSERT OR REPLACE INTO recommendations VALUES (?, ?, ?)',
+                           (key, json.dumps(value), created))
+                db.execute('DELETE FROM recommendations WHERE created < ?',
+                           (created - self.ttl,))
+        except sqlite3.Error as e:
+            print(f"Recommendation cache write failed: {e}")
+
+    def get_or_compute(self, algorithm, movie_list, top_n, model_version,
+                       compute):
+        """Return cached recommendations, computing them on a miss.
+
+        Parameters
+        ----------
+        algorithm : str
+            Name of the algorithm (and its mode) producing the results.
+        movie_list : list (str)
+            Favourite movies chosen by the app user.
+        top_n : int
+            Number of recommendations requested.
+        model_version : str
+            Version of the model's artifacts; a new version misses.
+        compute : callable
+            Function taking no arguments, returning the recommendations.
+
+        Returns
+        -------
+        list (str)
+            Titles of the recommended movies.
+
+        """
+        key = self.make_key(algorithm, movie_list, top_n, model_version)
+        now = time.time()
+        value = self._get_memory(key, now)
+        if value is None:
+            value = self._get_disk(key, now)
+        if value is not None:
+            return list(value)
+
+        with self._lock:
+            self._count('misses')
+        value = list(compute())
+        self._put_memory(key, value, now)
+        self._put_disk(key, value, now)
+        return list(value)
+
+    def clear(self):
+        """Drop every cached entry, in memory and on disk."""
+        with self._lock:
+            self._entries.clear()
+        if self.disk_path is not None:
+            with self._connect() as db:
+                db.execute('DELETE FROM recommendations')
+
+    def stats(self):
+        """Hit, miss and eviction counters, plus the current size."""
+        with self._lock:
+            return dict(self._counters, size=len(self._entries))
+
+
+# Cache shared by both recommenders, created on first use.
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_cache():
+    """Return the recommendation cache shared by both algorithms."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = RecommendationCache(disk_path=CACHE_DISK_PATH)
+    return _cache
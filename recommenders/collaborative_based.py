@@ -28,23 +28,330 @@
 """
 
 # Script dependencies
-import pandas as pd
+import os
+import threading
 import numpy as np
 import pickle
-import copy
-from surprise import Reader, Dataset
-from surprise import SVD, NormalPredictor, BaselineOnly, KNNBasic, NMF
-from sklearn.metrics.pairwise import cosine_similarity
-from sklearn.feature_extraction.text import CountVectorizer
+from recommenders import registry
+from recommenders.cache import get_cache
+from recommenders.ann import ANN_INDEX_PATH, IVFIndex
+from recommenders.factors import FACTORS_DIR, SVDFactors
+from recommenders.item_neighbours import NEIGHBOURS_DIR, ItemNeighbours
+from recommenders.rating_store import RATING_STORE_DIR, RatingStore
+from recommenders.scoring import top_k_indices
+from utils.columnar import read_table
+from utils import metrics
 
-# Importing data
-reduced_ratings_data = pd.read_csv('resources/data/filtered_ratings_data.csv')
+# Data and models are loaded on first use, via the registry.
+def _load_ratings():
+    return read_table('resources/data/filtered_ratings_data.csv')
 
-# We make use of an SVD model trained on a subset of the MovieLens 10k dataset.
-model=pickle.load(open('resources/models/collab_model.pkl', 'rb'))
+MODEL_PATH = 'resources/models/collab_model.pkl'
+
+def _load_model():
+    # We make use of an SVD model trained on a subset of the MovieLens 10k dataset.
+    with open(MODEL_PATH, 'rb') as f:
+        return pickle.load(f)
+
+def _load_factors():
+    # Factors exported by `train_colbased.py` are memory-mapped; otherwise
+    # they are extracted from the pickled surprise model.
+    if SVDFactors.exists(FACTORS_DIR):
+        return SVDFactors.load(FACTORS_DIR)
+    return SVDFactors.from_surprise(registry.get('collab_model'))
+
+def _load_store():
+    # A store built by `python -m recommenders.rating_store` is
+    # memory-mapped; otherwise it is built from the ratings.
+    if RatingStore.exists(RATING_STORE_DIR):
+        return RatingStore.load(RATING_STORE_DIR)
+    return RatingStore.from_frame(registry.get('collab_ratings'), label_column='title')
+
+# Recommendation strategy used by `collab_model`:
+#   'neighbours' - score the liked movies of users who liked the chosen movies.
+#   'fold_in'    - fit the app user's factors from the chosen movies, and
+#                  score every movie against them.
+#   'items'      - merge the precomputed neighbour lists of the chosen movies
+#                  (built by `python -m recommenders.item_neighbours`).
+COLLAB_MODE = 'neighbours'
+
+# Lowest rating counted as liking a movie.
+LIKED_RATING = 4.0
+
+# Rating assumed for each chosen movie, and regularization, when folding in.
+FOLD_IN_RATING = 5.0
+FOLD_IN_REG = 0.1
+
+
+class _LikedRatings:
+    """Ratings store joined with the factors of the SVD model.
+
+    Parameters
+    ----------
+    store : RatingStore
+        Ratings, labelled with the title of each movie.
+    factors : SVDFactors
+        Parameters of the trained SVD model.
+
+    """
+
+    def __init__(self, store, factors):
+        self.store = store
+        self.factors = factors
+        self.titles = np.asarray(store.item_labels)
+        self.codes_by_title = {}
+        for code, title in enumerate(self.titles):
+            self.codes_by_title.setdefault(title, []).append(code)
+
+        # Factor rows of every user and movie, -1 if unseen by the model
+        self.user_rows = factors.user_rows(np.asarray(store.user_ids))
+        self.item_rows = factors.item_rows(np.asarray(store.item_ids))
+
+        # Movies which can be scored against folded-in user factors
+        self.scorable_codes = np.flatnonzero(self.item_rows >= 0)
+        self.scorable_rows = self.item_rows[self.scorable_codes]
+        self.code_by_row = np.full(len(factors.item_ids), -1, dtype=np.int64)
+        self.code_by_row[self.scorable_rows] = self.scorable_codes
+
+        # Optional approximate nearest-neighbour index over the item factors
+        self.ann = None
+
+        # Optional precomputed item-item neighbour lists
+        self.neighbours = None
+
+        # Version of the factors, set by the loader
+        self.version = None
+
+    def codes_for_titles(self, titles):
+        """Movie codes matching any of the given titles."""
+        codes = set()
+        for title in titles:
+            codes.update(self.codes_by_title.get(title, []))
+        return np.array(sorted(codes), dtype=np.int64)
+
+
+def _factors_version():
+    """Version of the factors currently published on disk."""
+    meta_path = os.path.join(FACTORS_DIR, 'meta.json')
+    if os.path.exists(meta_path):
+        # FACTORS_DIR may be a link to the latest version's directory
+        directory = os.path.basename(os.path.realpath(FACTORS_DIR))
+        return f'factors-{directory}-{os.path.getmtime(meta_path)}'
+    if os.path.exists(MODEL_PATH):
+        return f'svd-{os.path.getmtime(MODEL_PATH)}'
+    return 'svd-missing'
+
+def _build_liked_ratings(factors, version):
+    liked = _LikedRatings(registry.get('collab_store'), factors)
+    liked.version = version
+    if os.path.exists(ANN_INDEX_PATH):
+        ann = IVFIndex.load(ANN_INDEX_PATH)
+        if ann.matches(liked.factors.item_vectors()):
+            liked.ann = ann
+    if ItemNeighbours.exists(NEIGHBOURS_DIR):
+        neighbours = ItemNeighbours.load(NEIGHBOURS_DIR)
+        if np.array_equal(neighbours.item_ids, liked.store.item_ids):
+            liked.neighbours = neighbours
+    return liked
+
+def _load_liked_ratings():
+    version = _factors_version()
+    return _build_liked_ratings(registry.get('collab_factors'), version)
+
+registry.register('collab_ratings', _load_ratings)
+registry.register('collab_store', _load_store)
+registry.register('collab_model', _load_model)
+registry.register('collab_factors', _load_factors)
+registry.register('collab_liked', _load_liked_ratings)
+
+def get_liked_ratings():
+    """Return the liked ratings index, building it on first use."""
+    return registry.get('collab_liked')
+
+def model_version():
+    """Version of the SVD model in use, used to key cached recommendations."""
+    if registry.is_loaded('collab_liked'):
+        return get_liked_ratings().version
+    return _factors_version()
+
+# Background thread swapping in newly published factors, if one is running,
+# and the last version which failed to load.
+_update_thread = None
+_failed_version = None
+
+def _swap_in(version):
+    global _failed_version
+    try:
+        factors = _load_factors()
+        liked = _build_liked_ratings(factors, version)
+        registry.set('collab_factors', factors)
+        registry.set('collab_liked', liked)
+        print(f"Swapped in collaborative model version {version}")
+    except Exception as e:
+        _failed_version = version
+        print(f"Loading collaborative model version {version} failed: {e}")
+
+def check_for_update():
+    """Swap in factors published by `recommenders.incremental`, if any.
+
+    The new version is loaded within a background thread, while the
+    loaded version keeps serving requests, and then replaces it at once.
+    """
+    global _update_thread
+    if not registry.is_loaded('collab_liked'):
+        return
+    version = _factors_version()
+    if version in (get_liked_ratings().version, _failed_version):
+        return
+    if _update_thread is None or not _update_thread.is_alive():
+        _update_thread = threading.Thread(target=_swap_in, args=(version,),
+                                          name='collab-update', daemon=True)
+        _update_thread.start()
+
+
+def neighbour_recommendations(chosen_movies, top_n=5):
+    """Recommend the best-predicted liked movies of similar users.
+
+    Parameters
+    ----------
+    chosen_movies : list (str)
+        Favorite movies chosen by the app user.
+    top_n : int
+        Number of top recommendations to return to the user.
+
+    Returns
+    -------
+    list (str)
+        Titles of the top-n movie recommendations to the user.
+
+    """
+    with metrics.stage('load'):
+        liked = get_liked_ratings()
+    with metrics.stage('lookup'):
+        movie_codes = liked.codes_for_titles(chosen_movies)
+    if movie_codes.size == 0:
+        return []
+
+    with metrics.stage('neighbours'):
+        # Find similar users who rated the chosen movies highly
+        _, similar_users = liked.store.users_of_items(movie_codes, LIKED_RATING)
+        similar_users = np.unique(similar_users)
+
+        # Every (similar user, liked movie) pair, excluding the chosen movies
+        pair_users, pair_movies = liked.store.items_of_users(similar_users, LIKED_RATING)
+        keep = ~np.isin(pair_movies, movie_codes)
+        pair_users, pair_movies = pair_users[keep], pair_movies[keep]
+
+    # Predict ratings for all pairs at once
+    with metrics.stage('predict'):
+        predictions = liked.factors.predict_pairs(liked.user_rows[pair_users],
+                                                  liked.item_rows[pair_movies])
+
+    # The best pairs overall are also within each user's own top-n, so a
+    # single top-n selection across all pairs matches ranking per user
+    # first. Pairs are ordered by userId then movieId, which decides ties.
+    with metrics.stage('top_k'):
+        top_pairs = top_k_indices(predictions, top_n)
+
+    with metrics.stage('titles'):
+        return liked.titles[pair_movies[top_pairs]].tolist()
+
+
+def fold_in_recommendations(chosen_movies, top_n=5):
+    """Recommend movies by folding the chosen movies in as a new user.
+
+    The chosen movies are treated as the ratings of a pseudo-user, whose
+    factors are fitted against the SVD item factors. Every movie is then
+    scored with one (n_items x n_factors) product, so the cost does not
+    depend on how many users rated the chosen movies. When an ANN index
+    has been built over the item factors, only its probed lists are scored.
+
+    Parameters
+    ----------
+    chosen_movies : list (str)
+        Favorite movies chosen by the app user.
+    top_n : int
+        Number of top recommendations to return to the user.
+
+    Returns
+    -------
+    list (str)
+        Titles of the top-n movie recommendations to the user.
+
+    """
+    with metrics.stage('load'):
+        liked = get_liked_ratings()
+    with metrics.stage('lookup'):
+        movie_codes = liked.codes_for_titles(chosen_movies)
+        seed_codes = movie_codes[liked.item_rows[movie_codes] >= 0]
+    if seed_codes.size == 0:
+        return []
+
+    # Fit the pseudo-user's factors and bias
+    factors = liked.factors
+    seed_rows = liked.item_rows[seed_codes]
+    with metrics.stage('fold_in'):
+        user_factors, user_bias = factors.fold_in(
+            seed_rows, np.full(seed_rows.size, FOLD_IN_RATING), reg=FOLD_IN_REG)
+
+    if liked.ann is not None:
+        with metrics.stage('ann_search'):
+            top_rows, _ = liked.ann.search(factors.query_vector(user_factors), top_n,
+                                           exclude=seed_rows,
+                                           allowed=liked.code_by_row >= 0)
+        return liked.titles[liked.code_by_row[top_rows]].tolist()
+
+    # Score every movie known to the model, excluding the chosen movies
+    with metrics.stage('predict'):
+        predictions = factors.predict_user(user_factors, user_bias,
+                                           liked.scorable_rows, clip=False)
+    with metrics.stage('top_k'):
+        exclude = np.flatnonzero(np.isin(liked.scorable_codes, movie_codes))
+        top_movies = top_k_indices(predictions, top_n, exclude)
+
+    return liked.titles[liked.scorable_codes[top_movies]].tolist()
+
+def item_recommendations(chosen_movies, top_n=5):
+    """Recommend the movies most similar to the chosen movies overall.
+
+    The precomputed neighbour lists of the chosen movies are merged, and
+    each candidate is scored by its summed similarity to them, so the
+    cost only depends on the length of the lists. Without neighbour
+    lists, this falls back to `neighbour_recommendations`.
+
+    Parameters
+    ----------
+    chosen_movies : list (str)
+        Favorite movies chosen by the app user.
+    top_n : int
+        Number of top recommendations to return to the user.
+
+    Returns
+    -------
+    list (str)
+        Titles of the top-n movie recommendations to the user.
+
+    """
+    with metrics.stage('load'):
+        liked = get_liked_ratings()
+    if liked.neighbours is None:
+        return neighbour_recommendations(chosen_movies, top_n)
+    with metrics.stage('lookup'):
+        movie_codes = liked.codes_for_titles(chosen_movies)
+    if movie_codes.size == 0:
+        return []
+
+    with metrics.stage('merge'):
+        candidates, scores = liked.neighbours.merged(movie_codes)
+    with metrics.stage('top_k'):
+        exclude = np.flatnonzero(np.isin(candidates, movie_codes))
+        top_movies = top_k_indices(scores, top_n, exclude)
+
+    return liked.titles[candidates[top_movies]].tolist()
 
 # !! DO NOT CHANGE THIS FUNCTION SIGNATURE !!
 # You are, however, encouraged to change its content.  
+@metrics.instrument('collab_model')
 def collab_model(chosen_movies,top_n=5):
     """Performs Collaborative filtering based upon a list of movies supplied
        by the app user.
@@ -62,38 +369,15 @@ def collab_model(chosen_movies,top_n=5):
         Titles of the top-n movie recommendations to the user.
 
     """
+    check_for_update()
+    mode = COLLAB_MODE
+    return get_cache().get_or_compute(f'collab-{mode}', chosen_movies,
+                                      top_n, model_version(),
+                                      lambda: _recommend(chosen_movies, top_n, mode))
 
-    movie_ids = reduced_ratings_data[reduced_ratings_data['title'].isin(chosen_movies)]['movieId'].unique()
-
-    # Find similar users who rated the chosen movies highly
-    similar_users = set()
-    for movie_id in movie_ids:
-        movie_ratings = reduced_ratings_data[reduced_ratings_data['movieId'] == movie_id]
-        high_rated_users = set(movie_ratings[movie_ratings['rating'] >= 4]['userId'])
-        similar_users.update(high_rated_users)
-
-    # Recommend movies based on what similar users have liked
-    recommended_movies = []
-    for user_id in similar_users:
-        # Get the movies rated by similar users
-        user_movies = reduced_ratings_data[(reduced_ratings_data['userId'] == user_id) & (reduced_ratings_data['rating'] >= 4)]['movieId'].unique()
-        
-        # Exclude movies already chosen by the user
-        user_movies = set(user_movies) - set(movie_ids)
-        
-        # Predict ratings for the movies
-        predictions = [(movie_id, model.predict(user_id, movie_id).est) for movie_id in user_movies]
-        
-        # Sort predictions by predicted ratings in descending order
-        predictions.sort(key=lambda x: x[1], reverse=True)
-        
-        # Add the top 5 recommended movies to the list with titles
-        recommended_movies.extend([(movie_id, reduced_ratings_data[reduced_ratings_data['movieId'] == movie_id]['title'].iloc[0], rating) for movie_id, rating in predictions[:5]])
-
-    # Sort recommended movies by predicted ratings in descending order
-    recommended_movies.sort(key=lambda x: x[2], reverse=True)
-
-    # Get the top 5 recommended movie titles
-    top_recommended_movie_titles = [title for _, title, _ in recommended_movies[:5]]
-
-    return top_recommended_movie_titles
+def _recommend(chosen_movies, top_n, mode):
+    if mode == 'fold_in':
+        return fold_in_recommendations(chosen_movies, top_n)
+    if mode == 'items':
+        return item_recommendations(chosen_movies, top_n)
+    return neighbour_recommendations(chosen_movies, top_n)
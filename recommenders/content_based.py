@@ -29,20 +29,160 @@
 
 # Script dependencies
 import os
-import pandas as pd
-import numpy as np
-from sklearn.metrics.pairwise import cosine_similarity
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.preprocessing import normalize
-
-# Importing data
-movies = pd.read_csv('resources/data/movies.csv', sep = ',')
-ratings = pd.read_csv('resources/data/ratings.csv')
-content_data = pd.read_csv('resources/data/content_data_clean.csv')
-movies.dropna(inplace=True)
+import threading
+from recommenders import registry
+from recommenders.cache import get_cache
+from recommenders.content_index import (INDEX_MATRIX_PATH, build_content_index,
+                                        load_content_index, save_content_index)
+from utils.columnar import read_table
+from utils import metrics
+
+# Data and models are loaded on first use, via the registry.
+def _load_content_data():
+    return read_table('resources/data/content_data_clean.csv', as_category=False)
+
+def _stored_version():
+    """Version of the index stored on disk."""
+    if os.path.exists(INDEX_MATRIX_PATH):
+        return f'tfidf-{os.path.getmtime(INDEX_MATRIX_PATH)}'
+    return 'tfidf-in-memory'
+
+def _load_content_index():
+    """Read the index written by `resources/models/build_content_index.py`,
+    or fit it in memory from the content data if it has not been built."""
+    version = _stored_version()
+    index = load_content_index()
+    if index is None:
+        index = build_content_index(registry.get('content_data'))
+    index.version = version
+    return index
+
+registry.register('content_data', _load_content_data)
+registry.register('content_index', _load_content_index)
+
+def get_content_index():
+    """Return the TF-IDF content index, loading it on first use.
+
+    Returns
+    -------
+    ContentIndex
+        Sparse TF-IDF index over the movie overviews.
+
+    """
+    return registry.get('content_index')
+
+def model_version():
+    """Version of the content index in use, used to key cached recommendations."""
+    if registry.is_loaded('content_index'):
+        return get_content_index().version
+    return _stored_version()
+
+# Serializes appends and refits of the index, and the background threads
+# refitting the index or loading a newer stored version.
+_update_lock = threading.Lock()
+_refit_thread = None
+_reload_thread = None
+
+def _publish(index):
+    """Store the index (if the app uses a stored one) and swap it in."""
+    if os.path.exists(INDEX_MATRIX_PATH):
+        save_content_index(index)
+        index.version = _stored_version()
+    else:
+        index.version = f'tfidf-in-memory-{len(index)}-{index.n_fitted}'
+    registry.set('content_index', index)
+
+def _refit(content_data):
+    try:
+        index = build_content_index(content_data)
+        with _update_lock:
+            # Movies appended while refitting are appended to the new index
+            latest = registry.get('content_data')
+            if len(latest) > len(content_data):
+                index = index.appended(latest.iloc[len(content_data):])
+            _publish(index)
+        print(f"Content index refitted over {len(index)} movies")
+    except Exception as e:
+        print(f"Refitting the content index failed: {e}")
+
+def update_content_index(content_data=None):
+    """Append movies added to the content data since the index was built.
+
+    New movies are vectorized against the fitted vocabulary, so the cost
+    depends on the number of new movies. Once the appended movies drift
+    past the thresholds of `ContentIndex.needs_refit`, the index is refit
+    over the whole catalogue within a background thread, while the
+    appended index keeps serving requests.
+
+    Parameters
+    ----------
+    content_data : pd.DataFrame
+        Whole content data, whose leading rows are those already indexed.
+        Defaults to re-reading `content_data_clean.csv`.
+
+    Returns
+    -------
+    ContentIndex
+        The index in use after the update.
+
+    """
+    global _refit_thread
+    with _update_lock:
+        if content_data is None:
+            content_data = _load_content_data()
+        registry.set('content_data', content_data)
+        index = get_content_index()
+        if len(content_data) <= len(index):
+            return index
+        index = index.appended(content_data.iloc[len(index):])
+        _publish(index)
+
+    if index.needs_refit() and (_refit_thread is None or not _refit_thread.is_alive()):
+        _refit_thread = threading.Thread(target=_refit, args=(content_data,),
+                                         name='content-refit', daemon=True)
+        _refit_thread.start()
+    return index
+
+def wait_for_refit(timeout=None):
+    """Wait for a refit started by `update_content_index` to finish.
+
+    Returns
+    -------
+    bool
+        Whether a refit was running.
+
+    """
+    thread = _refit_thread
+    if thread is None or not thread.is_alive():
+        return False
+    thread.join(timeout)
+    return True
+
+def _reload():
+    try:
+        with _update_lock:
+            version = _stored_version()
+            index = load_content_index()
+            index.version = version
+            registry.set('content_index', index)
+    except Exception as e:
+        print(f"Reloading the content index failed: {e}")
+
+def check_for_update():
+    """Load the stored index in the background if another process updated it."""
+    global _reload_thread
+    if not registry.is_loaded('content_index') or _stored_version() == 'tfidf-in-memory':
+        return
+    if _stored_version() == get_content_index().version:
+        return
+    if _reload_thread is None or not _reload_thread.is_alive():
+        _reload_thread = threading.Thread(target=_reload, name='content-reload',
+                                          daemon=True)
+        _reload_thread.start()
 
 # !! DO NOT CHANGE THIS FUNCTION SIGNATURE !!
 # You are, however, encouraged to change its content.  
+@metrics.instrument('content_model')
 def content_model(movie_list, top_n=5):
     """Performs Content filtering based upon a list of movies supplied
        by the app user.
@@ -60,34 +200,19 @@ def content_model(movie_list, top_n=5):
         Titles of the top-n movie recommendations to the user.
 
     """
-     # Vectorizing the input movies
-    tfidf = TfidfVectorizer(stop_words="english", max_features=5000)
-    vectors = tfidf.fit_transform(content_data["cleaned_overview"]).toarray()
-    vectors = normalize(vectors)
-
-    # Calculating cosine similarity
-    similarity = cosine_similarity(vectors)
-
-    # Getting the indices of the input movies
-    indices = content_data[content_data['title'].isin(movie_list)].index.tolist()
-
-    # Calculating average similarity for input movies
-    avg_similarity = similarity[indices].mean(axis=0)
-
-    # Getting the indices of the top similar movies
-    top_indices = avg_similarity.argsort()[-top_n*2:][::-1]
-
-    # Filtering out movies that are the same as the input movies
-    top_indices = [idx for idx in top_indices if idx not in indices][:top_n]
-
-    # Getting the titles and genres of the top similar movies
-    recommended_movies = content_data.iloc[top_indices][['title', 'genres']]
-
-    # Getting the cosine similarity scores for the recommended movies
-    cosine_similarity_scores = avg_similarity[top_indices]
-
-    # Adding the cosine similarity scores to the DataFrame
-    recommended_movies['cosine_similarity'] = cosine_similarity_scores
-
-    return recommended_movies['title'].tolist()
-
+    check_for_update()
+    return get_cache().get_or_compute('content', movie_list, top_n,
+                                      model_version(),
+                                      lambda: _recommend(movie_list, top_n))
+
+def _recommend(movie_list, top_n):
+    with metrics.stage('load_index'):
+        index = get_content_index()
+
+    # Scoring the corpus against the centroid of the input movies, and
+    # selecting the top movies which are not themselves inputs
+    with metrics.stage('score'):
+        top_indices = index.recommend_batch([movie_list], top_n)[0]
+
+    with metrics.stage('titles'):
+        return index.titles[top_indices].tolist()
@@ -0,0 +1,274 @@
+"""
+
+    Persisted TF-IDF index for content-based filtering.
+
+    Author: Explore Data Science Academy.
+
+    Description: Helper functions to fit the TF-IDF vectorizer over the
+    cleaned movie overviews once, save the resulting sparse,
+    L2-normalized document matrix (and title lookup) to disk, and load it
+    back for use within `content_model`.
+
+    The index is built offline via `resources/models/build_content_index.py`.
+
+    Movies added to the catalogue can be appended to an existing index:
+    their overviews are vectorized against the fitted vocabulary and IDF
+    weights, and their rows appended to the matrix. Appending does not
+    update the IDF weights, so the drift between the fitted and current
+    document frequencies is tracked, and a full refit is advised once it
+    (or the share of appended movies) passes a threshold.
+
+"""
+# Script dependencies
+import os
+import pickle
+import numpy as np
+import scipy.sparse as sp
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.preprocessing import normalize
+from recommenders.scoring import top_k_batch
+
+# Default artifact locations, relative to the root of the repository.
+INDEX_MATRIX_PATH = 'resources/models/content_tfidf.npz'
+INDEX_META_PATH = 'resources/models/content_tfidf_meta.pkl'
+
+# Thresholds past which appended movies call for a full refit: relative
+# change of the IDF weights, and share of the movies appended since the fit.
+REFIT_IDF_DRIFT = 0.05
+REFIT_APPENDED_SHARE = 0.2
+
+
+class ContentIndex:
+    """Sparse TF-IDF document matrix with its title lookup.
+
+    Parameters
+    ----------
+    matrix : scipy.sparse.csr_matrix
+        L2-normalized TF-IDF vectors, one row per movie.
+    titles : np.ndarray (str)
+        Movie title for each row of `matrix`.
+    genres : np.ndarray (str)
+        Movie genres for each row of `matrix`.
+    vectorizer : TfidfVectorizer
+        Fitted vectorizer used to produce `matrix`.
+    n_fitted : int
+        Number of leading rows the vectorizer was fitted on. Defaults to
+        every row; later rows were appended.
+    movie_ids : np.ndarray (int)
+        Movie ID for each row of `matrix`, if known.
+
+    """
+
+    def __init__(self, matrix, titles, genres, vectorizer, n_fitted=None,
+                 movie_ids=None):
+        self.matrix = matrix.tocsr()
+        self.titles = np.asarray(titles)
+        self.genres = np.asarray(genres)
+        self.vectorizer = vectorizer
+        self.n_fitted = len(self.titles) if n_fitted is None else n_fitted
+        self.movie_ids = None if movie_ids is None else np.asarray(movie_ids)
+        # Number of movies containing each term (IDF is never zero, so
+        # every term present has a stored entry)
+        self.doc_freq = np.bincount(self.matrix.indices,
+                                    minlength=self.matrix.shape[1])
+        self._rows_by_title = {}
+        for row, title in enumerate(self.titles):
+            self._rows_by_title.setdefault(title, []).append(row)
+
+    def __len__(self):
+        return self.matrix.shape[0]
+
+    def rows_for_titles(self, titles):
+        """Return the sorted matrix rows matching any of the given titles."""
+        rows = set()
+        for title in titles:
+            rows.update(self._rows_by_title.get(title, []))
+        return sorted(rows)
+
+    def centroids(self, row_lists):
+        """Mean TF-IDF vector of each list of query rows.
+
+        Parameters
+        ----------
+        row_lists : list (list (int))
+            Matrix rows of the query movies, one list per query.
+
+        Returns
+        -------
+        scipy.sparse.csr_matrix
+            Centroids of shape (n_queries, n_features).
+
+        """
+        query, cols, vals = [], [], []
+        for i, rows in enumerate(row_lists):
+            if not rows:
+                continue
+            query.extend([i] * len(rows))
+            cols.extend(rows)
+            vals.extend([1.0 / len(rows)] * len(rows))
+        weights = sp.csr_matrix((vals, (query, cols)),
+                                shape=(len(row_lists), len(self)))
+        return weights @ self.matrix
+
+    def similarity(self, rows):
+        """Average cosine similarity between the given rows and the corpus.
+
+        Since every row is L2-normalized, the mean of the similarity rows
+        equals a single sparse mat-vec against the mean query vector.
+
+        Parameters
+        ----------
+        rows : list (int)
+            Matrix rows of the query movies.
+
+        Returns
+        -------
+        np.ndarray (float)
+            Average similarity of every movie in the corpus to the query.
+
+        """
+        return self.similarity_batch([rows])[:, 0]
+
+    def similarity_batch(self, row_lists):
+        """Average cosine similarity for several queries at once.
+
+        Returns
+        -------
+        np.ndarray (float)
+            Scores of shape (n_movies, n_queries).
+
+        """
+        return (self.matrix @ self.centroids(row_lists).T).toarray()
+
+    def recommend_batch(self, title_lists, top_n=5):
+        """Top-n most similar movies for each list of favourite titles.
+
+        Parameters
+        ----------
+        title_lists : list (list (str))
+            Favourite movies, one list per query.
+        top_n : int
+            Number of recommendations per query.
+
+        Returns
+        -------
+        list (list (int))
+            Matrix rows of the recommended movies, best first. Queries
+            with no known titles receive no recommendations.
+
+        """
+        row_lists = [self.rows_for_titles(titles) for titles in title_lists]
+        scores = self.similarity_batch(row_lists)
+        top_rows = top_k_batch(scores, top_n, row_lists)
+        return [top.tolist() if rows else []
+                for rows, top in zip(row_lists, top_rows)]
+
+    def appended(self, content_data):
+        """New index with the movies of `content_data` appended.
+
+        Overviews are vectorized with the fitted vocabulary and IDF
+        weights, so the cost depends on the number of new movies only.
+
+        Parameters
+        ----------
+        content_data : pd.DataFrame
+            New movies, with `title`, `genres` and `cleaned_overview`
+            columns, and `movieId` if the index has movie IDs.
+
+        Returns
+        -------
+        ContentIndex
+            Index over the existing and new movies.
+
+        """
+        vectors = normalize(self.vectorizer.transform(
+            content_data['cleaned_overview'].fillna('')))
+        movie_ids = None
+        if self.movie_ids is not None and 'movieId' in content_data:
+            movie_ids = np.concatenate([self.movie_ids, content_data['movieId'].values])
+        return ContentIndex(sp.vstack([self.matrix, vectors], format='csr'),
+                            np.concatenate([self.titles, content_data['title'].values]),
+                            np.concatenate([self.genres, content_data['genres'].values]),
+                            self.vectorizer, self.n_fitted, movie_ids)
+
+    def idf_drift(self):
+        """Relative change of the IDF weights implied by the current corpus.
+
+        Compares the (smoothed) IDF of the current document frequencies
+        against the fitted IDF weights, as sum|idf_now - idf_fit| / sum idf_fit.
+        """
+        fitted = self.vectorizer.idf_
+        current = np.log((1 + len(self)) / (1 + self.doc_freq)) + 1
+        return float(np.abs(current - fitted).sum() / fitted.sum())
+
+    def needs_refit(self):
+        """Whether appended movies have drifted past the refit thresholds."""
+        if len(self) == self.n_fitted:
+            return False
+        appended_share = (len(self) - self.n_fitted) / max(len(self), 1)
+        return (appended_share > REFIT_APPENDED_SHARE
+                or self.idf_drift() > REFIT_IDF_DRIFT)
+
+
+def build_content_index(content_data, max_features=5000):
+    """Fit the TF-IDF vectorizer over the corpus and build its index.
+
+    Parameters
+    ----------
+    content_data : pd.DataFrame
+        Cleaned content data with `title`, `genres` and
+        `cleaned_overview` columns, and optionally `movieId`.
+    max_features : int
+        Size of the TF-IDF vocabulary.
+
+    Returns
+    -------
+    ContentIndex
+        Index over every movie in `content_data`.
+
+    """
+    tfidf = TfidfVectorizer(stop_words="english", max_features=max_features)
+    vectors = tfidf.fit_transform(content_data['cleaned_overview'].fillna(''))
+    vectors = normalize(vectors)
+    movie_ids = content_data['movieId'].values if 'movieId' in content_data else None
+    return ContentIndex(vectors, content_data['title'].values,
+                        content_data['genres'].values, tfidf, movie_ids=movie_ids)
+
+
+def save_content_index(index, matrix_path=INDEX_MATRIX_PATH,
+                       meta_path=INDEX_META_PATH):
+    """Save a content index to disk.
+
+    Each file is written aside and then renamed over the previous one, so
+    that readers never see a partially written file. The matrix is stored
+    uncompressed, which makes saving after an append far cheaper.
+    """
+    with open(f'{meta_path}.tmp', 'wb') as f:
+        pickle.dump({'titles': index.titles,
+                     'genres': index.genres,
+                     'vectorizer': index.vectorizer,
+                     'n_fitted': index.n_fitted,
+                     'movie_ids': index.movie_ids}, f)
+    os.replace(f'{meta_path}.tmp', meta_path)
+    sp.save_npz(f'{matrix_path}.tmp.npz', index.matrix, compressed=False)
+    os.replace(f'{matrix_path}.tmp.npz', matrix_path)
+
+
+def load_content_index(matrix_path=INDEX_MATRIX_PATH,
+                       meta_path=INDEX_META_PATH):
+    """Load a content index previously written by `save_content_index`.
+
+    Returns
+    -------
+    ContentIndex or None
+        The stored index, or None if it has not been built yet.
+
+    """
+    if not (os.path.exists(matrix_path) and os.path.exists(meta_path)):
+        return None
+    matrix = sp.load_npz(matrix_path)
+    with open(meta_path, 'rb') as f:
+        meta = pickle.load(f)
+    return ContentIndex(matrix, meta['titles'], meta['genres'],
+                        meta['vectorizer'], meta.get('n_fitted'),
+                        meta.get('movie_ids'))
@@ -0,0 +1,390 @@
+"""
+
+    Matrix factorization parameters for vectorized collaborative scoring.
+
+    Author: Explore Data Science Academy.
+
+    Description: Helper class which pulls the learnt parameters of a
+    trained surprise `SVD` model (user factors `pu`, item factors `qi`,
+    biases `bu`/`bi` and the global mean) into plain NumPy arrays, so that
+    rating estimates for many (user, item) pairs can be computed at once
+    instead of through repeated calls to `model.predict`.
+
+    Factors can be saved as plain `.npy` arrays plus id maps, and loaded
+    back with memory mapping, instead of pickling the surprise model. They
+    are stored as float32, or optionally as int8 with one scale per row
+    (`QuantizedMatrix`), which scoring then uses without dequantizing the
+    whole matrix.
+
+    Export the pickled surprise model from the root of the repository:
+
+        python -m recommenders.factors --precision int8
+
+    New users (such as the app user) can be "folded in" against the item
+    factors without retraining, by solving a small regularized least
+    squares problem for their factors and bias.
+
+"""
+# Script dependencies
+import os
+import json
+import numpy as np
+
+# Default location of exported factors, relative to the root of the repository.
+FACTORS_DIR = 'resources/models/collab_factors'
+
+# Precisions in which factors can be saved.
+PRECISIONS = ['float64', 'float32', 'int8']
+
+
+class QuantizedMatrix:
+    """Read-only int8 matrix with a float32 scale per row.
+
+    Row `r` stands for `codes[r] * scales[r]`. Indexing dequantizes only
+    the selected rows, and `dot` computes products against the int8 codes
+    chunk by chunk, so the full float matrix is never materialized.
+
+    Parameters
+    ----------
+    codes : np.ndarray (int8)
+        Quantized rows of shape (n_rows, n_cols).
+    scales : np.ndarray (float32)
+        Scale of each row, of shape (n_rows,).
+
+    """
+
+    # Number of rows dequantized at once by `dot`.
+    chunk_size = 16384
+
+    def __init__(self, codes, scales):
+        self.codes = codes
+        self.scales = scales
+
+    @classmethod
+    def from_dense(cls, matrix):
+        """Symmetric per-row quantization, mapping each row's largest
+        magnitude to 127."""
+        matrix = np.asarray(matrix, dtype=np.float32)
+        scales = np.abs(matrix).max(axis=1) / 127 if matrix.size else np.ones(len(matrix))
+        scales = np.where(scales > 0, scales, 1).astype(np.float32)
+        codes = np.clip(np.rint(matrix / scales[:, None]), -127, 127).astype(np.int8)
+        return cls(codes, scales)
+
+    @property
+    def shape(self):
+        return self.codes.shape
+
+    @property
+    def dtype(self):
+        return np.dtype(np.float32)
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __getitem__(self, rows):
+        codes = np.asarray(self.codes[rows], dtype=np.float32)
+        scales = np.asarray(self.scales[rows], dtype=np.float32)
+        return codes * (scales[..., None] if scales.ndim else scales)
+
+    def __array__(self, dtype=None, copy=None):
+        dense = self[:]
+        return dense if dtype is None else dense.astype(dtype)
+
+    def dot(self, other, rows=None):
+        """Product of the (selected) rows with a vector or matrix."""
+        other = np.asarray(other, dtype=np.float32)
+        rows = np.arange(len(self)) if rows is None else np.asarray(rows)
+        out = np.empty((len(rows),) + other.shape[1:], dtype=np.float32)
+        for start in range(0, len(rows), self.chunk_size):
+            chunk = rows[start:start + self.chunk_size]
+            if chunk.size and np.all(np.diff(chunk) == 1):
+                # Consecutive increasing rows are sliced rather than gathered
+                codes = self.codes[chunk[0]:chunk[-1] + 1]
+            else:
+                codes = self.codes[chunk]
+            product = np.asarray(codes, dtype=np.float32) @ other
+            scales = np.asarray(self.scales[chunk])
+            out[start:start + len(chunk)] = product * (scales[:, None] if product.ndim > 1
+                                                       else scales)
+        return out
+
+
+class SVDFactors:
+    """Learnt SVD parameters indexed by dense user and item rows.
+
+    Parameters
+    ----------
+    pu : np.ndarray (float)
+        User factors of shape (n_users, n_factors).
+    qi : np.ndarray (float)
+        Item factors of shape (n_items, n_factors).
+    bu : np.ndarray (float)
+        User biases of shape (n_users,).
+    bi : np.ndarray (float)
+        Item biases of shape (n_items,).
+    global_mean : float
+        Mean of all ratings in the training set.
+    rating_scale : tuple (float, float)
+        Lowest and highest possible rating, used to clip estimates.
+    user_ids : np.ndarray
+        Raw userId for each row of `pu`.
+    item_ids : np.ndarray
+        Raw movieId for each row of `qi`.
+    biased : bool
+        Whether the biases take part in the estimates.
+
+    """
+
+    def __init__(self, pu, qi, bu, bi, global_mean, rating_scale,
+                 user_ids, item_ids, biased=True):
+        self.pu = pu
+        self.qi = qi
+        self.bu = bu
+        self.bi = bi
+        self.global_mean = float(global_mean)
+        self.rating_scale = tuple(rating_scale)
+        self.user_ids = np.asarray(user_ids)
+        self.item_ids = np.asarray(item_ids)
+        self.biased = biased
+        self._user_rows = {uid: row for row, uid in enumerate(self.user_ids.tolist())}
+        self._item_rows = {iid: row for row, iid in enumerate(self.item_ids.tolist())}
+
+    @classmethod
+    def from_surprise(cls, model):
+        """Extract the parameters of a trained surprise `SVD` model."""
+        trainset = model.trainset
+        user_ids = [trainset.to_raw_uid(u) for u in range(trainset.n_users)]
+        item_ids = [trainset.to_raw_iid(i) for i in range(trainset.n_items)]
+        return cls(np.asarray(model.pu), np.asarray(model.qi),
+                   np.asarray(model.bu), np.asarray(model.bi),
+                   trainset.global_mean, trainset.rating_scale,
+                   user_ids, item_ids, biased=model.biased)
+
+    @property
+    def precision(self):
+        """Precision of the factors: 'float64', 'float32' or 'int8'."""
+        if isinstance(self.qi, QuantizedMatrix):
+            return 'int8'
+        return np.dtype(self.qi.dtype).name
+
+    def save(self, path=FACTORS_DIR, precision=None):
+        """Save the factors as `.npy` arrays within the directory `path`.
+
+        Parameters
+        ----------
+        path : str
+            Directory to save the factors within.
+        precision : str
+            'float64', 'float32', or 'int8' (with a float32 scale per
+            row). Defaults to the precision of the factors.
+
+        """
+        precision = precision or self.precision
+        if precision not in PRECISIONS:
+            raise ValueError(f"Unknown precision: {precision}")
+        os.makedirs(path, exist_ok=True)
+        for name in ('pu', 'qi'):
+            matrix = getattr(self, name)
+            if precision == 'int8':
+                if not isinstance(matrix, QuantizedMatrix):
+                    matrix = QuantizedMatrix.from_dense(matrix)
+                np.save(os.path.join(path, f'{name}.npy'), matrix.codes)
+                np.save(os.path.join(path, f'{name}_scales.npy'), matrix.scales)
+            else:
+                np.save(os.path.join(path, f'{name}.npy'), np.asarray(matrix, dtype=precision))
+        bias_dtype = np.float64 if precision == 'float64' else np.float32
+        for name in ('bu', 'bi'):
+            np.save(os.path.join(path, f'{name}.npy'),
+                    np.asarray(getattr(self, name), dtype=bias_dtype))
+        for name in ('user_ids', 'item_ids'):
+            np.save(os.path.join(path, f'{name}.npy'), getattr(self, name))
+        with open(os.path.join(path, 'meta.json'), 'w') as f:
+            json.dump({'global_mean': self.global_mean,
+                       'rating_scale': list(self.rating_scale),
+                       'biased': bool(self.biased),
+                       'precision': precision}, f, indent=2)
+
+    @classmethod
+    def load(cls, path=FACTORS_DIR, mmap_mode='r'):
+        """Load factors saved by `save`, memory-mapping the arrays."""
+        arrays = {name: np.load(os.path.join(path, f'{name}.npy'), mmap_mode=mmap_mode)
+                  for name in ('pu', 'qi', 'bu', 'bi', 'user_ids', 'item_ids')}
+        with open(os.path.join(path, 'meta.json')) as f:
+            meta = json.load(f)
+        if meta.get('precision') == 'int8':
+            for name in ('pu', 'qi'):
+                arrays[name] = QuantizedMatrix(arrays[name], np.load(
+                    os.path.join(path, f'{name}_scales.npy'), mmap_mode=mmap_mode))
+        return cls(arrays['pu'], arrays['qi'], arrays['bu'], arrays['bi'],
+                   meta['global_mean'], meta['rating_scale'],
+                   arrays['user_ids'], arrays['item_ids'], meta['biased'])
+
+    @staticmethod
+    def exists(path=FACTORS_DIR):
+        """Whether factors have been saved within the directory `path`."""
+        return os.path.exists(os.path.join(path, 'meta.json'))
+
+    @property
+    def n_factors(self):
+        return self.qi.shape[1]
+
+    def item_scores(self, vectors, item_rows=None):
+        """Inner products of the item factors with one or more vectors.
+
+        Parameters
+        ----------
+        vectors : np.ndarray (float)
+            Vector of shape (n_factors,), or matrix of shape
+            (n_factors, n_vectors).
+        item_rows : np.ndarray (int)
+            Factor rows of the items to score. Defaults to every item.
+
+        """
+        if isinstance(self.qi, QuantizedMatrix):
+            return self.qi.dot(vectors, item_rows)
+        qi = self.qi if item_rows is None else self.qi[item_rows]
+        return qi @ vectors
+
+    def item_vectors(self):
+        """Item vectors whose inner product with `query_vector` ranks items.
+
+        With a biased model, the item bias is appended to the item factors
+        so that it takes part in the inner product. The global mean and
+        user bias are constant for a given user, and do not affect ranking.
+        """
+        if self.biased:
+            return np.hstack([self.qi, self.bi[:, None]])
+        return np.asarray(self.qi)
+
+    def query_vector(self, user_factors):
+        """Query matching `item_vectors` for the given user factors."""
+        if self.biased:
+            return np.append(user_factors, 1.0)
+        return np.asarray(user_factors)
+
+    def user_rows(self, user_ids):
+        """Map raw userIds to factor rows, with -1 for unknown users."""
+        return np.array([self._user_rows.get(uid, -1) for uid in np.asarray(user_ids).tolist()],
+                        dtype=np.int64)
+
+    def item_rows(self, item_ids):
+        """Map raw movieIds to factor rows, with -1 for unknown items."""
+        return np.array([self._item_rows.get(iid, -1) for iid in np.asarray(item_ids).tolist()],
+                        dtype=np.int64)
+
+    def predict_pairs(self, user_rows, item_rows):
+        """Estimate the ratings of many (user, item) pairs at once.
+
+        Mirrors `surprise.SVD.predict`: unknown users or items contribute
+        neither bias nor factors, and estimates are clipped to the rating
+        scale.
+
+        Parameters
+        ----------
+        user_rows : np.ndarray (int)
+            Factor row of each user, or -1 if unknown.
+        item_rows : np.ndarray (int)
+            Factor row of each item, or -1 if unknown.
+
+        Returns
+        -------
+        np.ndarray (float)
+            Estimated rating of each pair.
+
+        """
+        user_rows = np.asarray(user_rows)
+        item_rows = np.asarray(item_rows)
+        known_user = user_rows >= 0
+        known_item = item_rows >= 0
+        both = known_user & known_item
+
+        dot = np.zeros(user_rows.shape, dtype=np.float64)
+        dot[both] = np.einsum('ij,ij->i', self.pu[user_rows[both]],
+                              self.qi[item_rows[both]])
+        if self.biased:
+            est = self.global_mean + dot
+            est[known_user] += self.bu[user_rows[known_user]]
+            est[known_item] += self.bi[item_rows[known_item]]
+        else:
+            est = np.where(both, dot, self.global_mean)
+        return np.clip(est, *self.rating_scale)
+
+    def fold_in(self, item_rows, ratings, reg=0.1):
+        """Fit factors for a new user from a handful of their ratings.
+
+        Solves the ridge regression of the user's residual ratings
+        (rating - global mean - item bias) on the item factors, augmented
+        with a constant column for the user bias when the model is biased.
+        The problem is solved in its dual form, which only requires a
+        (n_ratings x n_ratings) linear system.
+
+        Parameters
+        ----------
+        item_rows : np.ndarray (int)
+            Factor rows of the rated items (all known to the model).
+        ratings : np.ndarray (float)
+            Rating given to each item.
+        reg : float
+            L2 regularization strength.
+
+        Returns
+        -------
+        tuple (np.ndarray, float)
+            Factors and bias of the folded-in user.
+
+        """
+        item_rows = np.asarray(item_rows)
+        design = self.qi[item_rows]
+        residuals = np.asarray(ratings, dtype=np.float64) - self.global_mean
+        if self.biased:
+            residuals = residuals - self.bi[item_rows]
+            design = np.hstack([design, np.ones((len(item_rows), 1))])
+        gram = design @ design.T + reg * np.eye(len(item_rows))
+        solution = design.T @ np.linalg.solve(gram, residuals)
+        if self.biased:
+            return solution[:-1], solution[-1]
+        return solution, 0.0
+
+    def predict_user(self, user_factors, user_bias=0.0, item_rows=None,
+                     clip=True):
+        """Estimate one user's ratings for many items in one product.
+
+        Parameters
+        ----------
+        user_factors : np.ndarray (float)
+            Factors of the user, e.g. from `fold_in`.
+        user_bias : float
+            Bias of the user.
+        item_rows : np.ndarray (int)
+            Factor rows of the items to score. Defaults to every item.
+        clip : bool
+            Whether to clip estimates to the rating scale. Ranking should
+            be done on unclipped estimates, so as not to create ties.
+
+        Returns
+        -------
+        np.ndarray (float)
+            Estimated rating for each item.
+
+        """
+        est = self.item_scores(user_factors, item_rows)
+        if self.biased:
+            bi = self.bi if item_rows is None else self.bi[item_rows]
+            est = est + self.global_mean + user_bias + bi
+        return np.clip(est, *self.rating_scale) if clip else est
+
+
+if __name__ == '__main__':
+    import argparse
+    import pickle
+    parser = argparse.ArgumentParser(description='Export the pickled SVD model as factors.')
+    parser.add_argument('--model', default='resources/models/collab_model.pkl')
+    parser.add_argument('--output', default=FACTORS_DIR)
+    parser.add_argument('--precision', choices=PRECISIONS, default='float32')
+    args = parser.parse_args()
+
+    with open(args.model, 'rb') as f:
+        factors = SVDFactors.from_surprise(pickle.load(f))
+    factors.save(args.output, args.precision)
+    print(f"Exported {len(factors.user_ids)} users and {len(factors.item_ids)} items "
+          f"as {args.precision} to: {args.output}")
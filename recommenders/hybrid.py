@@ -0,0 +1,240 @@
+"""
+
+    Hybrid filtering, blending content and collaborative scores.
+
+    Author: Explore Data Science Academy.
+
+    Description: Scores every movie of the content index against the
+    app user's favourites twice in one vectorized pass: by TF-IDF
+    similarity (as `content_model`), and by the ratings predicted for the
+    favourites folded in as a new user of the SVD model (as the 'fold_in'
+    mode of `collab_model`). Movies are aligned across
+    `content_data_clean.csv` and `filtered_ratings_data.csv` by movieId.
+
+    Each score vector is min-max scaled over the candidate movies (the
+    favourites themselves, which always score highest on content, are
+    left out), so that the weights are comparable, and blended with
+    configurable weights. Movies missing from the ratings data (or
+    unknown to the SVD model) are given a neutral collaborative score,
+    the mean over the scored candidates, so that blending neither favours
+    nor penalizes them. When none of the favourites is known to the
+    model, all movies are ranked on their content score.
+
+"""
+# Script dependencies
+import numpy as np
+from recommenders import registry
+from recommenders.cache import get_cache
+from recommenders.scoring import top_k_batch
+import recommenders.content_based as content_based
+import recommenders.collaborative_based as collaborative_based
+from utils import metrics
+
+# Default weights of the content and collaborative scores.
+CONTENT_WEIGHT = 0.5
+COLLAB_WEIGHT = 0.5
+
+
+class HybridAlignment:
+    """Rows of the content index aligned with the SVD item factors.
+
+    Parameters
+    ----------
+    index : ContentIndex
+        TF-IDF index of the content-based recommender.
+    liked : _LikedRatings
+        Rating store and factors of the collaborative recommender.
+
+    """
+
+    def __init__(self, index, liked):
+        self.index = index
+        self.liked = liked
+        self.factors = liked.factors
+        movie_ids = index.movie_ids
+        if movie_ids is None:
+            # Indexes built before movie IDs were stored
+            movie_ids = registry.get('content_data')['movieId'].values
+        codes = liked.store.item_index(movie_ids)
+        # Factor row of every content row, -1 if missing from the ratings
+        self.item_rows = np.where(codes >= 0, liked.item_rows[np.maximum(codes, 0)], -1)
+        self.collab_positions = np.flatnonzero(self.item_rows >= 0)
+        self.collab_rows = self.item_rows[self.collab_positions]
+
+
+def _load_alignment():
+    return HybridAlignment(content_based.get_content_index(),
+                           collaborative_based.get_liked_ratings())
+
+registry.register('hybrid_alignment', _load_alignment)
+
+def get_alignment():
+    """Return the alignment of the content index and collaborative model in use."""
+    alignment = registry.get('hybrid_alignment')
+    index = content_based.get_content_index()
+    liked = collaborative_based.get_liked_ratings()
+    if alignment.index is not index or alignment.liked is not liked:
+        # Either model was updated since the alignment was built
+        alignment = HybridAlignment(index, liked)
+        registry.set('hybrid_alignment', alignment)
+    return alignment
+
+
+def _min_max(scores, row_lists=()):
+    """Scale each column of `scores` to [0, 1] over its candidate rows.
+
+    `row_lists[j]` holds the rows of query j's favourites, which are left
+    out of its minimum and maximum (and may then fall outside [0, 1]).
+    """
+    low, high = scores.copy(), scores.copy()
+    for j, rows in enumerate(row_lists):
+        low[rows, j], high[rows, j] = np.inf, -np.inf
+    low, high = low.min(axis=0), high.max(axis=0)
+    low = np.where(np.isfinite(low), low, 0)
+    return (scores - low) / np.where(high > low, high - low, 1)
+
+
+def blend(content, collab, collab_positions, row_lists, content_weight=CONTENT_WEIGHT,
+          collab_weight=COLLAB_WEIGHT):
+    """Weighted blend of scaled content and collaborative scores.
+
+    Parameters
+    ----------
+    content : np.ndarray (float)
+        Content scores of every movie, of shape (n_movies, n_queries).
+    collab : np.ndarray (float)
+        Collaborative scores of the movies at `collab_positions`, of shape
+        (len(collab_positions), n_queries).
+    collab_positions : np.ndarray (int)
+        Sorted rows of the movies with a collaborative score.
+    row_lists : list (list (int))
+        Rows of each query's favourites, left out of the scaling.
+
+    Returns
+    -------
+    np.ndarray (float)
+        Blended scores of every movie, of shape (n_movies, n_queries).
+
+    """
+    content = _min_max(content, row_lists)
+    # Positions of the favourites within the collaborative scores
+    collab_rows = [np.intersect1d(collab_positions, rows, return_indices=True)[1]
+                   for rows in row_lists]
+    collab = _min_max(collab, collab_rows)
+
+    # Movies without a collaborative score get the mean over the candidates
+    candidates = np.ones(collab.shape, dtype=bool)
+    for j, positions in enumerate(collab_rows):
+        candidates[positions, j] = False
+    neutral = (np.where(candidates, collab, 0).sum(axis=0)
+               / np.maximum(candidates.sum(axis=0), 1))
+    collab_scores = np.repeat(neutral[None], len(content), axis=0)
+    collab_scores[collab_positions] = collab
+    return ((content_weight * content + collab_weight * collab_scores)
+            / (content_weight + collab_weight))
+
+
+def recommend_batch(title_lists, top_n=5, content_weight=CONTENT_WEIGHT,
+                    collab_weight=COLLAB_WEIGHT):
+    """Top-n blended recommendations for each list of favourite titles.
+
+    Parameters
+    ----------
+    title_lists : list (list (str))
+        Favourite movies, one list per query.
+    top_n : int
+        Number of recommendations per query.
+    content_weight : float
+        Weight of the content score.
+    collab_weight : float
+        Weight of the collaborative score.
+
+    Returns
+    -------
+    list (list (str))
+        Titles of the recommended movies, best first. Queries with no
+        known titles receive no recommendations.
+
+    Raises
+    ------
+    ValueError
+        If a weight is negative, or both are zero.
+
+    """
+    if content_weight < 0 or collab_weight < 0 or content_weight + collab_weight <= 0:
+        raise ValueError("Weights must be non-negative, and not both zero: "
+                         f"{content_weight}, {collab_weight}")
+    with metrics.stage('load'):
+        alignment = get_alignment()
+    index, factors = alignment.index, alignment.factors
+
+    with metrics.stage('content'):
+        row_lists = [index.rows_for_titles(titles) for titles in title_lists]
+        scores = index.similarity_batch(row_lists)
+
+    with metrics.stage('fold_in'):
+        users = np.zeros((factors.n_factors, len(row_lists)))
+        biases = np.zeros(len(row_lists))
+        folded = np.zeros(len(row_lists), dtype=bool)
+        for j, rows in enumerate(row_lists):
+            seed_rows = alignment.item_rows[rows]
+            seed_rows = seed_rows[seed_rows >= 0]
+            if seed_rows.size:
+                users[:, j], biases[j] = factors.fold_in(
+                    seed_rows, np.full(seed_rows.size, collaborative_based.FOLD_IN_RATING),
+                    reg=collaborative_based.FOLD_IN_REG)
+                folded[j] = True
+
+    if folded.any() and alignment.collab_rows.size:
+        with metrics.stage('collab'):
+            rows = alignment.collab_rows
+            # The global mean and user bias do not change the scaled scores
+            collab = factors.item_scores(users[:, folded], rows)
+            if factors.biased:
+                collab += np.asarray(factors.bi[rows])[:, None]
+        with metrics.stage('blend'):
+            queries = np.flatnonzero(folded)
+            scores[:, folded] = blend(scores[:, folded], collab,
+                                      alignment.collab_positions,
+                                      [row_lists[j] for j in queries],
+                                      content_weight, collab_weight)
+
+    with metrics.stage('top_k'):
+        top_rows = top_k_batch(scores, top_n, row_lists)
+    return [index.titles[top].tolist() if rows else []
+            for rows, top in zip(row_lists, top_rows)]
+
+
+def model_version():
+    """Versions of both models in use, used to key cached recommendations."""
+    return f'{content_based.model_version()}|{collaborative_based.model_version()}'
+
+
+@metrics.instrument('hybrid_model')
+def hybrid_model(movie_list, top_n=5, content_weight=CONTENT_WEIGHT,
+                 collab_weight=COLLAB_WEIGHT):
+    """Performs Hybrid filtering based upon a list of movies supplied
+       by the app user.
+
+    Parameters
+    ----------
+    movie_list : list (str)
+        Favorite movies chosen by the app user.
+    top_n : int
+        Number of top recommendations to return to the user.
+    content_weight : float
+        Weight of the content score.
+    collab_weight : float
+        Weight of the collaborative score.
+
+    Returns
+    -------
+    list (str)
+        Titles of the top-n movie recommendations to the user.
+
+    """
+    content_based.check_for_update()
+    collaborative_based.check_for_update()
+    return get_cache().get_or_compute(
+        f'hybrid-{content_weight}-{collab_weight}', movie_list, top_n, model_version(),
+        lambda: recommend_batch([movie_list], top_n, content_weight, collab_weight)[0])
@@ -0,0 +1,217 @@
+"""
+
+    Incremental updates of the collaborative factors from new ratings.
+
+    Author: Explore Data Science Academy.
+
+    Description: Helper functions to refresh the collaborative model with
+    a delta file of new ratings, without retraining over every rating.
+
+    Users and movies seen for the first time are appended, with
+    cold-start factors and bias fitted by ridge regression against the
+    existing factors of whoever they were rated by (or rated). A few
+    epochs of SGD, with the update rules of surprise's `SVD`, are then
+    run over the new ratings only, which touches only the factors and
+    biases of the affected users and movies.
+
+    Each update is saved as a new version directory next to
+    `FACTORS_DIR`, which is then a symbolic link swapped atomically to
+    the newest version. The running app notices the new version on its
+    next collaborative request and swaps it in from a background thread
+    (see `recommenders.collaborative_based`); memory-mapped arrays of the
+    previous version stay valid while they are in use.
+
+    Run from the root of the repository:
+
+        python -m recommenders.incremental new_ratings.csv --epochs 10
+
+"""
+# Script dependencies
+import os
+import re
+import time
+import shutil
+import argparse
+import numpy as np
+import pandas as pd
+from recommenders.factors import FACTORS_DIR, SVDFactors
+
+# Number of previous versions kept on disk after publishing a new one.
+KEEP_VERSIONS = 2
+
+
+def _ridge(design, target, reg):
+    """Ridge regression weights, solved in the dual (n_samples) form."""
+    gram = design @ design.T + reg * np.eye(len(design))
+    return design.T @ np.linalg.solve(gram, target)
+
+
+def _cold_start(factors, rows, others, ratings, other_factors, other_bias,
+                own_factors, own_bias, reg):
+    """Fit the factors and bias of each new row against its rated counterparts."""
+    for row in np.unique(rows):
+        mask = (rows == row)
+        design = np.hstack([other_factors[others[mask]],
+                            np.ones((mask.sum(), 1))])
+        target = ratings[mask] - factors.global_mean - other_bias[others[mask]]
+        weights = _ridge(design, target, reg)
+        own_factors[row] = weights[:-1]
+        own_bias[row] = weights[-1]
+
+
+def apply_delta(factors, delta, n_epochs=10, lr=0.005, reg=0.02,
+                cold_start_reg=0.1, seed=0):
+    """Update factors with new ratings, returning the updated copy.
+
+    Parameters
+    ----------
+    factors : SVDFactors
+        Current (biased) factors; left unchanged.
+    delta : pd.DataFrame
+        New ratings, with `userId`, `movieId` and `rating` columns.
+    n_epochs : int
+        Number of SGD passes over the new ratings.
+    lr : float
+        SGD learning rate.
+    reg : float
+        SGD regularization.
+    cold_start_reg : float
+        Regularization of the cold-start fit of new users and movies.
+    seed : int
+        Seed of the order in which ratings are visited.
+
+    Returns
+    -------
+    SVDFactors
+        Factors covering every user and movie of `factors` and `delta`.
+
+    """
+    if not factors.biased:
+        raise ValueError("Incremental updates require a biased model.")
+    user_ids = delta['userId'].values
+    item_ids = delta['movieId'].values
+    ratings = delta['rating'].to_numpy(np.float64)
+
+    new_users = pd.unique(user_ids[factors.user_rows(user_ids) < 0])
+    new_items = pd.unique(item_ids[factors.item_rows(item_ids) < 0])
+    n_users, n_items = len(factors.user_ids), len(factors.item_ids)
+
+    # Copies of the parameters, extended with zeroed rows for newcomers
+    pu = np.vstack([factors.pu, np.zeros((len(new_users), factors.n_factors),
+                                         dtype=factors.pu.dtype)])
+    qi = np.vstack([factors.qi, np.zeros((len(new_items), factors.n_factors),
+                                         dtype=factors.qi.dtype)])
+    bu = np.concatenate([factors.bu, np.zeros(len(new_users), dtype=factors.bu.dtype)])
+    bi = np.concatenate([factors.bi, np.zeros(len(new_items), dtype=factors.bi.dtype)])
+    updated = SVDFactors(pu, qi, bu, bi, factors.global_mean, factors.rating_scale,
+                         np.concatenate([factors.user_ids, new_users]),
+                         np.concatenate([factors.item_ids, new_items]),
+                         factors.biased)
+    users = updated.user_rows(user_ids)
+    items = updated.item_rows(item_ids)
+
+    # New movies are fitted against their existing raters, then new users
+    # against every movie they rated
+    known = users < n_users
+    new = (items >= n_items) & known
+    _cold_start(updated, items[new], users[new], ratings[new], pu, bu, qi, bi,
+                cold_start_reg)
+    new = users >= n_users
+    _cold_start(updated, users[new], items[new], ratings[new], qi, bi, pu, bu,
+                cold_start_reg)
+
+    # SGD over the new ratings only
+    rng = np.random.default_rng(seed)
+    mean = updated.global_mean
+    for _ in range(n_epochs):
+        for k in rng.permutation(len(ratings)):
+            u, i = users[k], items[k]
+            err = ratings[k] - (mean + bu[u] + bi[i] + qi[i] @ pu[u])
+            bu[u] += lr * (err - reg * bu[u])
+            bi[i] += lr * (err - reg * bi[i])
+            pu_u = pu[u].copy()
+            pu[u] += lr * (err * qi[i] - reg * pu[u])
+            qi[i] += lr * (err * pu_u - reg * qi[i])
+    return updated
+
+
+def _version_dirs(path):
+    """Existing version directories of `path`, oldest first."""
+    parent, name = os.path.split(os.path.abspath(path))
+    pattern = re.compile(re.escape(name) + r'-v(\d+)$')
+    versions = [(int(match.group(1)), os.path.join(parent, entry))
+                for entry in os.listdir(parent)
+                for match in [pattern.match(entry)] if match]
+    return [directory for _, directory in sorted(versions)]
+
+
+def _next_version(path):
+    versions = _version_dirs(path)
+    number = int(versions[-1].rsplit('-v', 1)[1]) + 1 if versions else 0
+    return f'{path}-v{number}'
+
+
+def publish(factors, path=FACTORS_DIR, keep=KEEP_VERSIONS, precision=None):
+    """Save factors as a new version, and atomically point `path` to it.
+
+    `path` becomes a symbolic link to the newest version directory. If it
+    is still a plain directory (e.g. written by `train_colbased.py`), it
+    is first moved to a version directory of its own. `precision` is that
+    of the saved factors (see `SVDFactors.save`).
+
+    Returns
+    -------
+    str
+        Directory of the new version.
+
+    """
+    path = os.path.abspath(path)
+    if os.path.isdir(path) and not os.path.islink(path):
+        first = _next_version(path)
+        os.rename(path, first)
+        os.symlink(os.path.basename(first), path)
+
+    directory = _next_version(path)
+    factors.save(directory, precision)
+
+    # Renaming a new link over the old one swaps the version atomically
+    link = f'{path}.{os.getpid()}.tmp'
+    os.symlink(os.path.basename(directory), link)
+    os.replace(link, path)
+
+    for old in _version_dirs(path)[:-(keep + 1)]:
+        shutil.rmtree(old, ignore_errors=True)
+    return directory
+
+
+def _rmse(factors, delta):
+    estimates = factors.predict_pairs(factors.user_rows(delta['userId'].values),
+                                      factors.item_rows(delta['movieId'].values))
+    return float(np.sqrt(np.mean((delta['rating'].values - estimates) ** 2)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Update the collaborative factors.')
+    parser.add_argument('delta', help='New ratings (.csv with userId, movieId, rating).')
+    parser.add_argument('--factors', default=FACTORS_DIR)
+    parser.add_argument('--epochs', type=int, default=10)
+    parser.add_argument('--lr', type=float, default=0.005)
+    parser.add_argument('--reg', type=float, default=0.02)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    factors = SVDFactors.load(args.factors)
+    delta = pd.read_csv(args.delta, usecols=['userId', 'movieId', 'rating'])
+    before = _rmse(factors, delta)
+    updated = apply_delta(factors, delta, args.epochs, args.lr, args.reg)
+    # Updates are published in the precision of the factors they started from
+    directory = publish(updated, args.factors, precision=factors.precision)
+    print(f"Applied {len(delta)} ratings "
+          f"({len(updated.user_ids) - len(factors.user_ids)} new users, "
+          f"{len(updated.item_ids) - len(factors.item_ids)} new movies) in "
+          f"{time.perf_counter() - start:.1f} s; RMSE over them "
+          f"{before:.4f} -> {_rmse(updated, delta):.4f}. Published {directory}")
+
+
+if __name__ == '__main__':
+    main()
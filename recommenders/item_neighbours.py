@@ -0,0 +1,275 @@
+"""
+
+    Precomputed item-item neighbour lists for collaborative filtering.
+
+    Author: Explore Data Science Academy.
+
+    Description: Offline job which finds, for every movie of the rating
+    store, its top-K most similar movies, by either:
+
+        adjusted_cosine - cosine similarity of the movies' rating columns,
+                          after subtracting each user's mean rating
+        factors         - cosine similarity of the movies' SVD factors
+
+    Similarities are computed one block of movies at a time, as a
+    (sparse) matrix product against every movie, with the blocks spread
+    over a pool of worker processes. Only positive similarities are kept.
+    The lists are stored as compact int32 movie indices (of the rating
+    store) with float16 scores, and memory-mapped by the item-based mode
+    of `recommenders.collaborative_based.collab_model`.
+
+    Run from the root of the repository:
+
+        python -m recommenders.item_neighbours --method adjusted_cosine --k 50
+
+"""
+# Script dependencies
+import os
+import json
+import time
+import argparse
+import multiprocessing
+import numpy as np
+import scipy.sparse as sp
+
+# Default artifact location, relative to the root of the repository.
+NEIGHBOURS_DIR = 'resources/models/item_neighbours'
+
+METHODS = ['adjusted_cosine', 'factors']
+
+
+def _normalize_rows(matrix):
+    """Scale the rows of a sparse or dense matrix to unit length."""
+    if sp.issparse(matrix):
+        norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+        norms[norms == 0] = 1
+        return sp.diags(1 / norms).dot(matrix).tocsr()
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1
+    return matrix / norms
+
+
+def adjusted_cosine_vectors(store):
+    """Unit-length, user-mean-centred rating columns of every movie.
+
+    Returns
+    -------
+    scipy.sparse.csr_matrix
+        Matrix of shape (n_items, n_users), in float32.
+
+    """
+    degrees = np.diff(np.asarray(store.user_indptr))
+    sums = np.bincount(np.repeat(np.arange(store.n_users), degrees),
+                       weights=store.user_ratings, minlength=store.n_users)
+    user_means = sums / np.maximum(degrees, 1)
+    users = np.asarray(store.item_users)
+    centred = np.asarray(store.item_ratings, dtype=np.float64) - user_means[users]
+    matrix = sp.csr_matrix((centred.astype(np.float32), users,
+                            np.asarray(store.item_indptr)),
+                           shape=(store.n_items, store.n_users))
+    return _normalize_rows(matrix)
+
+
+def factor_vectors(store, factors):
+    """Unit-length SVD item factors of every movie of the store.
+
+    Movies unseen by the model get a zero vector, hence no neighbours.
+
+    Returns
+    -------
+    np.ndarray (float)
+        Matrix of shape (n_items, n_factors), in float32.
+
+    """
+    rows = factors.item_rows(np.asarray(store.item_ids))
+    vectors = np.zeros((store.n_items, factors.n_factors), dtype=np.float32)
+    vectors[rows >= 0] = factors.qi[rows[rows >= 0]]
+    return _normalize_rows(vectors)
+
+
+def top_k_similar(similarities, rows, k):
+    """Top-k positive similarities of each row of a (block x items) matrix.
+
+    `rows` holds the item index of each block row, which is never its own
+    neighbour. Ties go to the lowest item index; lists shorter than k are
+    padded with index -1 and score 0.
+    """
+    similarities = np.asarray(similarities, dtype=np.float32)
+    similarities[np.arange(len(rows)), rows] = 0
+    k_eff = min(k, similarities.shape[1])
+    candidates = np.argpartition(-similarities, k_eff - 1, axis=1)[:, :k_eff]
+    neighbours = np.full((len(rows), k), -1, dtype=np.int32)
+    scores = np.zeros((len(rows), k), dtype=np.float16)
+    for r in range(len(rows)):
+        # Include every item tied with the k-th best, then break ties by index
+        threshold = similarities[r, candidates[r]].min()
+        tied = np.flatnonzero(similarities[r] >= threshold)
+        order = np.lexsort((tied, -similarities[r, tied]))[:k]
+        chosen = tied[order]
+        chosen = chosen[similarities[r, chosen] > 0]
+        neighbours[r, :len(chosen)] = chosen
+        scores[r, :len(chosen)] = similarities[r, chosen]
+    return neighbours, scores
+
+
+# Item vectors of each worker process.
+_worker_vectors = {}
+
+def _init_worker(vectors):
+    _worker_vectors['vectors'] = vectors
+    _worker_vectors['transposed'] = vectors.T.tocsc() if sp.issparse(vectors) else vectors.T
+
+
+def _neighbour_block(args):
+    start, stop, k = args
+    vectors = _worker_vectors['vectors']
+    similarities = vectors[start:stop] @ _worker_vectors['transposed']
+    if sp.issparse(similarities):
+        similarities = similarities.toarray()
+    return start, top_k_similar(similarities, np.arange(start, stop), k)
+
+
+def compute_neighbours(vectors, k=50, block_size=256, n_workers=None):
+    """Top-k cosine neighbours of every row of `vectors`.
+
+    Parameters
+    ----------
+    vectors : scipy.sparse.csr_matrix or np.ndarray
+        Unit-length item vectors, one row per item.
+    k : int
+        Number of neighbours per item.
+    block_size : int
+        Number of items whose similarities are computed at once; each
+        block holds a dense (block_size x n_items) float32 matrix.
+    n_workers : int
+        Number of worker processes. Defaults to every core.
+
+    Returns
+    -------
+    tuple (np.ndarray, np.ndarray)
+        Neighbour indices (int32) and scores (float16), of shape
+        (n_items, k), best first.
+
+    """
+    n_items = vectors.shape[0]
+    neighbours = np.full((n_items, k), -1, dtype=np.int32)
+    scores = np.zeros((n_items, k), dtype=np.float16)
+    blocks = [(lo, min(lo + block_size, n_items), k)
+              for lo in range(0, n_items, block_size)]
+    with multiprocessing.Pool(n_workers or os.cpu_count(),
+                              _init_worker, (vectors,)) as pool:
+        for lo, (block_neighbours, block_scores) in pool.imap_unordered(
+                _neighbour_block, blocks):
+            neighbours[lo:lo + len(block_neighbours)] = block_neighbours
+            scores[lo:lo + len(block_scores)] = block_scores
+    return neighbours, scores
+
+
+class ItemNeighbours:
+    """Top-k similar movies of every movie of a rating store.
+
+    Parameters
+    ----------
+    item_ids : np.ndarray (int)
+        Raw movieId of each item index, as in the rating store.
+    neighbours : np.ndarray (int32)
+        Item indices of each movie's neighbours, -1 past the end of the list.
+    scores : np.ndarray (float16)
+        Similarity of each neighbour.
+    method : str
+        Similarity the lists were computed with.
+
+    """
+
+    def __init__(self, item_ids, neighbours, scores, method):
+        self.item_ids = item_ids
+        self.neighbours = neighbours
+        self.scores = scores
+        self.method = method
+
+    @property
+    def k(self):
+        return self.neighbours.shape[1]
+
+    def __len__(self):
+        return len(self.item_ids)
+
+    def merged(self, items):
+        """Candidate movies of several seed movies, with summed similarity.
+
+        Returns
+        -------
+        tuple (np.ndarray, np.ndarray)
+            Item index of each candidate, in increasing order, and the sum
+            of its similarities to the seeds.
+
+        """
+        neighbours = np.asarray(self.neighbours[items]).ravel()
+        scores = np.asarray(self.scores[items], dtype=np.float32).ravel()
+        valid = neighbours >= 0
+        candidates, positions = np.unique(neighbours[valid], return_inverse=True)
+        return candidates, np.bincount(positions, weights=scores[valid],
+                                       minlength=len(candidates))
+
+    def save(self, path=NEIGHBOURS_DIR):
+        """Save the lists as `.npy` arrays within the directory `path`."""
+        os.makedirs(path, exist_ok=True)
+        for name in ('item_ids', 'neighbours', 'scores'):
+            np.save(os.path.join(path, f'{name}.npy'), getattr(self, name))
+        with open(os.path.join(path, 'meta.json'), 'w') as f:
+            json.dump({'method': self.method, 'k': self.k,
+                       'n_items': len(self)}, f, indent=2)
+
+    @classmethod
+    def load(cls, path=NEIGHBOURS_DIR, mmap_mode='r'):
+        """Load lists saved by `save`, memory-mapping the arrays."""
+        with open(os.path.join(path, 'meta.json')) as f:
+            meta = json.load(f)
+        arrays = {name: np.load(os.path.join(path, f'{name}.npy'), mmap_mode=mmap_mode)
+                  for name in ('item_ids', 'neighbours', 'scores')}
+        return cls(method=meta['method'], **arrays)
+
+    @staticmethod
+    def exists(path=NEIGHBOURS_DIR):
+        """Whether neighbour lists have been saved within the directory `path`."""
+        return os.path.exists(os.path.join(path, 'meta.json'))
+
+
+def build_item_neighbours(store, factors=None, method='adjusted_cosine', k=50,
+                          block_size=256, n_workers=None):
+    """Compute the neighbour lists of every movie of `store`.
+
+    `factors` (SVDFactors) is required by the 'factors' method.
+    """
+    if method == 'factors':
+        vectors = factor_vectors(store, factors)
+    else:
+        vectors = adjusted_cosine_vectors(store)
+    neighbours, scores = compute_neighbours(vectors, k, block_size, n_workers)
+    return ItemNeighbours(np.asarray(store.item_ids), neighbours, scores, method)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build item-item neighbour lists.')
+    parser.add_argument('--method', choices=METHODS, default='adjusted_cosine')
+    parser.add_argument('--k', type=int, default=50)
+    parser.add_argument('--block-size', type=int, default=256)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--output', default=NEIGHBOURS_DIR)
+    args = parser.parse_args()
+
+    # The store and factors are loaded as the recommender loads them
+    from recommenders import registry
+    import recommenders.collaborative_based  # noqa: F401 (registers loaders)
+    start = time.perf_counter()
+    store = registry.get('collab_store')
+    factors = registry.get('collab_factors') if args.method == 'factors' else None
+    item_neighbours = build_item_neighbours(store, factors, args.method, args.k,
+                                            args.block_size, args.workers)
+    item_neighbours.save(args.output)
+    print(f"Top-{args.k} {args.method} neighbours of {len(item_neighbours)} movies "
+          f"saved to {args.output} in {time.perf_counter() - start:.1f} s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,265 @@
+"""
+
+    Compact, integer-indexed rating store with user and item adjacency.
+
+    Author: Explore Data Science Academy.
+
+    Description: Helper class which maps raw userId/movieId values to
+    dense int32 indices (in increasing id order), holds ratings as
+    float32, and keeps them grouped both by user (CSR) and by item (CSC).
+    Neighbour queries such as "which users rated movie X at least 4" or
+    "what did user U like" then cost O(degree) rather than a scan of
+    every rating.
+
+    A store is saved as plain `.npy` arrays, and loaded back with memory
+    mapping, so that several processes (the app, the batch CLI, training
+    workers) can share one copy through the page cache.
+
+    Build the store of the app's ratings from the root of the repository:
+
+        python -m recommenders.rating_store
+
+"""
+# Script dependencies
+import os
+import json
+import numpy as np
+import pandas as pd
+
+# Default location of the store of the app's ratings, relative to the root
+# of the repository.
+RATING_STORE_DIR = 'resources/models/rating_store'
+RATINGS_PATH = 'resources/data/filtered_ratings_data.csv'
+
+_ARRAYS = ['user_ids', 'item_ids', 'user_indptr', 'user_items', 'user_ratings',
+           'item_indptr', 'item_users', 'item_ratings']
+
+
+def gather(indptr, values, keys):
+    """Concatenate the CSR-style groups `values[indptr[k]:indptr[k+1]]`.
+
+    Returns
+    -------
+    tuple (np.ndarray, np.ndarray)
+        The key of each gathered entry, and the positions of the gathered
+        entries within `values` (and any array aligned with it).
+
+    """
+    keys = np.asarray(keys, dtype=np.int64)
+    starts = np.asarray(indptr[keys], dtype=np.int64)
+    lengths = np.asarray(indptr[keys + 1], dtype=np.int64) - starts
+    offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+    return np.repeat(keys, lengths), offsets + np.arange(lengths.sum())
+
+
+def _group(keys, others, ratings, n_keys):
+    """Group (other, rating) entries by integer key, sorted by key then other."""
+    order = np.lexsort((others, keys))
+    indptr = np.zeros(n_keys + 1, dtype=np.int64)
+    np.cumsum(np.bincount(keys, minlength=n_keys), out=indptr[1:])
+    return indptr, np.asarray(others)[order], np.asarray(ratings)[order]
+
+
+class RatingStore:
+    """Ratings grouped by user (CSR) and by item (CSC).
+
+    Parameters
+    ----------
+    user_ids : np.ndarray (int)
+        Sorted raw userId of each user index.
+    item_ids : np.ndarray (int)
+        Sorted raw movieId of each item index.
+    user_indptr, user_items, user_ratings : np.ndarray
+        Items (int32) and ratings (float32) of user u at
+        `user_indptr[u]:user_indptr[u+1]`, sorted by item.
+    item_indptr, item_users, item_ratings : np.ndarray
+        Users (int32) and ratings (float32) of item i at
+        `item_indptr[i]:item_indptr[i+1]`, sorted by user.
+    item_labels : np.ndarray (str)
+        Optional label (e.g. title) of each item.
+
+    """
+
+    def __init__(self, user_ids, item_ids, user_indptr, user_items, user_ratings,
+                 item_indptr, item_users, item_ratings, item_labels=None):
+        self.user_ids = user_ids
+        self.item_ids = item_ids
+        self.user_indptr = user_indptr
+        self.user_items = user_items
+        self.user_ratings = user_ratings
+        self.item_indptr = item_indptr
+        self.item_users = item_users
+        self.item_ratings = item_ratings
+        self.item_labels = item_labels
+
+    @classmethod
+    def from_codes(cls, user_codes, item_codes, ratings, user_ids, item_ids,
+                   item_labels=None):
+        """Build a store from dense codes into (unsorted) raw id arrays.
+
+        Codes are remapped so that indices follow increasing raw ids.
+        Duplicate (user, item) pairs keep their highest rating.
+        """
+        user_ids, item_ids = np.asarray(user_ids), np.asarray(item_ids)
+        user_order, item_order = np.argsort(user_ids), np.argsort(item_ids)
+        user_rank = np.empty(len(user_ids), dtype=np.int32)
+        user_rank[user_order] = np.arange(len(user_ids))
+        item_rank = np.empty(len(item_ids), dtype=np.int32)
+        item_rank[item_order] = np.arange(len(item_ids))
+        users = user_rank[np.asarray(user_codes)]
+        items = item_rank[np.asarray(item_codes)]
+        ratings = np.asarray(ratings, dtype=np.float32)
+
+        # Keep the highest rating of duplicate pairs
+        keys = users.astype(np.int64) * len(item_ids) + items
+        order = np.lexsort((-ratings, keys))
+        first = np.ones(len(order), dtype=bool)
+        first[1:] = keys[order][1:] != keys[order][:-1]
+        keep = order[first]
+        users, items, ratings = users[keep], items[keep], ratings[keep]
+
+        if item_labels is not None:
+            item_labels = np.asarray(item_labels, dtype=str)[item_order]
+        return cls(user_ids[user_order], item_ids[item_order],
+                   *_group(users, items, ratings, len(user_ids)),
+                   *_group(items, users, ratings, len(item_ids)),
+                   item_labels=item_labels)
+
+    @classmethod
+    def from_frame(cls, ratings, label_column=None):
+        """Build a store from a ratings DataFrame.
+
+        Parameters
+        ----------
+        ratings : pd.DataFrame
+            Ratings with `userId`, `movieId` and `rating` columns.
+        label_column : str
+            Optional column (e.g. `title`) holding each movie's label;
+            the first label seen for each movie is kept.
+
+        """
+        user_codes, user_ids = pd.factorize(ratings['userId'])
+        item_codes, item_ids = pd.factorize(ratings['movieId'])
+        labels = None
+        if label_column is not None:
+            _, first_rows = np.unique(item_codes, return_index=True)
+            labels = ratings[label_column].values[first_rows]
+        return cls.from_codes(user_codes, item_codes, ratings['rating'].values,
+                              np.asarray(user_ids), np.asarray(item_ids), labels)
+
+    @property
+    def n_users(self):
+        return len(self.user_ids)
+
+    @property
+    def n_items(self):
+        return len(self.item_ids)
+
+    def __len__(self):
+        return len(self.user_ratings)
+
+    def user_index(self, user_ids):
+        """Map raw userIds to user indices, with -1 for unknown users."""
+        return self._index(self.user_ids, user_ids)
+
+    def item_index(self, item_ids):
+        """Map raw movieIds to item indices, with -1 for unknown items."""
+        return self._index(self.item_ids, item_ids)
+
+    @staticmethod
+    def _index(sorted_ids, raw_ids):
+        raw_ids = np.asarray(raw_ids)
+        positions = np.searchsorted(sorted_ids, raw_ids)
+        positions = np.minimum(positions, len(sorted_ids) - 1)
+        found = np.asarray(sorted_ids[positions]) == raw_ids
+        return np.where(found, positions, -1).astype(np.int64)
+
+    def items_of(self, user, min_rating=None):
+        """Items rated by one user (at least `min_rating`), and their ratings."""
+        start, stop = self.user_indptr[user], self.user_indptr[user + 1]
+        return self._filter(self.user_items[start:stop],
+                            self.user_ratings[start:stop], min_rating)
+
+    def users_of(self, item, min_rating=None):
+        """Users who rated one item (at least `min_rating`), and their ratings."""
+        start, stop = self.item_indptr[item], self.item_indptr[item + 1]
+        return self._filter(self.item_users[start:stop],
+                            self.item_ratings[start:stop], min_rating)
+
+    def items_of_users(self, users, min_rating=None):
+        """(user, item) pairs rated by any of `users` (at least `min_rating`).
+
+        Returns
+        -------
+        tuple (np.ndarray, np.ndarray)
+            User and item index of each pair, ordered by user then item.
+
+        """
+        keys, positions = gather(self.user_indptr, None, users)
+        return self._filter_pairs(keys, self.user_items, self.user_ratings,
+                                  positions, min_rating)
+
+    def users_of_items(self, items, min_rating=None):
+        """(item, user) pairs rated by any of `items` (at least `min_rating`).
+
+        Returns
+        -------
+        tuple (np.ndarray, np.ndarray)
+            Item and user index of each pair, ordered by item then user.
+
+        """
+        keys, positions = gather(self.item_indptr, None, items)
+        return self._filter_pairs(keys, self.item_users, self.item_ratings,
+                                  positions, min_rating)
+
+    @staticmethod
+    def _filter(others, ratings, min_rating):
+        others, ratings = np.asarray(others), np.asarray(ratings)
+        if min_rating is None:
+            return others, ratings
+        keep = ratings >= min_rating
+        return others[keep], ratings[keep]
+
+    @staticmethod
+    def _filter_pairs(keys, others, ratings, positions, min_rating):
+        others = np.asarray(others[positions])
+        if min_rating is not None:
+            keep = np.asarray(ratings[positions]) >= min_rating
+            keys, others = keys[keep], others[keep]
+        return keys, others
+
+    def save(self, path=RATING_STORE_DIR):
+        """Save the store as `.npy` arrays within the directory `path`."""
+        os.makedirs(path, exist_ok=True)
+        for name in _ARRAYS:
+            np.save(os.path.join(path, f'{name}.npy'), getattr(self, name))
+        if self.item_labels is not None:
+            np.save(os.path.join(path, 'item_labels.npy'), self.item_labels)
+        with open(os.path.join(path, 'meta.json'), 'w') as f:
+            json.dump({'n_users': self.n_users, 'n_items': self.n_items,
+                       'n_ratings': len(self),
+                       'labels': self.item_labels is not None}, f, indent=2)
+
+    @classmethod
+    def load(cls, path=RATING_STORE_DIR, mmap_mode='r'):
+        """Load a store saved by `save`, memory-mapping the arrays."""
+        with open(os.path.join(path, 'meta.json')) as f:
+            meta = json.load(f)
+        names = _ARRAYS + (['item_labels'] if meta['labels'] else [])
+        arrays = {name: np.load(os.path.join(path, f'{name}.npy'), mmap_mode=mmap_mode)
+                  for name in names}
+        return cls(**arrays)
+
+    @staticmethod
+    def exists(path=RATING_STORE_DIR):
+        """Whether a store has been saved within the directory `path`."""
+        return os.path.exists(os.path.join(path, 'meta.json'))
+
+
+if __name__ == '__main__':
+    from utils.columnar import read_table
+    store = RatingStore.from_frame(read_table(RATINGS_PATH, as_category=False),
+                                   label_column='title')
+    store.save()
+    print(f"Stored {len(store)} ratings of {store.n_users} users and "
+          f"{store.n_items} movies in: {RATING_STORE_DIR}")
@@ -0,0 +1,166 @@
+"""
+
+    Lazy loading registry for the recommenders' artifacts.
+
+    Author: Explore Data Science Academy.
+
+    Description: Datasets and models used by the recommenders are
+    registered here with a loader function, rather than being read at
+    import time. Each artifact is loaded (once, thread-safely) the first
+    time it is requested, so that the app can render its pages without
+    paying for models which have not been selected yet. Artifacts can
+    also be warmed up ahead of time within a background thread.
+
+"""
+# Script dependencies
+import threading
+import time
+
+# Registered artifacts, by name.
+_resources = {}
+
+
+class LazyResource:
+    """An artifact which is loaded on first use.
+
+    Parameters
+    ----------
+    name : str
+        Name the artifact is registered under.
+    loader : callable
+        Function taking no arguments, which returns the artifact.
+
+    """
+
+    def __init__(self, name, loader):
+        self.name = name
+        self.loader = loader
+        self.load_seconds = None
+        self._value = None
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self):
+        return self._loaded
+
+    def get(self):
+        """Return the artifact, loading it if this is its first use."""
+        if not self._loaded:
+            with self._lock:
+                if not self._loaded:
+                    start = time.perf_counter()
+                    self._value = self.loader()
+                    self.load_seconds = time.perf_counter() - start
+                    self._loaded = True
+        return self._value
+
+    def set(self, value):
+        """Replace the artifact, e.g. with a newer version of a model."""
+        with self._lock:
+            self._value = value
+            self._loaded = True
+
+    def reset(self):
+        """Discard the artifact, so that it is reloaded on next use."""
+        with self._lock:
+            self._value = None
+            self._loaded = False
+            self.load_seconds = None
+
+
+def register(name, loader):
+    """Register an artifact under `name`, to be loaded on first use.
+
+    Returns
+    -------
+    LazyResource
+        The registered artifact.
+
+    """
+    resource = LazyResource(name, loader)
+    _resources[name] = resource
+    return resource
+
+
+def get(name):
+    """Return the artifact registered under `name`, loading it if needed."""
+    return _resources[name].get()
+
+
+def set(name, value):
+    """Replace the artifact registered under `name`, e.g. with a newer version."""
+    _resources[name].set(value)
+
+
+def reset(names=None):
+    """Discard artifacts, so that they are reloaded on next use.
+
+    Parameters
+    ----------
+    names : list (str)
+        Artifacts to discard. Defaults to every registered artifact.
+
+    """
+    for name in list(_resources) if names is None else names:
+        _resources[name].reset()
+
+
+def names():
+    """Names of every registered artifact."""
+    return list(_resources)
+
+
+def is_loaded(name):
+    """Whether the artifact registered under `name` has been loaded."""
+    return name in _resources and _resources[name].loaded
+
+
+def load_times():
+    """Seconds taken to load each artifact loaded so far, by name."""
+    return {name: resource.load_seconds for name, resource in _resources.items()
+            if resource.loaded}
+
+
+# Background warm-up thread, if one has been started.
+_warm_up_thread = None
+
+def warm_up(names=None, background=True):
+    """Load artifacts ahead of their first use.
+
+    Parameters
+    ----------
+    names : list (str)
+        Artifacts to load. Defaults to every registered artifact.
+    background : bool
+        Whether to load the artifacts within a daemon thread, rather than
+        blocking the caller.
+
+    Returns
+    -------
+    threading.Thread or None
+        The warm-up thread, if one is running. Repeated calls while it is
+        running do not start another.
+
+    """
+    global _warm_up_thread
+    names = list(_resources) if names is None else names
+    pending = [name for name in names if not is_loaded(name)]
+    if not pending:
+        return None
+
+    def load_all():
+        for name in pending:
+            try:
+                get(name)
+            except Exception as e:
+                print(f"Warm-up of {name} failed: {e}")
+
+    if not background:
+        load_all()
+        return None
+    if _warm_up_thread is None or not _warm_up_thread.is_alive():
+        _warm_up_thread = threading.Thread(target=load_all, name='warm-up',
+                                           daemon=True)
+        _warm_up_thread.start()
+    return _warm_up_thread
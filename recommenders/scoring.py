@@ -0,0 +1,78 @@
+"""
+
+    Top-k selection helpers shared by the recommenders.
+
+    Author: Explore Data Science Academy.
+
+    Description: Functions to select the highest scoring items from a
+    score vector (or a batch of score vectors) using `np.argpartition`,
+    rather than sorting the entire catalogue.
+
+"""
+# Script dependencies
+import numpy as np
+
+
+def top_k_indices(scores, k, exclude=()):
+    """Select the indices of the k highest scores, best first.
+
+    Parameters
+    ----------
+    scores : np.ndarray (float)
+        One score per item in the catalogue.
+    k : int
+        Number of items to select.
+    exclude : iterable (int)
+        Item indices which may not be selected (e.g. the query items).
+
+    Returns
+    -------
+    np.ndarray (int)
+        Up to k item indices, ordered by descending score, with ties
+        going to the lowest index.
+
+    """
+    return top_k_batch(np.asarray(scores)[:, None], k, [exclude])[0]
+
+
+def top_k_batch(score_matrix, k, excludes):
+    """Select the top-k items for every column of a score matrix.
+
+    Parameters
+    ----------
+    score_matrix : np.ndarray (float)
+        Scores of shape (n_items, n_queries).
+    k : int
+        Number of items to select per query.
+    excludes : list (iterable (int))
+        Item indices which may not be selected, one entry per query.
+
+    Returns
+    -------
+    list (np.ndarray (int))
+        Up to k item indices per query, ordered by descending score, with
+        ties going to the lowest index.
+
+    """
+    scores = np.array(score_matrix, dtype=np.float64)
+    for j, exclude in enumerate(excludes):
+        exclude = np.asarray(list(exclude), dtype=np.int64)
+        if exclude.size:
+            scores[exclude, j] = -np.inf
+    results = []
+    for column in scores.T:
+        n_selectable = min(k, np.count_nonzero(column > -np.inf))
+        if n_selectable <= 0:
+            results.append(np.empty(0, dtype=np.int64))
+            continue
+        # Items beating the k-th best score are all selected; items tied with
+        # it fill the remaining places, in favour of the lowest index, so that
+        # heavy ties (e.g. zero similarities) never widen the candidates
+        best = np.argpartition(-column, n_selectable - 1)[:n_selectable]
+        threshold = column[best].min()
+        above = np.flatnonzero(column > threshold)
+        tied = np.flatnonzero(column == threshold)[:n_selectable - len(above)]
+        candidates = np.concatenate([above, tied])
+        order = np.lexsort((candidates, -column[candidates]))
+        results.append(candidates[order])
+    return results
@@ -0,0 +1,343 @@
+"""
+
+    HTTP/JSON recommendation service.
+
+    Author: Explore Data Science Academy.
+
+    Description: Standalone asyncio web service (standard library only)
+    which serves the recommenders over HTTP, so that they can be used
+    outside of the Streamlit app, and so that scoring does not block
+    Streamlit reruns.
+
+    Endpoints:
+        POST /recommend/content  {"movies": [...], "top_n": 10}
+        POST /recommend/collab   {"movies": [...], "top_n": 10}
+        POST /recommend/hybrid   {"movies": [...], "top_n": 10}
+            -> {"recommendations": [...]}
+        GET  /health  -> 200 while the service is running
+        GET  /ready   -> 200 once every worker has loaded its artifacts,
+                         503 until then
+
+    Scoring runs within a pool of worker processes, each of which loads
+    the recommenders' artifacts once (see `recommenders.batch`).
+    Concurrent requests for the same algorithm and `top_n` are gathered
+    for up to `max_wait` seconds into a micro-batch, which is scored with
+    a single task; content-based and hybrid micro-batches are scored in
+    one vectorized pass.
+
+    Run from the root of the repository:
+
+        python -m recommenders.service --port 8000 --workers 4
+
+    The Streamlit app uses the service instead of the in-process models
+    when the environment variable RECOMMENDER_SERVICE_URL is set (see
+    `remote_model`).
+
+"""
+# Script dependencies
+import os
+import json
+import asyncio
+import argparse
+import inspect
+import multiprocessing
+import urllib.request
+from concurrent.futures import ProcessPoolExecutor
+from http import HTTPStatus
+from recommenders import registry
+from recommenders.batch import ARTIFACTS, _init_worker, recommend_shard
+
+# Largest request body accepted, in bytes.
+MAX_BODY_BYTES = 1 << 20
+
+
+class _RequestError(Exception):
+    """Request which cannot be read, answered with `status` before the
+    connection is closed."""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def _init_service_worker(algorithms):
+    for algorithm in algorithms:
+        _init_worker(algorithm)
+
+
+def _loaded(algorithms):
+    return all(registry.is_loaded(name) for algorithm in algorithms
+               for name in ARTIFACTS[algorithm])
+
+
+class MicroBatcher:
+    """Gathers concurrent requests into batches scored by a worker pool.
+
+    Parameters
+    ----------
+    executor : concurrent.futures.Executor
+        Pool within which `recommend_shard` is run.
+    max_batch : int
+        Largest number of requests scored together.
+    max_wait : float
+        Seconds the first request of a batch waits for others to join it.
+
+    """
+
+    def __init__(self, executor, max_batch=64, max_wait=0.002):
+        self.executor = executor
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._pending = {}
+        self.n_batches = 0
+        self.n_requests = 0
+
+    async def recommend(self, algorithm, movies, top_n):
+        """Recommendations for one favourite list, scored within a batch."""
+        key = (algorithm, top_n)
+        future = asyncio.get_running_loop().create_future()
+        batch = self._pending.setdefault(key, [])
+        batch.append((movies, future))
+        if len(batch) == 1:
+            asyncio.get_running_loop().call_later(self.max_wait, self._flush, key)
+        elif len(batch) >= self.max_batch:
+            self._flush(key)
+        return await future
+
+    def _flush(self, key):
+        batch = self._pending.pop(key, None)
+        if not batch:
+            return
+        algorithm, top_n = key
+        self.n_batches += 1
+        self.n_requests += len(batch)
+        shard = [(str(i), movies) for i, (movies, _) in enumerate(batch)]
+        task = asyncio.get_running_loop().run_in_executor(
+            self.executor, recommend_shard, (algorithm, top_n, shard))
+        task.add_done_callback(lambda done: self._resolve(batch, done))
+
+    @staticmethod
+    def _resolve(batch, done):
+        error = done.exception()
+        for i, (_, future) in enumerate(batch):
+            if future.done():
+                continue
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(done.result()[i]['recommendations'])
+
+
+class RecommendationService:
+    """asyncio HTTP server wrapping the recommenders.
+
+    Parameters
+    ----------
+    n_workers : int
+        Number of scoring processes. Defaults to every core.
+    algorithms : list (str)
+        Algorithms served; their artifacts are loaded by every worker.
+    max_batch : int
+        Largest number of requests scored together.
+    max_wait : float
+        Seconds a request may wait for others to join its batch.
+
+    """
+
+    def __init__(self, n_workers=None, algorithms=tuple(ARTIFACTS),
+                 max_batch=64, max_wait=0.002):
+        self.n_workers = n_workers or os.cpu_count()
+        self.algorithms = list(algorithms)
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.ready = False
+        self.executor = None
+        self.batcher = None
+
+    async def start(self, host='127.0.0.1', port=8000):
+        """Start the worker pool and the server, returning the server."""
+        # Forked workers inherit artifacts loaded by the parent
+        if multiprocessing.get_start_method() == 'fork':
+            _init_service_worker(self.algorithms)
+        self.executor = ProcessPoolExecutor(self.n_workers, initializer=_init_service_worker,
+                                            initargs=(self.algorithms,))
+        self.batcher = MicroBatcher(self.executor, self.max_batch, self.max_wait)
+
+        # Submitting one task per worker starts (and initializes) them all,
+        # before the listening socket is opened
+        loop = asyncio.get_running_loop()
+        probes = [loop.run_in_executor(self.executor, _loaded, self.algorithms)
+                  for _ in range(self.n_workers)]
+        loop.create_task(self._warm_up(probes))
+        return await asyncio.start_server(self._handle, host, port)
+
+    async def _warm_up(self, probes):
+        try:
+            loaded = await asyncio.gather(*probes)
+            self.ready = all(loaded)
+            if not self.ready:
+                print("Recommendation service workers failed to load their artifacts.")
+        except Exception as e:
+            print(f"Recommendation service warm-up failed: {e}")
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+
+    async def _handle(self, reader, writer):
+        try:
+            while True:
+                try:
+                    request = await self._read_request(reader)
+                except _RequestError as e:
+                    # The rest of the stream cannot be trusted to start a request
+                    self._write_response(writer, e.status, {'error': str(e)}, False)
+                    await writer.drain()
+                    break
+                if request is None:
+                    break
+                method, path, headers, body = request
+                status, payload = await self._route(method, path, body)
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                self._write_response(writer, status, payload, keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, ValueError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def _read_request(reader):
+        """(method, path, headers, body) of the next request, or None at the
+        end of the stream.
+
+        Raises `_RequestError` (400) for a malformed request line or
+        Content-Length header, and (413) for a body larger than
+        MAX_BODY_BYTES, which is left unread.
+        """
+        request_line = await reader.readline()
+        if not request_line:
+            return None
+        parts = request_line.decode('latin-1').split(' ', 2)
+        if len(parts) != 3:
+            raise _RequestError(400, 'Malformed request line.')
+        method, path, _ = parts
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+        try:
+            length = int(headers.get('content-length', 0))
+        except ValueError:
+            raise _RequestError(400, 'Invalid Content-Length header.') from None
+        if length < 0:
+            raise _RequestError(400, 'Invalid Content-Length header.')
+        if length > MAX_BODY_BYTES:
+            raise _RequestError(413, f'Request body exceeds {MAX_BODY_BYTES} bytes.')
+        body = await reader.readexactly(length) if length else b''
+        return method, path.split('?', 1)[0], headers, body
+
+    @staticmethod
+    def _write_response(writer, status, payload, keep_alive):
+        body = json.dumps(payload).encode()
+        status = HTTPStatus(status)
+        writer.write((f'HTTP/1.1 {status.value} {status.phrase}\r\n'
+                      'Content-Type: application/json\r\n'
+                      f'Content-Length: {len(body)}\r\n'
+                      f'Connection: {"keep-alive" if keep_alive else "close"}\r\n'
+                      '\r\n').encode() + body)
+
+    async def _route(self, method, path, body):
+        if path == '/health':
+            return 200, {'status': 'ok'}
+        if path == '/ready':
+            return (200, {'status': 'ready'}) if self.ready else (503, {'status': 'loading'})
+        if path == '/stats':
+            return 200, {'batches': self.batcher.n_batches,
+                         'requests': self.batcher.n_requests}
+        prefix = '/recommend/'
+        if not path.startswith(prefix) or path[len(prefix):] not in self.algorithms:
+            return 404, {'error': f'Unknown endpoint: {path}'}
+        if method != 'POST':
+            return 405, {'error': 'Use POST with a JSON body.'}
+        try:
+            request = json.loads(body)
+        except ValueError as e:
+            return 400, {'error': f'Invalid request: {e}'}
+        if not isinstance(request, dict):
+            return 400, {'error': 'Invalid request: expected a JSON object.'}
+        movies = request.get('movies')
+        if not isinstance(movies, list) or not all(isinstance(title, str) for title in movies):
+            return 400, {'error': "Invalid request: 'movies' must be a list of titles."}
+        top_n = request.get('top_n', 10)
+        if isinstance(top_n, bool) or not isinstance(top_n, int) or top_n < 1:
+            return 400, {'error': "Invalid request: 'top_n' must be a positive integer."}
+        try:
+            titles = await self.batcher.recommend(path[len(prefix):], movies, top_n)
+        except Exception as e:
+            return 500, {'error': str(e)}
+        return 200, {'recommendations': titles}
+
+
+def remote_model(base_url, algorithm, fallback=None, timeout=30):
+    """Recommendation function which calls the service at `base_url`.
+
+    The returned function takes a list of movies and `top_n`, with the
+    same signature as `fallback` (the in-process `content_model` or
+    `collab_model`), which is called instead if the service cannot be
+    reached.
+    """
+    url = f"{base_url.rstrip('/')}/recommend/{algorithm}"
+    signature = inspect.signature(fallback if fallback is not None
+                                  else lambda movie_list, top_n=5: None)
+
+    def recommend(*args, **kwargs):
+        bound = signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+        movies, top_n = bound.args
+        request = urllib.request.Request(
+            url, data=json.dumps({'movies': list(movies), 'top_n': top_n}).encode(),
+            headers={'Content-Type': 'application/json'}, method='POST')
+        try:
+            with urllib.request.urlopen(request, timeout=timeout) as response:
+                return json.load(response)['recommendations']
+        except OSError as e:
+            if fallback is None:
+                raise
+            print(f"Recommendation service unavailable ({e}), scoring locally.")
+            return fallback(movies, top_n)
+
+    return recommend
+
+
+async def serve(host, port, n_workers, max_batch, max_wait):
+    service = RecommendationService(n_workers, max_batch=max_batch, max_wait=max_wait)
+    server = await service.start(host, port)
+    print(f"Serving recommendations on http://{host}:{port}")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        service.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='HTTP/JSON recommendation service.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--max-batch', type=int, default=64)
+    parser.add_argument('--max-wait', type=float, default=0.002,
+                        help='Seconds a request may wait to join a micro-batch.')
+    args = parser.parse_args()
+    asyncio.run(serve(args.host, args.port, args.workers, args.max_batch,
+                      args.max_wait))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+"""
+
+    Offline TF-IDF index build for content-based filtering.
+
+    Author: Explore Data Science Academy.
+
+    Description: Simple script to fit the TF-IDF vectorizer over the
+    cleaned movie overviews once, and save the sparse document matrix
+    and title index used by `recommenders.content_based.content_model`.
+
+    Run from the root of the repository:
+
+        python resources/models/build_content_index.py
+
+    With `--append`, only movies added to the content data since the
+    stored index was built are vectorized and appended (see
+    `recommenders.content_based.update_content_index`). The appended
+    index is saved straight away, so that running apps pick the new
+    movies up, and if the new movies have drifted far enough from the
+    fitted vocabulary, the refit index is saved once it is ready:
+
+        python resources/models/build_content_index.py --append
+
+"""
+# Script dependencies
+import os
+import sys
+import argparse
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from recommenders import content_based
+from recommenders.content_index import (INDEX_MATRIX_PATH, build_content_index,
+                                        save_content_index)
+
+# Importing datasets
+content_data = pd.read_csv('resources/data/content_data_clean.csv')
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Build the content index.')
+    parser.add_argument('--append', action='store_true',
+                        help='Append new movies to the stored index instead of refitting.')
+    args = parser.parse_args()
+
+    if args.append and os.path.exists(INDEX_MATRIX_PATH):
+        index = content_based.update_content_index(content_data)
+        print(f"Appended {len(index) - index.n_fitted} movies since the last fit "
+              f"(IDF drift {index.idf_drift():.3f})")
+        if content_based.wait_for_refit():
+            index = content_based.get_content_index()
+    else:
+        index = build_content_index(content_data)
+        save_content_index(index)
+    print(f"Index over {len(index)} movies saved to: resources/models/")
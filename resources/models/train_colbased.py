@@ -5,21 +5,40 @@
     Author: Explore Data Science Academy.
 
     Description: Simple script to train and save an instance of the
-    SVDpp algorithm on MovieLens data.
+    SVDpp algorithm on MovieLens data. An approximate nearest-neighbour
+    index over the learnt item factors is built and saved alongside it.
+
+    By default the same biased factorization is trained with parallel,
+    out-of-core ALS (`recommenders.als`), which streams the ratings in
+    chunks and uses every core, and only the factor arrays and id maps
+    are saved. Pass `--engine surprise` to train and pickle the surprise
+    model instead (its factors are then exported as well). Factors are
+    saved as float32, or as int8 with one scale per row with
+    `--precision int8`:
+
+        python train_colbased.py --engine als --workers 8 --precision int8
 
 """
 # Script dependencies
+import os
+import sys
+import argparse
+import tempfile
 import numpy as np
 import pandas as pd
-from surprise import SVD
-import surprise
 import pickle
 
-# Importing datasets
-ratings = pd.read_csv('ratings.csv')
-ratings.drop('timestamp',axis=1,inplace=True)
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from recommenders.ann import IVFIndex
+from recommenders.factors import PRECISIONS, SVDFactors
+from recommenders.als import train_als
 
 def svd_pp(save_path):
+    from surprise import SVD
+    import surprise
+    # Importing datasets
+    ratings = pd.read_csv('ratings.csv')
+    ratings.drop('timestamp',axis=1,inplace=True)
     # Check the range of the rating
     min_rat = ratings['rating'].min()
     max_rat = ratings['rating'].max()
@@ -32,8 +51,57 @@ def svd_pp(save_path):
     # Loading a trainset into the model
     model = method.fit(data_load.build_full_trainset())
     print (f"Training completed. Saving model to: {save_path}")
+    pickle.dump(model, open(save_path,'wb'))
+
+    return model
+
+def als(save_dir, n_workers=None, n_epochs=15, chunk_size=1_000_000, precision='float32'):
+    # Intermediate rating arrays are kept in a scratch directory beside
+    # the factors (on the same disk), removed once they are saved
+    parent = os.path.dirname(os.path.abspath(save_dir))
+    with tempfile.TemporaryDirectory(prefix='als-work-', dir=parent) as work_dir:
+        factors = train_als('ratings.csv', work_dir,
+                            n_factors=200, n_epochs=n_epochs, reg=0.05,
+                            init_std_dev=0.05, n_workers=n_workers,
+                            chunk_size=chunk_size)
+        print (f"Training completed. Saving factors to: {save_dir}")
+        factors.save(save_dir, precision)
+        # The id maps may be memory-mapped from the scratch directory
+        factors = SVDFactors.load(save_dir)
 
-    return pickle.dump(model, open(save_path,'wb'))
+    return factors
+
+def build_ann(factors, save_path, target_recall=0.95, k=10, n_queries=500):
+    """Build an IVF index over the learnt item factors.
+
+    `nprobe` is calibrated so that recall@k against exact scoring reaches
+    `target_recall`, using a sample of the trained users as queries.
+    """
+    index = IVFIndex.build(factors.item_vectors())
+    rng = np.random.default_rng(0)
+    users = rng.choice(len(factors.pu), min(n_queries, len(factors.pu)), replace=False)
+    queries = np.array([factors.query_vector(factors.pu[u]) for u in users])
+    recall = index.calibrate(queries, k=k, target_recall=target_recall)
+    print (f"ANN index built with {index.n_lists} lists, nprobe={index.nprobe} "
+           f"(recall@{k}={recall:.3f}). Saving index to: {save_path}")
+    index.save(save_path)
+
+    return index
 
 if __name__ == '__main__':
-    svd_pp('SVD.pkl')
+    parser = argparse.ArgumentParser(description='Train the collaborative model.')
+    parser.add_argument('--engine', choices=['als', 'surprise'], default='als')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--epochs', type=int, default=15)
+    parser.add_argument('--chunk-size', type=int, default=1_000_000)
+    parser.add_argument('--precision', choices=PRECISIONS, default='float32')
+    args = parser.parse_args()
+
+    if args.engine == 'als':
+        factors = als('collab_factors', args.workers, args.epochs, args.chunk_size,
+                      args.precision)
+    else:
+        SVDFactors.from_surprise(svd_pp('SVD.pkl')).save('collab_factors', args.precision)
+        # The index must be built over the factors as saved, which the app loads
+        factors = SVDFactors.load('collab_factors')
+    build_ann(factors, 'collab_ann.npz')
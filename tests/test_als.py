@@ -0,0 +1,62 @@
+import re
+import numpy as np
+import pandas as pd
+import pytest
+from recommenders.als import solve_rows, train_als
+
+
+def _ridge(design, target, reg):
+    # The penalty as extra rows of a least squares problem
+    penalty = np.sqrt(reg * len(design)) * np.eye(design.shape[1])
+    augmented = np.vstack([design, penalty])
+    return np.linalg.lstsq(augmented, np.append(target, np.zeros(design.shape[1])),
+                           rcond=None)[0]
+
+
+@pytest.mark.parametrize('biased', [True, False])
+def test_solve_rows_matches_a_direct_ridge_solve(biased):
+    rng = np.random.default_rng(0)
+    fixed = rng.normal(size=(12, 3)).astype(np.float32)
+    fixed_bias = rng.normal(0, 0.3, 12).astype(np.float32)
+    # Row 1 has no ratings
+    indptr = np.array([0, 5, 5, 12])
+    indices = np.concatenate([rng.choice(12, 5, replace=False), rng.choice(12, 7, replace=False)])
+    values = rng.uniform(0.5, 5.0, 12).astype(np.float32)
+    solutions = solve_rows(range(3), indptr, indices, values, fixed, fixed_bias,
+                           3.5, 0.1, biased)
+    assert solutions.shape == (3, 4 if biased else 3)
+    np.testing.assert_array_equal(solutions[1], 0)
+    for row in (0, 2):
+        others = indices[indptr[row]:indptr[row + 1]]
+        target = values[indptr[row]:indptr[row + 1]] - 3.5
+        design = fixed[others].astype(np.float64)
+        if biased:
+            target = target - fixed_bias[others]
+            design = np.hstack([design, np.ones((len(others), 1))])
+        np.testing.assert_allclose(solutions[row], _ridge(design, target, 0.1),
+                                   rtol=1e-4, atol=1e-5)
+
+
+def test_train_als_lowers_the_rmse(tmp_path):
+    # Ratings of a rank-2 model plus noise
+    rng = np.random.default_rng(1)
+    users, items = rng.normal(size=(60, 2)), rng.normal(size=(40, 2))
+    pairs = rng.choice(60 * 40, 1200, replace=False)
+    u, i = pairs // 40 * 7 + 1, pairs % 40 * 3 + 2
+    scores = 3 + (users[pairs // 40] * items[pairs % 40]).sum(axis=1)
+    ratings = np.clip(np.round(scores + rng.normal(0, 0.1, len(pairs)), 1), 0.5, 5.0)
+    csv_path = tmp_path / 'ratings.csv'
+    pd.DataFrame({'userId': u, 'movieId': i, 'rating': ratings}).to_csv(csv_path, index=False)
+
+    messages = []
+    factors = train_als(str(csv_path), str(tmp_path), n_factors=4, n_epochs=5, reg=0.02,
+                        n_workers=2, shard_size=16, chunk_size=500, log=messages.append)
+    epoch_rmse = [float(m) for m in re.findall(r'train RMSE ([\d.]+)', ' '.join(messages))]
+    assert len(epoch_rmse) == 5
+    assert epoch_rmse[-1] <= epoch_rmse[0]
+    assert epoch_rmse[-1] < 0.5 * np.std(ratings)
+
+    # Factor rows follow the raw ids of the .csv
+    rows = factors.user_rows(u), factors.item_rows(i)
+    estimates = factors.predict_pairs(*rows)
+    assert np.sqrt(np.mean((estimates - ratings) ** 2)) == pytest.approx(epoch_rmse[-1], abs=1e-3)
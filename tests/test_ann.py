@@ -0,0 +1,85 @@
+import numpy as np
+import pytest
+from recommenders.ann import IVFIndex, kmeans
+
+
+@pytest.fixture
+def vectors():
+    return np.random.default_rng(0).normal(size=(300, 8)).astype(np.float32)
+
+
+@pytest.fixture
+def queries():
+    return np.random.default_rng(1).normal(size=(20, 8)).astype(np.float32)
+
+
+def test_kmeans_centroids_are_the_means_of_their_clusters(vectors):
+    centroids, assignment = kmeans(vectors, 10)
+    assert centroids.shape == (10, 8) and assignment.shape == (len(vectors),)
+    np.testing.assert_array_equal(np.unique(assignment), np.arange(10))
+    for cluster in range(10):
+        np.testing.assert_allclose(centroids[cluster],
+                                   vectors[assignment == cluster].mean(axis=0), atol=1e-5)
+
+
+def test_build_stores_every_row_once(vectors):
+    index = IVFIndex.build(vectors, n_lists=12)
+    assert len(index) == len(vectors) and index.n_lists == 12
+    np.testing.assert_array_equal(np.sort(index.ids), np.arange(len(vectors)))
+    np.testing.assert_array_equal(index.vectors, vectors[index.ids])
+    assert index.indptr[0] == 0 and index.indptr[-1] == len(vectors)
+    assert np.all(np.diff(index.indptr) >= 0)
+
+
+def test_search_probing_every_list_is_exact(vectors, queries):
+    index = IVFIndex.build(vectors, n_lists=12)
+    assert index.recall_at_k(queries, 10, nprobe=index.n_lists) == 1.0
+    rows, scores = index.search(queries[0], 5, nprobe=index.n_lists)
+    exact = vectors @ queries[0]
+    np.testing.assert_array_equal(rows, np.argsort(-exact)[:5])
+    np.testing.assert_allclose(scores, exact[rows], rtol=1e-5)
+
+
+def test_search_exclude_and_allowed(vectors, queries):
+    index = IVFIndex.build(vectors, n_lists=12)
+    best, _ = index.search(queries[0], 5, nprobe=index.n_lists)
+    rows, _ = index.search(queries[0], 5, nprobe=index.n_lists, exclude=best[:2])
+    assert not set(best[:2]) & set(rows)
+    np.testing.assert_array_equal(rows[:3], best[2:])
+
+    allowed = np.zeros(len(vectors), dtype=bool)
+    allowed[::3] = True
+    rows, _ = index.search(queries[0], 5, nprobe=index.n_lists, allowed=allowed)
+    assert np.all(rows % 3 == 0)
+    exact = vectors[::3] @ queries[0]
+    np.testing.assert_array_equal(rows, np.argsort(-exact)[:5] * 3)
+
+
+@pytest.mark.parametrize('target', [0.5, 0.9, 1.0])
+def test_calibrate_reaches_its_target(vectors, queries, target):
+    index = IVFIndex.build(vectors, n_lists=16)
+    recall = index.calibrate(queries, k=10, target_recall=target)
+    assert recall >= target
+    assert recall == index.recall_at_k(queries, 10)
+    if index.nprobe > 1:
+        # The next smaller power of two falls short of the target
+        assert index.recall_at_k(queries, 10, index.nprobe // 2) < target
+
+
+def test_matches_rejects_changed_vectors(vectors):
+    index = IVFIndex.build(vectors, n_lists=12)
+    assert index.matches(vectors)
+    changed = vectors.copy()
+    changed[7, 3] += 0.5
+    assert not index.matches(changed)
+    assert not index.matches(vectors[:-1])
+
+
+def test_save_and_load_round_trip(tmp_path, vectors, queries):
+    index = IVFIndex.build(vectors, n_lists=12)
+    index.calibrate(queries, target_recall=0.9)
+    path = tmp_path / 'ann.npz'
+    index.save(path)
+    loaded = IVFIndex.load(path)
+    assert loaded.nprobe == index.nprobe and loaded.matches(vectors)
+    np.testing.assert_array_equal(loaded.search(queries[0], 5)[0], index.search(queries[0], 5)[0])
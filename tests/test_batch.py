@@ -0,0 +1,57 @@
+import json
+from recommenders import batch
+
+
+def _no_artifacts(algorithm):
+    pass
+
+
+def _echo_shard(args):
+    # Recommends each list's own movies, recording which lists were scored
+    algorithm, top_n, shard = args
+    return [{'id': list_id, 'algorithm': algorithm, 'recommendations': movies[:top_n]}
+            for list_id, movies in shard]
+
+
+def _write_favourites(path, n):
+    with open(path, 'w') as f:
+        for i in range(n):
+            f.write(json.dumps({'id': f'u{i}', 'movies': [f'Movie {i}']}) + '\n')
+
+
+def _read_output(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f]
+
+
+def test_completed_ids_drops_a_partial_last_line(tmp_path):
+    output = tmp_path / 'out.jsonl'
+    output.write_text('{"id": "a"}\n{"id": "b"}\n{"id": "c", "recomm')
+    assert batch.completed_ids(str(output)) == {'a', 'b'}
+    assert output.read_text() == '{"id": "a"}\n{"id": "b"}\n'
+    assert batch.completed_ids(str(tmp_path / 'missing.jsonl')) == set()
+
+
+def test_run_scores_only_the_lists_missing_from_a_truncated_output(tmp_path, monkeypatch):
+    monkeypatch.setattr(batch, '_init_worker', _no_artifacts)
+    monkeypatch.setattr(batch, 'recommend_shard', _echo_shard)
+    favourites, output = tmp_path / 'favourites.jsonl', tmp_path / 'out.jsonl'
+    _write_favourites(favourites, 10)
+
+    assert batch.run(str(favourites), str(output), n_workers=2, shard_size=3,
+                     log=lambda message: None) == 10
+    # Simulate a run killed while writing the seventh record
+    with open(output) as f:
+        lines = f.readlines()
+    output.write_text(''.join(lines[:6]) + lines[6][:10])
+
+    assert batch.run(str(favourites), str(output), n_workers=2, shard_size=3,
+                     log=lambda message: None) == 4
+    records = _read_output(output)
+    assert [record['id'] for record in records] == [f'u{i}' for i in range(10)]
+    assert records[8]['recommendations'] == ['Movie 8']
+
+    # Nothing is left to score
+    assert batch.run(str(favourites), str(output), n_workers=2,
+                     log=lambda message: None) == 0
+    assert len(_read_output(output)) == 10
@@ -0,0 +1,62 @@
+import os
+from recommenders import cache as cache_module
+from recommenders.cache import RecommendationCache
+
+
+class _Counter:
+    """Computation returning fixed recommendations, counting its calls."""
+
+    def __init__(self, value=('A', 'B')):
+        self.value = list(value)
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return self.value
+
+
+def test_key_ignores_movie_order_and_duplicates():
+    cache, compute = RecommendationCache(), _Counter()
+    cache.get_or_compute('content', ['X', 'Y'], 5, 'v1', compute)
+    assert cache.get_or_compute('content', ['Y', 'X', 'X'], 5, 'v1', compute) == ['A', 'B']
+    assert compute.calls == 1
+    for other in [('collab', ['X', 'Y'], 5, 'v1'), ('content', ['X', 'Y'], 6, 'v1'),
+                  ('content', ['X', 'Y'], 5, 'v2')]:
+        cache.get_or_compute(*other, compute)
+    assert compute.calls == 4
+    assert cache.stats()['hits'] == 1
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache, compute = RecommendationCache(max_size=2), _Counter()
+    for movie in ['X', 'Y']:
+        cache.get_or_compute('content', [movie], 5, 'v1', compute)
+    cache.get_or_compute('content', ['X'], 5, 'v1', compute)
+    cache.get_or_compute('content', ['Z'], 5, 'v1', compute)
+    cache.get_or_compute('content', ['X'], 5, 'v1', compute)
+    assert compute.calls == 3
+    assert cache.stats()['evictions'] == 1
+
+
+def test_entries_expire(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache_module.time, 'time', lambda: now[0])
+    cache, compute = RecommendationCache(ttl=10), _Counter()
+    cache.get_or_compute('content', ['X'], 5, 'v1', compute)
+    now[0] += 11
+    cache.get_or_compute('content', ['X'], 5, 'v1', compute)
+    assert compute.calls == 2
+    assert cache.stats()['expirations'] == 1
+
+
+def test_disk_tier_is_shared(tmp_path):
+    path = os.path.join(tmp_path, 'cache.sqlite')
+    compute = _Counter()
+    RecommendationCache(disk_path=path).get_or_compute('content', ['X'], 5, 'v1', compute)
+    other = RecommendationCache(disk_path=path)
+    assert other.get_or_compute('content', ['X'], 5, 'v1', compute) == ['A', 'B']
+    assert compute.calls == 1
+    assert other.stats()['disk_hits'] == 1
+    other.clear()
+    other.get_or_compute('content', ['X'], 5, 'v1', compute)
+    assert compute.calls == 2
@@ -0,0 +1,96 @@
+import numpy as np
+import pandas as pd
+import pytest
+from recommenders import collaborative_based, registry
+from recommenders.factors import SVDFactors
+from recommenders.rating_store import RatingStore
+
+
+class _Prediction:
+    def __init__(self, est):
+        self.est = est
+
+
+class _StubModel:
+    """Surprise-like model predicting from the parameters of `factors`."""
+
+    def __init__(self, factors):
+        self.factors = factors
+        self.user_row = {uid: row for row, uid in enumerate(factors.user_ids)}
+        self.item_row = {iid: row for row, iid in enumerate(factors.item_ids)}
+
+    def predict(self, uid, iid):
+        f = self.factors
+        u, i = self.user_row[uid], self.item_row[iid]
+        est = f.global_mean + f.bu[u] + f.bi[i] + f.qi[i] @ f.pu[u]
+        return _Prediction(min(max(est, f.rating_scale[0]), f.rating_scale[1]))
+
+
+def _original_collab_model(ratings, model, chosen_movies):
+    """The per-user loop `collab_model` ran before it was vectorized.
+
+    Sets are iterated in sorted order, as CPython does for these small ids,
+    so that ties are broken deterministically.
+    """
+    movie_ids = ratings[ratings['title'].isin(chosen_movies)]['movieId'].unique()
+    similar_users = set()
+    for movie_id in movie_ids:
+        movie_ratings = ratings[ratings['movieId'] == movie_id]
+        similar_users.update(movie_ratings[movie_ratings['rating'] >= 4]['userId'])
+    recommended_movies = []
+    for user_id in sorted(similar_users):
+        user_movies = ratings[(ratings['userId'] == user_id)
+                              & (ratings['rating'] >= 4)]['movieId'].unique()
+        user_movies = sorted(set(user_movies) - set(movie_ids))
+        predictions = [(movie_id, model.predict(user_id, movie_id).est)
+                       for movie_id in user_movies]
+        predictions.sort(key=lambda x: x[1], reverse=True)
+        recommended_movies.extend(
+            [(movie_id, ratings[ratings['movieId'] == movie_id]['title'].iloc[0], rating)
+             for movie_id, rating in predictions[:5]])
+    recommended_movies.sort(key=lambda x: x[2], reverse=True)
+    return [(title, rating) for _, title, rating in recommended_movies[:5]]
+
+
+@pytest.fixture
+def liked_ratings():
+    rng = np.random.default_rng(0)
+    n_users, n_movies = 40, 30
+    users = rng.integers(0, n_users, 600) * 3 + 1
+    movies = rng.integers(0, n_movies, 600) * 7 + 2
+    ratings = pd.DataFrame({'userId': users, 'movieId': movies,
+                            'rating': rng.choice([2.0, 3.5, 4.0, 4.5, 5.0], 600)})
+    ratings = ratings.drop_duplicates(['userId', 'movieId'])
+    ratings['title'] = [f'Movie {m}' for m in ratings['movieId']]
+
+    # Factors list the ids in another order than the ratings. The high mean
+    # and item biases clip many predictions to 5.0, which then tie.
+    user_ids = rng.permutation(np.unique(users))
+    item_ids = rng.permutation(np.unique(movies))
+    factors = SVDFactors(rng.normal(0, 0.3, (len(user_ids), 4)),
+                         rng.normal(0, 0.3, (len(item_ids), 4)),
+                         rng.normal(0, 0.2, len(user_ids)),
+                         rng.choice([-1.0, 0.0, 1.5], len(item_ids))
+                         + rng.normal(0, 0.1, len(item_ids)),
+                         4.2, (0.5, 5.0), user_ids, item_ids, True)
+    store = RatingStore.from_frame(ratings, label_column='title')
+    registry.set('collab_liked', collaborative_based._LikedRatings(store, factors))
+    yield ratings, _StubModel(factors)
+    registry.reset(['collab_liked'])
+
+
+def test_neighbour_recommendations_match_the_original_loop(liked_ratings):
+    ratings, model = liked_ratings
+    titles = sorted(ratings['title'].unique())
+    clipped_ties = 0
+    for chosen in [titles[:1], titles[3:6], titles[10:13], titles[-2:]]:
+        expected = _original_collab_model(ratings, model, chosen)
+        got = collaborative_based.neighbour_recommendations(chosen, top_n=5)
+        assert got == [title for title, _ in expected]
+        clipped_ties += sum(rating == 5.0 for _, rating in expected) > 1
+    # Ties at the top of the rating scale were ranked the same way
+    assert clipped_ties > 0
+
+
+def test_neighbour_recommendations_of_unknown_titles(liked_ratings):
+    assert collaborative_based.neighbour_recommendations(['Not a movie'], top_n=5) == []
@@ -0,0 +1,60 @@
+import os
+import numpy as np
+import pandas as pd
+import pytest
+from utils.columnar import convert_csv, is_converted, load_columnar
+
+
+@pytest.fixture
+def csv_path(tmp_path):
+    path = tmp_path / 'movies.csv'
+    pd.DataFrame({'movieId': [1, 2, 3, 4],
+                  'budget': [10, 2**40, -5, 0],
+                  'rating': [4.5, np.nan, 3.0, 1.5],
+                  'title': ['Heat', None, 'Ran', 'Heat'],
+                  'genres': ['Crime', 'Drama', 'Drama|War', 'Crime']}).to_csv(path, index=False)
+    return str(path)
+
+
+def test_round_trip_kinds(tmp_path, csv_path):
+    out_dir = convert_csv(csv_path, tmp_path / 'columnar')
+    assert np.load(os.path.join(out_dir, 'movieId.npy')).dtype == np.int32
+    # Integers past the int32 range fall back to int64
+    assert np.load(os.path.join(out_dir, 'budget.npy')).dtype == np.int64
+    # Missing text is coded -1
+    np.testing.assert_array_equal(np.load(os.path.join(out_dir, 'title.codes.npy')),
+                                  [0, -1, 1, 0])
+
+    df = load_columnar(csv_path, columnar_dir=tmp_path / 'columnar')
+    np.testing.assert_array_equal(df['movieId'], [1, 2, 3, 4])
+    np.testing.assert_array_equal(df['budget'], [10, 2**40, -5, 0])
+    np.testing.assert_allclose(df['rating'], [4.5, np.nan, 3.0, 1.5])
+    assert df['rating'].dtype == np.float32
+
+
+def test_text_columns_as_category_or_str(tmp_path, csv_path):
+    convert_csv(csv_path, tmp_path)
+    categorical = load_columnar(csv_path, columns=['title'], columnar_dir=tmp_path)
+    assert list(categorical.columns) == ['title']
+    assert isinstance(categorical['title'].dtype, pd.CategoricalDtype)
+    assert categorical['title'].tolist()[::2] == ['Heat', 'Ran']
+    assert pd.isna(categorical['title'][1])
+
+    plain = load_columnar(csv_path, columns=['title', 'genres'], as_category=False,
+                          columnar_dir=tmp_path)
+    assert plain['title'].dtype == object
+    assert plain['title'].tolist()[::2] == ['Heat', 'Ran']
+    assert pd.isna(plain['title'][1])
+    assert plain['genres'].tolist() == ['Crime', 'Drama', 'Drama|War', 'Crime']
+
+
+def test_is_converted_goes_stale_when_the_csv_is_newer(tmp_path, csv_path):
+    assert not is_converted(csv_path, tmp_path)
+    out_dir = convert_csv(csv_path, tmp_path)
+    assert is_converted(csv_path, tmp_path)
+    schema_mtime = os.path.getmtime(os.path.join(out_dir, 'schema.json'))
+    os.utime(csv_path, (schema_mtime + 10, schema_mtime + 10))
+    assert not is_converted(csv_path, tmp_path)
+    convert_csv(csv_path, tmp_path)
+    os.utime(csv_path, (schema_mtime, schema_mtime))
+    assert is_converted(csv_path, tmp_path)
@@ -0,0 +1,61 @@
+import numpy as np
+import pandas as pd
+import pytest
+from recommenders import content_index
+from recommenders.content_index import build_content_index
+
+OVERVIEWS = ['space crew explores distant planet', 'detective solves murder in city',
+             'crew of pirates hunts treasure', 'family comedy about a dog',
+             'space station crew fights alien', 'detective hunts killer in city']
+
+
+def _content(overviews, start=0):
+    n = len(overviews)
+    return pd.DataFrame({'movieId': np.arange(start, start + n) * 10,
+                         'title': [f'Movie {i}' for i in range(start, start + n)],
+                         'genres': ['Drama'] * n, 'cleaned_overview': overviews})
+
+
+@pytest.fixture
+def index():
+    return build_content_index(_content(OVERVIEWS))
+
+
+def test_no_drift_right_after_a_fit(index):
+    assert index.idf_drift() == pytest.approx(0, abs=1e-12)
+    assert not index.needs_refit()
+
+
+def test_appended_matches_a_transform_with_the_fitted_vocabulary(index):
+    new = _content(['crew explores alien planet', 'dog detective comedy'], start=6)
+    appended = index.appended(new)
+    assert len(appended) == 8 and appended.n_fitted == 6
+    assert len(index) == 6
+    np.testing.assert_array_equal(appended.movie_ids, np.arange(8) * 10)
+    np.testing.assert_array_equal(appended.titles[6:], new['title'])
+    # Existing rows are unchanged, and new rows are unit-length fitted TF-IDF
+    assert (appended.matrix[:6] != index.matrix).nnz == 0
+    vectors = index.vectorizer.transform(new['cleaned_overview']).toarray()
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    np.testing.assert_allclose(appended.matrix[6:].toarray(), vectors)
+    # New movies are recommended against the existing ones
+    assert list(appended.rows_for_titles(['Movie 6'])) == [6]
+
+
+def test_needs_refit_past_the_appended_share(index, monkeypatch):
+    monkeypatch.setattr(content_index, 'REFIT_IDF_DRIFT', np.inf)
+    one = index.appended(_content(['crew hunts treasure'], start=6))
+    assert one.idf_drift() > 0
+    monkeypatch.setattr(content_index, 'REFIT_APPENDED_SHARE', 0.2)
+    assert not one.needs_refit()
+    three = one.appended(_content(['city comedy', 'alien dog'], start=7))
+    assert three.needs_refit()
+
+
+def test_needs_refit_past_the_idf_drift(index, monkeypatch):
+    monkeypatch.setattr(content_index, 'REFIT_APPENDED_SHARE', 1.0)
+    appended = index.appended(_content(['space crew alien planet'], start=6))
+    monkeypatch.setattr(content_index, 'REFIT_IDF_DRIFT', appended.idf_drift() * 2)
+    assert not appended.needs_refit()
+    monkeypatch.setattr(content_index, 'REFIT_IDF_DRIFT', appended.idf_drift() / 2)
+    assert appended.needs_refit()
@@ -0,0 +1,83 @@
+import numpy as np
+import pytest
+from recommenders.factors import QuantizedMatrix, SVDFactors
+
+
+@pytest.fixture
+def matrix():
+    return np.random.default_rng(0).normal(0, 0.1, (50, 8))
+
+
+@pytest.mark.parametrize('rows', [None, [0, 2, 1, 3], [0, 0, 2], [5, 6, 7], [9, 3, 3, 40]])
+def test_quantized_dot_matches_dequantized(matrix, rows):
+    quantized = QuantizedMatrix.from_dense(matrix)
+    dense = np.asarray(quantized)
+    other = np.random.default_rng(1).normal(size=(8, 3))
+    selected = dense if rows is None else dense[rows]
+    np.testing.assert_allclose(quantized.dot(other, rows), selected @ other, rtol=1e-5, atol=1e-6)
+    np.testing.assert_allclose(quantized.dot(other[:, 0], rows), selected @ other[:, 0],
+                               rtol=1e-5, atol=1e-6)
+
+
+def test_quantized_dot_across_chunks(matrix):
+    quantized = QuantizedMatrix.from_dense(matrix)
+    quantized.chunk_size = 4
+    rows = np.random.default_rng(2).integers(0, len(matrix), 30)
+    vector = np.ones(8)
+    np.testing.assert_allclose(quantized.dot(vector, rows), np.asarray(quantized)[rows] @ vector,
+                               rtol=1e-5, atol=1e-6)
+
+
+def test_quantization_error_is_bounded(matrix):
+    quantized = QuantizedMatrix.from_dense(matrix)
+    bound = np.abs(matrix).max(axis=1, keepdims=True) / 127 / 2
+    assert np.all(np.abs(np.asarray(quantized) - matrix) <= bound + 1e-7)
+
+
+@pytest.mark.parametrize('precision', ['float64', 'float32', 'int8'])
+def test_save_and_load_round_trip(tmp_path, matrix, precision):
+    rng = np.random.default_rng(3)
+    factors = SVDFactors(matrix[:20], matrix[20:], rng.normal(size=20), rng.normal(size=30),
+                         3.5, (0.5, 5.0), np.arange(20) * 2, np.arange(30) + 100, True)
+    factors.save(tmp_path, precision)
+    loaded = SVDFactors.load(tmp_path)
+    assert loaded.precision == precision
+    np.testing.assert_allclose(loaded.predict_user(matrix[0], 0.1, item_rows=[3, 1, 1]),
+                               factors.predict_user(matrix[0], 0.1, item_rows=[3, 1, 1]),
+                               atol=0.01)
+
+
+def _random_factors(biased, n_users=6, n_items=40, n_factors=5):
+    rng = np.random.default_rng(4)
+    return SVDFactors(rng.normal(0, 0.5, (n_users, n_factors)),
+                      rng.normal(0, 0.5, (n_items, n_factors)),
+                      rng.normal(0, 0.3, n_users), rng.normal(0, 0.3, n_items),
+                      3.5, (0.5, 5.0), np.arange(n_users), np.arange(n_items), biased)
+
+
+@pytest.mark.parametrize('biased', [True, False])
+def test_fold_in_matches_primal_ridge_regression(biased):
+    factors = _random_factors(biased)
+    rows = np.array([3, 7, 7, 12, 30])
+    ratings = np.array([5.0, 4.0, 4.5, 1.0, 3.0])
+    user, bias = factors.fold_in(rows, ratings, reg=0.3)
+
+    design = factors.qi[rows]
+    residuals = ratings - factors.global_mean
+    if biased:
+        residuals = residuals - factors.bi[rows]
+        design = np.hstack([design, np.ones((len(rows), 1))])
+    expected = np.linalg.solve(design.T @ design + 0.3 * np.eye(design.shape[1]),
+                               design.T @ residuals)
+    np.testing.assert_allclose(np.append(user, bias) if biased else user, expected)
+    if not biased:
+        assert bias == 0.0
+
+
+def test_fold_in_recovers_a_known_user():
+    factors = _random_factors(True, n_items=200)
+    rows = np.arange(200)
+    ratings = factors.predict_user(factors.pu[2], factors.bu[2], clip=False)
+    user, bias = factors.fold_in(rows, ratings, reg=1e-6)
+    np.testing.assert_allclose(user, factors.pu[2], atol=1e-4)
+    np.testing.assert_allclose(bias, factors.bu[2], atol=1e-4)
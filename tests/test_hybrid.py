@@ -0,0 +1,34 @@
+import numpy as np
+import pytest
+from recommenders import hybrid
+
+
+@pytest.mark.parametrize('weights', [(0, 0), (-0.5, 1), (1, -0.5)])
+def test_invalid_weights_are_rejected(weights):
+    with pytest.raises(ValueError):
+        hybrid.recommend_batch([['Any title']], 5, *weights)
+
+
+def test_min_max_scales_each_column():
+    scores = np.array([[1.0, 5.0], [3.0, 5.0], [2.0, 5.0]])
+    np.testing.assert_allclose(hybrid._min_max(scores), [[0, 0], [1, 0], [0.5, 0]])
+
+
+def test_min_max_leaves_out_each_querys_favourites():
+    scores = np.array([[9.0, 1.0], [1.0, 9.0], [3.0, 3.0], [2.0, 1.0]])
+    scaled = hybrid._min_max(scores, [[0], [1]])
+    np.testing.assert_allclose(scaled[1:, 0], [0, 1, 0.5])
+    np.testing.assert_allclose(scaled[[0, 2, 3], 1], [0, 1, 0])
+
+
+def test_blend_with_known_scores():
+    # Movie 0 is the favourite; movies 1-3 have collaborative scores, 4 does not
+    content = np.array([[1.0], [0.4], [0.2], [0.0], [0.3]])
+    collab = np.array([[5.0], [1.0], [3.0], [2.0]])
+    blended = hybrid.blend(content, collab, np.array([0, 1, 2, 3]), [[0]], 1, 3)
+    # Content scaled over movies 1-4: 1, 0.5, 0, 0.75; collab over 1-3: 0, 1, 0.5
+    expected = (np.array([1, 0.5, 0, 0.75]) + 3 * np.array([0, 1, 0.5, 0.5])) / 4
+    np.testing.assert_allclose(blended[1:, 0], expected)
+    # With the content weight alone, the content ranking is kept
+    np.testing.assert_allclose(hybrid.blend(content, collab, np.arange(4), [[0]], 1, 0)[1:, 0],
+                               [1, 0.5, 0, 0.75])
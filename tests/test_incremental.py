@@ -0,0 +1,69 @@
+import os
+import numpy as np
+import pandas as pd
+import pytest
+from recommenders.factors import SVDFactors
+from recommenders.incremental import apply_delta, publish
+
+
+@pytest.fixture
+def factors():
+    rng = np.random.default_rng(0)
+    return SVDFactors(rng.normal(0, 0.3, (4, 3)), rng.normal(0, 0.3, (5, 3)),
+                      rng.normal(0, 0.2, 4), rng.normal(0, 0.2, 5), 3.5, (0.5, 5.0),
+                      np.array([10, 11, 12, 13]), np.array([100, 101, 102, 103, 104]))
+
+
+def _rmse(factors, delta):
+    estimates = factors.predict_pairs(factors.user_rows(delta['userId'].values),
+                                      factors.item_rows(delta['movieId'].values))
+    return np.sqrt(np.mean((delta['rating'].values - estimates) ** 2))
+
+
+def test_known_ratings_move_only_affected_rows(factors):
+    delta = pd.DataFrame({'userId': [10, 10], 'movieId': [100, 102], 'rating': [5.0, 0.5]})
+    updated = apply_delta(factors, delta, n_epochs=50, lr=0.05)
+    assert _rmse(updated, delta) < _rmse(factors, delta)
+    np.testing.assert_array_equal(updated.pu[1:], factors.pu[1:])
+    np.testing.assert_array_equal(updated.qi[[1, 3, 4]], factors.qi[[1, 3, 4]])
+    np.testing.assert_array_equal(updated.bu[1:], factors.bu[1:])
+
+
+def test_input_factors_are_left_unchanged(factors):
+    before = [factors.pu.copy(), factors.qi.copy(), factors.bu.copy(), factors.bi.copy()]
+    delta = pd.DataFrame({'userId': [11, 99], 'movieId': [104, 500], 'rating': [4.0, 2.0]})
+    apply_delta(factors, delta)
+    for array, original in zip([factors.pu, factors.qi, factors.bu, factors.bi], before):
+        np.testing.assert_array_equal(array, original)
+
+
+def test_new_users_and_movies_are_appended(factors):
+    delta = pd.DataFrame({'userId': [99, 99, 10, 11], 'movieId': [100, 101, 500, 500],
+                          'rating': [4.0, 4.5, 2.0, 2.5]})
+    updated = apply_delta(factors, delta, n_epochs=0)
+    np.testing.assert_array_equal(updated.user_ids, [10, 11, 12, 13, 99])
+    np.testing.assert_array_equal(updated.item_ids, [100, 101, 102, 103, 104, 500])
+    # The cold-start fit alone already explains the new ratings roughly
+    assert _rmse(updated, delta) < 1.0
+    assert np.all(updated.user_rows(delta['userId'].values) >= 0)
+
+
+def test_unbiased_factors_are_rejected(factors):
+    unbiased = SVDFactors(factors.pu, factors.qi, factors.bu, factors.bi, 3.5, (0.5, 5.0),
+                          factors.user_ids, factors.item_ids, False)
+    delta = pd.DataFrame({'userId': [10], 'movieId': [100], 'rating': [4.0]})
+    with pytest.raises(ValueError):
+        apply_delta(unbiased, delta)
+
+
+def test_publish_swaps_a_link_to_the_new_version(tmp_path, factors):
+    path = os.path.join(tmp_path, 'collab_factors')
+    factors.save(path)
+    first = publish(factors, path, keep=1)
+    second = publish(factors, path, keep=1)
+    assert os.path.realpath(path) == os.path.realpath(second)
+    # The original directory became v0, and only the newest two versions are kept
+    assert os.path.isdir(first)
+    assert sorted(os.listdir(tmp_path)) == ['collab_factors', 'collab_factors-v1',
+                                            'collab_factors-v2']
+    assert SVDFactors.load(path).precision == factors.precision
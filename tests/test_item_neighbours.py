@@ -0,0 +1,55 @@
+import numpy as np
+from recommenders.item_neighbours import (ItemNeighbours, compute_neighbours,
+                                          top_k_similar)
+
+
+def test_top_k_similar_skips_self_and_non_positive_scores():
+    # Block of items 1 and 2 against four items
+    similarities = np.array([[0.2, 1.0, 0.5, -0.3],
+                             [0.4, 0.4, 1.0, 0.0]])
+    neighbours, scores = top_k_similar(similarities, np.array([1, 2]), 3)
+    # Item 1 has two positive neighbours; the list is padded with -1
+    np.testing.assert_array_equal(neighbours[0], [2, 0, -1])
+    np.testing.assert_allclose(scores[0], [0.5, 0.2, 0.0], atol=1e-3)
+    # Ties go to the lowest index, and a zero similarity is no neighbour
+    np.testing.assert_array_equal(neighbours[1], [0, 1, -1])
+    assert scores.dtype == np.float16
+
+
+def test_compute_neighbours_matches_dense_ranking():
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(30, 4)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    neighbours, _ = compute_neighbours(vectors, k=5, block_size=7, n_workers=2)
+    similarities = vectors @ vectors.T
+    np.fill_diagonal(similarities, -np.inf)
+    for item in range(30):
+        expected = [j for j in np.argsort(-similarities[item], kind='stable')[:5]
+                    if similarities[item, j] > 0]
+        assert neighbours[item][neighbours[item] >= 0].tolist() == expected
+
+
+def test_merged_sums_scores_of_shared_candidates():
+    lists = ItemNeighbours(np.array([10, 20, 30, 40]),
+                           np.array([[1, 2, -1], [2, 3, -1], [0, -1, -1], [0, 1, 2]],
+                                    dtype=np.int32),
+                           np.array([[0.5, 0.25, 0], [0.5, 0.125, 0], [1, 0, 0],
+                                     [0.25, 0.25, 0.25]], dtype=np.float16),
+                           'factors')
+    candidates, scores = lists.merged([0, 1])
+    np.testing.assert_array_equal(candidates, [1, 2, 3])
+    np.testing.assert_allclose(scores, [0.5, 0.75, 0.125])
+    candidates, scores = lists.merged([2])
+    np.testing.assert_array_equal(candidates, [0])
+    np.testing.assert_allclose(scores, [1.0])
+
+
+def test_save_and_load_round_trip(tmp_path):
+    lists = ItemNeighbours(np.array([10, 20]), np.array([[1], [0]], dtype=np.int32),
+                           np.array([[0.5], [0.5]], dtype=np.float16), 'adjusted_cosine')
+    assert not ItemNeighbours.exists(tmp_path)
+    lists.save(tmp_path)
+    loaded = ItemNeighbours.load(tmp_path)
+    assert ItemNeighbours.exists(tmp_path)
+    assert (loaded.method, loaded.k, len(loaded)) == ('adjusted_cosine', 1, 2)
+    np.testing.assert_array_equal(loaded.merged([0, 1])[0], [0, 1])
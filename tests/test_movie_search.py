@@ -0,0 +1,67 @@
+import numpy as np
+import pandas as pd
+import pytest
+from utils.movie_search import MovieSearchIndex, tokenize
+
+
+@pytest.fixture
+def content():
+    return pd.DataFrame({
+        'title': ['Toy Story (1995)', 'Jumanji (1995)', 'Heat (1995)', 'Toy Soldiers (1991)',
+                  'Cast Away (2000)'],
+        'genres': ['Adventure|Animation|Comedy', 'Adventure|Fantasy', 'Action|Crime',
+                   'Action|Drama', 'Drama'],
+        'release_year': [1995, 1995, 1995, 1991, 2000],
+        'title_cast': ['Tom Hanks|Tim Allen', 'Robin Williams', 'Al Pacino|Robert De Niro',
+                       'Sean Astin', 'Tom Hanks|Helen Hunt'],
+        'director': ['John Lasseter', 'Joe Johnston', 'Michael Mann', 'Daniel Petrie Jr.',
+                     np.nan],
+    })
+
+
+def _titles(frame):
+    return frame['Title'].tolist()
+
+
+def test_tokenize():
+    assert tokenize('Tom Hanks|Tim Allen') == ['tom', 'hanks', 'tim', 'allen']
+    assert tokenize(np.nan) == []
+
+
+def test_fields_match_word_prefixes(content):
+    index = MovieSearchIndex(content)
+    assert _titles(index.filter(title='toy')) == ['Toy Story (1995)', 'Toy Soldiers (1991)']
+    assert _titles(index.filter(title_cast='tom han', genres='comedy')) == ['Toy Story (1995)']
+    assert _titles(index.filter(genres='act', director='mich')) == ['Heat (1995)']
+    assert _titles(index.filter(title='story', title_cast='robin')) == []
+
+
+def test_release_year_matches_any_word(content):
+    index = MovieSearchIndex(content)
+    assert _titles(index.filter(release_year='1991 2000')) == ['Toy Soldiers (1991)']
+    assert _titles(index.filter(release_year='199', genres='adventure')) == [
+        'Toy Story (1995)', 'Jumanji (1995)']
+
+
+def test_rows_missing_a_field_never_match(content):
+    index = MovieSearchIndex(content)
+    # Cast Away has no director
+    assert 'Cast Away (2000)' not in _titles(index.filter())
+    assert _titles(index.filter(title='cast')) == []
+
+
+def test_narrowing_queries_match_fresh_queries(content):
+    index = MovieSearchIndex(content)
+    query = 'tom hanks'
+    for end in range(1, len(query) + 1):
+        incremental = _titles(index.filter(title_cast=query[:end]))
+        assert incremental == _titles(MovieSearchIndex(content).filter(title_cast=query[:end]))
+    # Widening the query again is not answered from the narrower result
+    assert _titles(index.filter(title_cast='t')) == _titles(
+        MovieSearchIndex(content).filter(title_cast='t'))
+
+
+def test_display_frame(content):
+    frame = MovieSearchIndex(content).filter(genres='drama')
+    assert list(frame.columns) == ['Title', 'Genres', 'Release Year', 'Cast', 'Director']
+    assert frame['Release Year'].tolist() == ['1991']
@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+from recommenders.rating_store import RatingStore, gather
+
+
+def _store():
+    # Codes index unsorted raw ids; (user 30, movie 7) is rated twice
+    user_ids = np.array([30, 10, 20])
+    item_ids = np.array([7, 3, 5])
+    user_codes = np.array([0, 0, 1, 2, 2, 0])
+    item_codes = np.array([0, 1, 1, 2, 0, 0])
+    ratings = np.array([2.0, 4.5, 3.0, 5.0, 1.0, 4.0])
+    return RatingStore.from_codes(user_codes, item_codes, ratings, user_ids, item_ids,
+                                  item_labels=['Seven', 'Three', 'Five'])
+
+
+def test_from_codes_sorts_ids_and_keeps_highest_duplicate():
+    store = _store()
+    np.testing.assert_array_equal(store.user_ids, [10, 20, 30])
+    np.testing.assert_array_equal(store.item_ids, [3, 5, 7])
+    np.testing.assert_array_equal(store.item_labels, ['Three', 'Five', 'Seven'])
+    assert len(store) == 5
+    items, ratings = store.items_of(store.user_index([30])[0])
+    np.testing.assert_array_equal(items, store.item_index([3, 7]))
+    np.testing.assert_array_equal(ratings, [4.5, 4.0])
+
+
+def test_user_and_item_groupings_agree():
+    store = _store()
+    by_user = {(u, i, r) for u in range(store.n_users)
+               for i, r in zip(*store.items_of(u))}
+    by_item = {(u, i, r) for i in range(store.n_items)
+               for u, r in zip(*store.users_of(i))}
+    assert by_user == by_item
+    assert store.user_ratings.dtype == np.float32
+    assert store.user_items.dtype == np.int32
+
+
+def test_index_of_unknown_ids():
+    store = _store()
+    np.testing.assert_array_equal(store.item_index([5, 6, 100, 1]), [1, -1, -1, -1])
+
+
+def test_pair_queries_with_min_rating():
+    store = _store()
+    items, users = store.users_of_items(store.item_index([7, 3]), min_rating=4.0)
+    np.testing.assert_array_equal(store.item_ids[items], [7, 3])
+    np.testing.assert_array_equal(store.user_ids[users], [30, 30])
+    users, items = store.items_of_users(store.user_index([20, 10]))
+    np.testing.assert_array_equal(store.user_ids[users], [20, 20, 10])
+    np.testing.assert_array_equal(store.item_ids[items], [5, 7, 3])
+
+
+def test_gather_concatenates_groups():
+    indptr = np.array([0, 2, 2, 5])
+    keys, positions = gather(indptr, None, [2, 1, 0])
+    np.testing.assert_array_equal(keys, [2, 2, 2, 0, 0])
+    np.testing.assert_array_equal(positions, [2, 3, 4, 0, 1])
+
+
+def test_from_frame_and_save_load_round_trip(tmp_path):
+    frame = pd.DataFrame({'userId': [5, 5, 9], 'movieId': [2, 1, 2],
+                          'rating': [3.0, 4.0, 5.0], 'title': ['B', 'A', 'B']})
+    store = RatingStore.from_frame(frame, label_column='title')
+    store.save(tmp_path)
+    assert RatingStore.exists(tmp_path)
+    loaded = RatingStore.load(tmp_path)
+    np.testing.assert_array_equal(loaded.item_labels, ['A', 'B'])
+    np.testing.assert_array_equal(loaded.item_indptr, store.item_indptr)
+    np.testing.assert_array_equal(loaded.item_users, store.item_users)
+    np.testing.assert_array_equal(loaded.item_ratings, [4.0, 3.0, 5.0])
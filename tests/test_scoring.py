@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+from recommenders.scoring import top_k_batch, top_k_indices
+
+
+def _reference(column, k, exclude):
+    """Top-k by sorting every item on (descending score, index)."""
+    allowed = np.setdiff1d(np.arange(len(column)), np.asarray(list(exclude), dtype=np.int64))
+    order = np.lexsort((allowed, -column[allowed]))
+    return allowed[order][:k]
+
+
+@pytest.mark.parametrize('k', [1, 5, 40])
+def test_top_k_batch_matches_full_sort_with_ties(k):
+    rng = np.random.default_rng(0)
+    # Few distinct values, so that most scores are tied
+    scores = rng.integers(0, 4, (30, 6)).astype(float)
+    excludes = [[], [0, 1], [29], range(10), [], [3, 3]]
+    results = top_k_batch(scores, k, excludes)
+    for j, exclude in enumerate(excludes):
+        np.testing.assert_array_equal(results[j], _reference(scores[:, j], k, exclude))
+
+
+def test_ties_go_to_the_lowest_index():
+    scores = np.array([0.0, 1.0, 0.0, 1.0, 0.0, 0.0])
+    np.testing.assert_array_equal(top_k_indices(scores, 3), [1, 3, 0])
+
+
+def test_fewer_selectable_items_than_k():
+    np.testing.assert_array_equal(top_k_indices(np.array([0.2, 0.9, 0.5]), 5, exclude=[1]),
+                                  [2, 0])
+    assert top_k_indices(np.array([0.2]), 3, exclude=[0]).size == 0
+
+
+def test_score_matrix_is_not_modified():
+    scores = np.ones((4, 1))
+    top_k_batch(scores, 2, [[0]])
+    np.testing.assert_array_equal(scores, np.ones((4, 1)))
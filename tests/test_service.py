@@ -0,0 +1,101 @@
+import asyncio
+import json
+import pytest
+from recommenders.service import MAX_BODY_BYTES, RecommendationService
+
+
+class _Writer:
+    """Stream writer collecting what is written."""
+
+    def __init__(self):
+        self.data = b''
+        self.closed = False
+
+    def write(self, data):
+        self.data += data
+
+    async def drain(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+
+def _responses(raw):
+    """Status and JSON payload of each response written by the service."""
+    responses = []
+    while raw:
+        head, _, rest = raw.partition(b'\r\n\r\n')
+        lines = head.decode().split('\r\n')
+        headers = dict(line.split(': ', 1) for line in lines[1:])
+        length = int(headers['Content-Length'])
+        responses.append((int(lines[0].split(' ')[1]), json.loads(rest[:length])))
+        raw = rest[length:]
+    return responses
+
+
+def _handle(raw):
+    async def run():
+        reader = asyncio.StreamReader()
+        reader.feed_data(raw)
+        reader.feed_eof()
+        writer = _Writer()
+        await RecommendationService(n_workers=1)._handle(reader, writer)
+        return writer
+    writer = asyncio.run(run())
+    assert writer.closed
+    return _responses(writer.data)
+
+
+def _request(body, length=None, path='/recommend/content'):
+    length = len(body) if length is None else length
+    return (f'POST {path} HTTP/1.1\r\nContent-Length: {length}\r\n\r\n').encode() + body
+
+
+def test_read_request_parses_headers_and_body():
+    async def run():
+        reader = asyncio.StreamReader()
+        reader.feed_data(_request(b'{"movies": []}', path='/recommend/collab?x=1'))
+        reader.feed_eof()
+        return await RecommendationService._read_request(reader)
+    method, path, headers, body = asyncio.run(run())
+    assert (method, path, body) == ('POST', '/recommend/collab', b'{"movies": []}')
+    assert headers['content-length'] == '14'
+
+
+def test_oversized_body_is_rejected_and_connection_closed():
+    body = b'x' * (MAX_BODY_BYTES + 1)
+    # A request hidden in the unread body must not be served
+    responses = _handle(_request(body) + b'GET /health HTTP/1.1\r\n\r\n')
+    assert [status for status, _ in responses] == [413]
+
+
+@pytest.mark.parametrize('length', ['ten', '-1'])
+def test_invalid_content_length_is_rejected(length):
+    assert [status for status, _ in _handle(_request(b'{}', length))] == [400]
+
+
+def test_malformed_request_line_is_rejected():
+    assert [status for status, _ in _handle(b'NONSENSE\r\n\r\n')] == [400]
+
+
+def test_invalid_json_is_rejected():
+    responses = _handle(_request(b'{"movies": ') + b'GET /health HTTP/1.1\r\n\r\n')
+    assert [status for status, _ in responses] == [400, 200]
+
+
+@pytest.mark.parametrize('body', [b'[]', b'{}', b'{"movies": "abc"}', b'{"movies": [1, 2]}',
+                                  b'{"movies": ["A"], "top_n": 0}',
+                                  b'{"movies": ["A"], "top_n": -3}',
+                                  b'{"movies": ["A"], "top_n": "5"}',
+                                  b'{"movies": ["A"], "top_n": 2.5}',
+                                  b'{"movies": ["A"], "top_n": true}'])
+def test_invalid_request_fields_are_rejected(body):
+    responses = _handle(_request(body) + b'GET /health HTTP/1.1\r\n\r\n')
+    assert [status for status, _ in responses] == [400, 200]
+    assert responses[0][1]['error'].startswith('Invalid request')
+
+
+def test_unknown_endpoint():
+    assert _handle(_request(b'{}', path='/recommend/other'))[0][0] == 404
+
@@ -0,0 +1,133 @@
+"""
+
+    Process-wide Streamlit caches of the app's datasets and models.
+
+    Author: Explore Data Science Academy.
+
+    Description: Streamlit reruns `edsa_recommender.py` from the top on
+    every widget interaction, in every session. The helpers below keep
+    the heavy objects the app needs in Streamlit's process-wide caches,
+    so that a rerun only pays for what changed:
+
+        movie_titles   - title lists of the selection boxes (cache_data)
+        search_index   - Movie Filter index and display frame (cache_resource)
+        filter_movies  - Movie Filter results per query (cache_data)
+        recommenders   - recommender functions, with their model artifacts
+                         warmed up once per process (cache_resource)
+
+    Every cache is keyed on the modification time and size of the files
+    it was built from, so that a dataset or artifact replaced on disk is
+    picked up on the next rerun, and `invalidate` clears them all.
+
+"""
+# Script dependencies
+import os
+import streamlit as st
+from recommenders import registry
+from recommenders.ann import ANN_INDEX_PATH
+from recommenders.content_index import INDEX_MATRIX_PATH, INDEX_META_PATH
+from recommenders.factors import FACTORS_DIR
+from recommenders.item_neighbours import NEIGHBOURS_DIR
+from recommenders.rating_store import RATING_STORE_DIR
+from utils.columnar import SCHEMA_FILE, read_table, table_dir
+from utils.data_loader import load_movie_titles
+from utils.movie_search import MovieSearchIndex
+
+# Files whose replacement invalidates the cached recommenders.
+MODEL_ARTIFACTS = [INDEX_MATRIX_PATH, INDEX_META_PATH, ANN_INDEX_PATH,
+                   'resources/models/collab_model.pkl',
+                   os.path.join(FACTORS_DIR, 'meta.json'),
+                   os.path.join(RATING_STORE_DIR, 'meta.json'),
+                   os.path.join(NEIGHBOURS_DIR, 'meta.json')]
+
+# Artifacts the recommenders score with, warmed up ahead of the first
+# request. Their dependencies are loaded as they need them, so that e.g.
+# the pickled SVD model is never unpickled when exported factors exist.
+WARM_UP_ARTIFACTS = ['content_index', 'collab_liked', 'hybrid_alignment']
+
+
+def file_signature(*paths):
+    """(path, mtime, size) of each existing file, following links."""
+    signature = []
+    for path in paths:
+        if os.path.exists(path):
+            stat = os.stat(path)
+            signature.append((os.path.realpath(path), stat.st_mtime, stat.st_size))
+    return tuple(signature)
+
+
+def dataset_signature(path_to_csv):
+    """Signature of a dataset and of its columnar copy."""
+    return file_signature(path_to_csv,
+                          os.path.join(table_dir(path_to_csv), SCHEMA_FILE))
+
+
+@st.cache_data(show_spinner=False)
+def _movie_titles(path_to_movies, signature):
+    return load_movie_titles(path_to_movies)
+
+def movie_titles(path_to_movies):
+    """Movie titles of a dataset; see `utils.data_loader.load_movie_titles`."""
+    return _movie_titles(path_to_movies, dataset_signature(path_to_movies))
+
+
+@st.cache_resource(show_spinner=False)
+def _search_index(path_to_content, signature):
+    return MovieSearchIndex(read_table(path_to_content, as_category=False))
+
+def search_index(path_to_content):
+    """Movie Filter index over a content dataset, shared by every session."""
+    return _search_index(path_to_content, dataset_signature(path_to_content))
+
+
+@st.cache_data(show_spinner=False, max_entries=1024)
+def _filter_movies(path_to_content, signature, query):
+    return _search_index(path_to_content, signature).filter(**dict(query))
+
+def filter_movies(path_to_content, **query):
+    """Display frame of the movies matching a Movie Filter query."""
+    return _filter_movies(path_to_content, dataset_signature(path_to_content),
+                          tuple(sorted(query.items())))
+
+
+@st.cache_resource(show_spinner=False)
+def _recommenders(service_url, warm_up, signature):
+    from recommenders.collaborative_based import collab_model, check_for_update as collab_update
+    from recommenders.content_based import content_model, check_for_update as content_update
+    from recommenders.hybrid import hybrid_model
+    from recommenders.service import remote_model
+
+    # Artifacts replaced on disk are swapped in within background threads
+    content_update()
+    collab_update()
+    models = {'content': content_model, 'collab': collab_model, 'hybrid': hybrid_model}
+    if service_url:
+        models['content'] = remote_model(service_url, 'content', content_model)
+        models['collab'] = remote_model(service_url, 'collab', collab_model)
+    elif warm_up:
+        registry.warm_up(WARM_UP_ARTIFACTS)
+    return models
+
+def recommenders(service_url=None, warm_up=True):
+    """Recommender functions by name ('content', 'collab' and 'hybrid').
+
+    Parameters
+    ----------
+    service_url : str
+        URL of `recommenders/service.py`, which then serves the content
+        and collaborative recommendations, falling back to the in-process
+        models if it cannot be reached.
+    warm_up : bool
+        Whether to start loading the model artifacts in the background
+        straight away (in-process models only).
+
+    """
+    return _recommenders(service_url, warm_up, file_signature(*MODEL_ARTIFACTS))
+
+
+def invalidate():
+    """Clear every cache and loaded artifact, so that everything is
+    reloaded on the next rerun."""
+    registry.reset()
+    st.cache_data.clear()
+    st.cache_resource.clear()
@@ -0,0 +1,186 @@
+"""
+
+    Columnar, memory-mapped storage for the app's datasets.
+
+    Author: Explore Data Science Academy.
+
+    Description: Helper functions to convert the .csv datasets used by the
+    app into a compact binary layout, with one `.npy` file per column:
+
+    - integer columns are stored as int32 (int64 if out of range),
+    - floating point columns are stored as float32,
+    - text columns are dictionary-encoded, as int32 codes (-1 for missing)
+      plus an Arrow-style dictionary of utf-8 bytes and int64 offsets.
+
+    Tables are loaded with `np.load(mmap_mode='r')`, so that several
+    Streamlit worker processes share the same pages of the page cache
+    rather than each parsing the .csv into its own copy.
+
+    Convert every dataset from the root of the repository with:
+
+        python -m utils.columnar
+
+"""
+# Data handling dependencies
+import os
+import json
+import numpy as np
+import pandas as pd
+
+# Location of the converted datasets, relative to the root of the repository.
+COLUMNAR_DIR = 'resources/data/columnar'
+
+# Datasets converted by default.
+DATASETS = ['resources/data/movies.csv',
+            'resources/data/ratings.csv',
+            'resources/data/content_data_clean.csv',
+            'resources/data/content_separated.csv',
+            'resources/data/filtered_ratings_data.csv']
+
+SCHEMA_FILE = 'schema.json'
+
+
+def table_dir(path_to_csv, columnar_dir=COLUMNAR_DIR):
+    """Directory holding the columnar copy of a .csv dataset."""
+    name = os.path.splitext(os.path.basename(path_to_csv))[0]
+    return os.path.join(columnar_dir, name)
+
+
+def _encode_dictionary(values):
+    """Dictionary-encode a column of strings.
+
+    Returns
+    -------
+    tuple (np.ndarray, np.ndarray, np.ndarray)
+        int32 codes (-1 for missing values), int64 offsets and uint8 data
+        of the dictionary.
+
+    """
+    codes, uniques = pd.factorize(values)
+    encoded = [str(value).encode('utf-8') for value in uniques]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(value) for value in encoded], out=offsets[1:])
+    data = np.frombuffer(b''.join(encoded), dtype=np.uint8)
+    return codes.astype(np.int32), offsets, data
+
+
+def _decode_dictionary(offsets, data):
+    """Decode an Arrow-style dictionary back into an array of str."""
+    buffer = data.tobytes()
+    return np.array([buffer[start:end].decode('utf-8')
+                     for start, end in zip(offsets[:-1], offsets[1:])],
+                    dtype=object)
+
+
+def convert_csv(path_to_csv, columnar_dir=COLUMNAR_DIR):
+    """Convert a .csv dataset into its columnar layout.
+
+    Parameters
+    ----------
+    path_to_csv : str
+        Relative or absolute path to the dataset.
+    columnar_dir : str
+        Directory under which the table is written.
+
+    Returns
+    -------
+    str
+        Directory the table was written to.
+
+    """
+    df = pd.read_csv(path_to_csv)
+    out_dir = table_dir(path_to_csv, columnar_dir)
+    os.makedirs(out_dir, exist_ok=True)
+    schema = {'rows': len(df), 'columns': []}
+    for name in df.columns:
+        column = df[name]
+        if pd.api.types.is_integer_dtype(column):
+            fits = column.empty or (column.min() >= np.iinfo(np.int32).min
+                                    and column.max() <= np.iinfo(np.int32).max)
+            kind = 'int32' if fits else 'int64'
+            np.save(os.path.join(out_dir, f'{name}.npy'), column.to_numpy(kind))
+        elif pd.api.types.is_float_dtype(column):
+            kind = 'float32'
+            np.save(os.path.join(out_dir, f'{name}.npy'), column.to_numpy(kind))
+        else:
+            kind = 'dictionary'
+            codes, offsets, data = _encode_dictionary(column)
+            np.save(os.path.join(out_dir, f'{name}.codes.npy'), codes)
+            np.save(os.path.join(out_dir, f'{name}.offsets.npy'), offsets)
+            np.save(os.path.join(out_dir, f'{name}.data.npy'), data)
+        schema['columns'].append({'name': name, 'kind': kind})
+    with open(os.path.join(out_dir, SCHEMA_FILE), 'w') as f:
+        json.dump(schema, f, indent=2)
+    return out_dir
+
+
+def is_converted(path_to_csv, columnar_dir=COLUMNAR_DIR):
+    """Whether an up to date columnar copy of the dataset exists."""
+    schema_path = os.path.join(table_dir(path_to_csv, columnar_dir), SCHEMA_FILE)
+    if not os.path.exists(schema_path):
+        return False
+    if not os.path.exists(path_to_csv):
+        return True
+    return os.path.getmtime(schema_path) >= os.path.getmtime(path_to_csv)
+
+
+def load_columnar(path_to_csv, columns=None, as_category=True,
+                  columnar_dir=COLUMNAR_DIR):
+    """Load the columnar copy of a dataset as a memory-mapped DataFrame.
+
+    Parameters
+    ----------
+    path_to_csv : str
+        Path to the original .csv dataset.
+    columns : list (str)
+        Columns to load. Defaults to every column.
+    as_category : bool
+        Whether to return text columns as pandas categoricals (compact)
+        rather than object columns of str.
+
+    Returns
+    -------
+    pd.DataFrame
+        The dataset. Numeric columns are backed by read-only memory maps.
+
+    """
+    in_dir = table_dir(path_to_csv, columnar_dir)
+    with open(os.path.join(in_dir, SCHEMA_FILE)) as f:
+        schema = json.load(f)
+    data = {}
+    for column in schema['columns']:
+        name = column['name']
+        if columns is not None and name not in columns:
+            continue
+        if column['kind'] == 'dictionary':
+            codes = np.load(os.path.join(in_dir, f'{name}.codes.npy'), mmap_mode='r')
+            values = _decode_dictionary(
+                np.load(os.path.join(in_dir, f'{name}.offsets.npy')),
+                np.load(os.path.join(in_dir, f'{name}.data.npy'), mmap_mode='r'))
+            if as_category:
+                data[name] = pd.Categorical.from_codes(
+                    codes, categories=pd.Index(values, dtype=object), validate=False)
+            else:
+                decoded = np.append(values, np.nan)
+                data[name] = decoded[np.where(codes < 0, len(values), codes)]
+        else:
+            data[name] = np.load(os.path.join(in_dir, f'{name}.npy'), mmap_mode='r')
+    return pd.DataFrame(data, copy=False)
+
+
+def read_table(path_to_csv, columns=None, as_category=True):
+    """Read a dataset, preferring its columnar copy when up to date.
+
+    Falls back to parsing the .csv if the dataset has not been converted.
+    """
+    if is_converted(path_to_csv):
+        return load_columnar(path_to_csv, columns, as_category)
+    return pd.read_csv(path_to_csv, usecols=columns)
+
+
+if __name__ == '__main__':
+    for path in DATASETS:
+        if os.path.exists(path):
+            print(f"Converted {path} to: {convert_csv(path)}")
+        else:
+            print(f"Skipping missing dataset: {path}")
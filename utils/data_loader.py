@@ -6,9 +6,10 @@
 
 """
 # Data handling dependencies
-import pandas as pd
-import numpy as np
+from utils.columnar import read_table
+from utils import metrics
 
+@metrics.instrument('load_movie_titles')
 def load_movie_titles(path_to_movies):
     """Load movie titles from database records.
 
@@ -16,7 +17,7 @@ def load_movie_titles(path_to_movies):
     ----------
     path_to_movies : str
         Relative or absolute path to movie database stored
-        in .csv format.
+        in .csv format. Its columnar copy is used when available.
 
     Returns
     -------
@@ -24,8 +25,10 @@ def load_movie_titles(path_to_movies):
         Movie titles.
 
     """
-    df = pd.read_csv(path_to_movies)
-    df = df.dropna()
-    unique_movies = df[['movieId', 'title']].drop_duplicates()
-    movie_list = unique_movies['title'].tolist()
+    with metrics.stage('read'):
+        df = read_table(path_to_movies)
+    with metrics.stage('dedupe'):
+        df = df.dropna()
+        unique_movies = df[['movieId', 'title']].drop_duplicates()
+        movie_list = unique_movies['title'].tolist()
     return movie_list
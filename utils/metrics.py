@@ -0,0 +1,237 @@
+"""
+
+    Timing, memory and call-count instrumentation of the app's hot paths.
+
+    Author: Explore Data Science Academy.
+
+    Description: Helper functions to record, per instrumented function,
+    the number of calls, the time spent in each named stage (plus the
+    total), and optionally the peak memory allocated via `tracemalloc`.
+    Module import times are recorded in the same way. The metrics can be
+    rendered in the Prometheus text exposition format, written to a file
+    after every call, and shown on the app's Diagnostics page.
+
+    Each instrumented call can also be profiled with cProfile, one
+    `.prof` file per call, for inspection with `pstats` or snakeviz.
+
+    Options are module constants, with environment variable defaults:
+        METRICS_FILE  (RECOMMENDER_METRICS_FILE)  - Prometheus text file
+        TRACE_MEMORY  (RECOMMENDER_TRACE_MEMORY)  - record allocation peaks
+        PROFILE_DIR   (RECOMMENDER_PROFILE_DIR)   - cProfile dump directory
+
+    `trace_memory` overrides TRACE_MEMORY for the calls made by one thread
+    (e.g. one Streamlit session). Tracing is started for traced calls only,
+    and stopped again once none is running, as it slows down every
+    allocation of the process.
+
+"""
+# Script dependencies
+import os
+import time
+import cProfile
+import threading
+import tracemalloc
+from contextlib import contextmanager
+from functools import wraps
+
+METRICS_FILE = os.environ.get('RECOMMENDER_METRICS_FILE')
+TRACE_MEMORY = os.environ.get('RECOMMENDER_TRACE_MEMORY', '') not in ('', '0')
+PROFILE_DIR = os.environ.get('RECOMMENDER_PROFILE_DIR')
+
+_lock = threading.Lock()
+_calls = {}
+_errors = {}
+# Seconds per (function, stage): [count, sum, max]
+_stages = {}
+_memory_peaks = {}
+_imports = {}
+_local = threading.local()
+# Number of traced calls running, and whether tracing was started for them.
+_tracing = {'calls': 0, 'started': False}
+
+
+def _function():
+    stack = getattr(_local, 'stack', None)
+    return stack[-1] if stack else 'none'
+
+
+def _record_stage(function, stage_name, seconds):
+    with _lock:
+        timer = _stages.setdefault((function, stage_name), [0, 0.0, 0.0])
+        timer[0] += 1
+        timer[1] += seconds
+        timer[2] = max(timer[2], seconds)
+
+
+@contextmanager
+def stage(name):
+    """Time a stage of the instrumented function currently running."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _record_stage(_function(), name, time.perf_counter() - start)
+
+
+@contextmanager
+def trace_memory(enabled=True):
+    """Whether to record the allocation peaks of the instrumented calls made
+    by the current thread within the block, overriding TRACE_MEMORY."""
+    previous = getattr(_local, 'trace_memory', None)
+    _local.trace_memory = enabled
+    try:
+        yield
+    finally:
+        _local.trace_memory = previous
+
+
+def _tracing_memory():
+    enabled = getattr(_local, 'trace_memory', None)
+    return TRACE_MEMORY if enabled is None else enabled
+
+
+def _start_tracing():
+    with _lock:
+        if _tracing['calls'] == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _tracing['started'] = True
+        _tracing['calls'] += 1
+        tracemalloc.reset_peak()
+
+
+def _stop_tracing():
+    """Peak traced memory of the call, stopping tracing after the last call."""
+    with _lock:
+        peak = tracemalloc.get_traced_memory()[1]
+        _tracing['calls'] -= 1
+        if _tracing['calls'] == 0 and _tracing['started']:
+            # Tracing started elsewhere (e.g. PYTHONTRACEMALLOC) is left on
+            tracemalloc.stop()
+            _tracing['started'] = False
+        return peak
+
+
+@contextmanager
+def timed_import(module):
+    """Record the time taken by the imports within the block."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        with _lock:
+            _imports[module] = time.perf_counter() - start
+
+
+def instrument(name):
+    """Decorator recording the calls, time and memory of a function.
+
+    Parameters
+    ----------
+    name : str
+        Name the function's metrics are recorded under.
+
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            traced = _tracing_memory()
+            if traced:
+                _start_tracing()
+            profiler = _start_profiler()
+            stack = _local.__dict__.setdefault('stack', [])
+            stack.append(name)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            except Exception:
+                with _lock:
+                    _errors[name] = _errors.get(name, 0) + 1
+                raise
+            finally:
+                _record_stage(name, 'total', time.perf_counter() - start)
+                stack.pop()
+                peak = _stop_tracing() if traced else None
+                with _lock:
+                    _calls[name] = _calls.get(name, 0) + 1
+                    if peak is not None:
+                        _memory_peaks[name] = max(_memory_peaks.get(name, 0), peak)
+                if profiler is not None:
+                    profiler.disable()
+                    os.makedirs(PROFILE_DIR, exist_ok=True)
+                    profiler.dump_stats(os.path.join(
+                        PROFILE_DIR, f'{name}-{time.time_ns()}.prof'))
+                if METRICS_FILE:
+                    write_metrics(METRICS_FILE)
+        return wrapper
+    return decorator
+
+
+def _start_profiler():
+    if not PROFILE_DIR:
+        return None
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:
+        # Another profiler (e.g. of a concurrent call) is already active
+        return None
+    return profiler
+
+
+def snapshot():
+    """Copy of every metric recorded so far, as plain dictionaries."""
+    with _lock:
+        return {'calls': dict(_calls), 'errors': dict(_errors),
+                'stages': {key: tuple(value) for key, value in _stages.items()},
+                'memory_peaks': dict(_memory_peaks), 'imports': dict(_imports)}
+
+
+def reset():
+    """Discard every metric recorded so far."""
+    with _lock:
+        for metrics in (_calls, _errors, _stages, _memory_peaks, _imports):
+            metrics.clear()
+
+
+def prometheus_text():
+    """Every metric, in the Prometheus text exposition format."""
+    metrics = snapshot()
+    lines = ['# HELP recommender_calls_total Calls of each instrumented function.',
+             '# TYPE recommender_calls_total counter']
+    lines += [f'recommender_calls_total{{function="{name}"}} {count}'
+              for name, count in sorted(metrics['calls'].items())]
+    lines += ['# HELP recommender_errors_total Calls which raised an exception.',
+              '# TYPE recommender_errors_total counter']
+    lines += [f'recommender_errors_total{{function="{name}"}} {count}'
+              for name, count in sorted(metrics['errors'].items())]
+    lines += ['# HELP recommender_stage_seconds Time spent in each stage of a function.',
+              '# TYPE recommender_stage_seconds summary']
+    for (name, stage_name), (count, total, _) in sorted(metrics['stages'].items()):
+        labels = f'function="{name}",stage="{stage_name}"'
+        lines.append(f'recommender_stage_seconds_count{{{labels}}} {count}')
+        lines.append(f'recommender_stage_seconds_sum{{{labels}}} {total:.6f}')
+    lines += ['# HELP recommender_stage_seconds_max Slowest run of each stage.',
+              '# TYPE recommender_stage_seconds_max gauge']
+    for (name, stage_name), (_, _, longest) in sorted(metrics['stages'].items()):
+        lines.append(f'recommender_stage_seconds_max{{function="{name}",'
+                     f'stage="{stage_name}"}} {longest:.6f}')
+    lines += ['# HELP recommender_memory_peak_bytes Peak memory allocated during a call.',
+              '# TYPE recommender_memory_peak_bytes gauge']
+    lines += [f'recommender_memory_peak_bytes{{function="{name}"}} {peak}'
+              for name, peak in sorted(metrics['memory_peaks'].items())]
+    lines += ['# HELP recommender_import_seconds Time taken to import a module.',
+              '# TYPE recommender_import_seconds gauge']
+    lines += [f'recommender_import_seconds{{module="{name}"}} {seconds:.6f}'
+              for name, seconds in sorted(metrics['imports'].items())]
+    return '\n'.join(lines) + '\n'
+
+
+def write_metrics(path):
+    """Atomically write the metrics to `path` in the Prometheus text format."""
+    temp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    try:
+        with open(temp_path, 'w') as f:
+            f.write(prometheus_text())
+        os.replace(temp_path, path)
+    except OSError as e:
+        print(f"Writing metrics to {path} failed: {e}")
@@ -0,0 +1,219 @@
+"""
+
+    Inverted index search for the Movie Filter page.
+
+    Author: Explore Data Science Academy.
+
+    Description: Helper class which tokenizes the title, genres, cast and
+    director of every movie once, and keeps for each token a sorted array
+    of the rows containing it (its posting list), plus a bitmap of rows
+    per release year. Queries are answered by intersecting posting lists,
+    with every query word matched as a prefix of the indexed tokens.
+
+    Posting lists of prefixes and whole query results are cached, and a
+    query which narrows the previous one (e.g. the next keystroke) only
+    filters the previous result.
+
+"""
+# Data handling dependencies
+import re
+import threading
+from collections import OrderedDict
+import numpy as np
+from utils.columnar import read_table
+
+# Text columns of the content data which are searched by token prefix.
+FIELDS = ['title', 'genres', 'title_cast', 'director']
+YEAR_FIELD = 'release_year'
+
+# Columns shown on the Movie Filter page, and their display names.
+DISPLAY_COLUMNS = {'title': 'Title', 'genres': 'Genres',
+                   'release_year': 'Release Year', 'title_cast': 'Cast',
+                   'director': 'Director'}
+
+_TOKEN = re.compile(r'\w+')
+
+
+def tokenize(text):
+    """Lowercase word tokens of a piece of text."""
+    if not isinstance(text, str):
+        return []
+    return _TOKEN.findall(text.lower())
+
+
+def _intersect(small, large):
+    """Intersection of two sorted arrays of unique rows."""
+    if len(small) > len(large):
+        small, large = large, small
+    if len(small) == 0:
+        return small
+    positions = np.searchsorted(large, small)
+    positions[positions == len(large)] = 0
+    return small[large[positions] == small]
+
+
+class _FieldIndex:
+    """Sorted vocabulary and posting lists of one text field."""
+
+    def __init__(self, values):
+        tokens, rows = [], []
+        for row, value in enumerate(values):
+            for token in set(tokenize(value)):
+                tokens.append(token)
+                rows.append(row)
+        tokens = np.array(tokens, dtype=str)
+        rows = np.array(rows, dtype=np.int32)
+        order = np.lexsort((rows, tokens))
+        tokens, rows = tokens[order], rows[order]
+        self.vocabulary, starts = np.unique(tokens, return_index=True)
+        self.indptr = np.append(starts, len(rows)).astype(np.int64)
+        self.rows = rows
+
+    def prefix_postings(self, prefix):
+        """Sorted rows containing a token which starts with `prefix`."""
+        lo = np.searchsorted(self.vocabulary, prefix, side='left')
+        hi = np.searchsorted(self.vocabulary, prefix + '\U0010ffff', side='left')
+        if hi - lo == 1:
+            return self.rows[self.indptr[lo]:self.indptr[lo + 1]]
+        return np.unique(self.rows[self.indptr[lo]:self.indptr[hi]])
+
+
+class MovieSearchIndex:
+    """Multi-field prefix search over the content data.
+
+    Parameters
+    ----------
+    content : pd.DataFrame
+        Content data with `title`, `genres`, `release_year`,
+        `title_cast` and `director` columns.
+    cache_size : int
+        Number of prefix posting lists and query results kept cached.
+
+    """
+
+    def __init__(self, content, cache_size=1024):
+        self.fields = {name: _FieldIndex(content[name].values) for name in FIELDS}
+
+        # Rows must hold text in every searched field to ever match
+        valid = np.ones(len(content), dtype=bool)
+        for name in FIELDS:
+            valid &= content[name].map(lambda x: isinstance(x, str)).values
+        self.valid_rows = np.flatnonzero(valid).astype(np.int32)
+
+        # Bitmap of rows per release year
+        years = content[YEAR_FIELD].astype(str).str.lower().values
+        self.years = np.unique(years)
+        self.year_bitmaps = {year: np.packbits(years == year) for year in self.years}
+        self.n_rows = len(content)
+
+        self.cache_size = cache_size
+        self._postings = OrderedDict()
+        self._results = OrderedDict()
+        self._last = None
+        self._lock = threading.Lock()
+
+        # Frame displayed on the Movie Filter page
+        self.display = content[list(DISPLAY_COLUMNS)].copy()
+        self.display['release_year'] = self.display['release_year'].astype(str)
+        self.display.rename(columns=DISPLAY_COLUMNS, inplace=True)
+
+    def _cached(self, cache, key, compute):
+        with self._lock:
+            if key in cache:
+                cache.move_to_end(key)
+                return cache[key]
+        value = compute()
+        with self._lock:
+            cache[key] = value
+            if len(cache) > self.cache_size:
+                cache.popitem(last=False)
+        return value
+
+    def _field_postings(self, field, prefix):
+        return self._cached(self._postings, (field, prefix),
+                            lambda: self.fields[field].prefix_postings(prefix))
+
+    def _year_rows(self, words):
+        """Rows whose release year contains any of the given words."""
+        bitmap = np.zeros((self.n_rows + 7) // 8, dtype=np.uint8)
+        for year in self.years:
+            if any(word in year for word in words):
+                bitmap |= self.year_bitmaps[year]
+        return np.flatnonzero(np.unpackbits(bitmap, count=self.n_rows)).astype(np.int32)
+
+    @staticmethod
+    def _narrows(previous, query):
+        """Whether every match of `query` is also a match of `previous`."""
+        for field, terms in previous.items():
+            if field == YEAR_FIELD:
+                if terms != query[field]:
+                    return False
+                continue
+            if not all(any(new.startswith(old) for new in query[field])
+                       for old in terms):
+                return False
+        return True
+
+    def search(self, title='', genres='', release_year='', title_cast='',
+               director=''):
+        """Rows of the movies matching every non-empty query field.
+
+        Each whitespace-separated word of the title, genres, cast and
+        director queries must prefix a token of that field. The release
+        year query matches a movie if any of its words occurs within the
+        year.
+
+        Returns
+        -------
+        np.ndarray (int)
+            Sorted rows of the matching movies.
+
+        """
+        query = {'title': tokenize(title), 'genres': tokenize(genres),
+                 'title_cast': tokenize(title_cast), 'director': tokenize(director),
+                 YEAR_FIELD: tuple(str(release_year).lower().split())}
+        key = tuple((field, tuple(terms)) for field, terms in query.items())
+
+        def compute():
+            rows = self.valid_rows
+            last = self._last
+            if last is not None and self._narrows(last[0], query):
+                rows = last[1]
+            if query[YEAR_FIELD]:
+                rows = _intersect(rows, self._year_rows(query[YEAR_FIELD]))
+            for field in FIELDS:
+                for term in query[field]:
+                    rows = _intersect(rows, self._field_postings(field, term))
+            return rows
+
+        rows = self._cached(self._results, key, compute)
+        self._last = (query, rows)
+        return rows
+
+    def filter(self, **query):
+        """Display frame of the movies matching the query; see `search`."""
+        return self.display.iloc[self.search(**query)]
+
+
+# Search indexes, built once per dataset.
+_indexes = {}
+
+def load_search_index(path_to_content):
+    """Return the search index over a content dataset, building it once.
+
+    Parameters
+    ----------
+    path_to_content : str
+        Relative or absolute path to the content data stored in .csv
+        format. Its columnar copy is used when available.
+
+    Returns
+    -------
+    MovieSearchIndex
+        Index over every movie in the dataset.
+
+    """
+    if path_to_content not in _indexes:
+        content = read_table(path_to_content, as_category=False)
+        _indexes[path_to_content] = MovieSearchIndex(content)
+    return _indexes[path_to_content]